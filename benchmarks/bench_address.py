@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+import timeit
+
+from eth_utils import keccak, to_checksum_address
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+
+from addresses import to_address  # noqa: E402
+
+
+def old_different(distro1, addresses1, distro2, addresses2):
+    # are_distributions_different before interning: lowercase copies on every call
+    addresses1 = [address.lower() for address in addresses1]
+    addresses2 = [address.lower() for address in addresses2]
+    dict1, dict2 = dict(zip(addresses1, distro1)), dict(zip(addresses2, distro2))
+    if set(addresses1) != set(addresses2):
+        return True
+    return sum(abs(dict1[a] - dict2[a]) for a in addresses1)
+
+
+def new_different(distro1, addresses1, distro2, addresses2):
+    # are_distributions_different now: Address values pass through, other spellings are looked up
+    try:
+        addresses1 = [to_address(address) for address in addresses1]
+        addresses2 = [to_address(address) for address in addresses2]
+    except ValueError:
+        addresses1 = [to_address(address.lower()) for address in addresses1]
+        addresses2 = [to_address(address.lower()) for address in addresses2]
+    dict1, dict2 = dict(zip(addresses1, distro1)), dict(zip(addresses2, distro2))
+    if set(addresses1) != set(addresses2):
+        return True
+    return sum(abs(dict1[a] - dict2[a]) for a in addresses1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Catalog scan and fleet comparison, per-call checksums vs interned addresses')
+    parser.add_argument('--catalog', type=int, default=2000)
+    parser.add_argument('--portfolios', type=int, default=500)
+    parser.add_argument('--assets', type=int, default=20)
+    args = parser.parse_args()
+
+    catalog = ['0x' + keccak(text=f'asset-{i}')[-20:].hex() for i in range(args.catalog)]
+    scan_old = min(timeit.repeat(lambda: [to_checksum_address(key) for key in catalog], number=1, repeat=3))
+    to_address(catalog[0])
+    scan_new = min(timeit.repeat(lambda: [to_address(key) for key in catalog], number=1, repeat=3))
+    print(f"catalog scan ({args.catalog} keys): checksum {scan_old * 1e3:.2f} ms, interned {scan_new * 1e3:.2f} ms "
+          f"({scan_old / scan_new:.0f}x)")
+
+    # The chain returns checksummed addresses, the catalog lowercase ones
+    fleet = []
+    for p in range(args.portfolios):
+        assets = catalog[p % 50:p % 50 + args.assets]
+        distro = list(range(len(assets)))
+        fleet.append((distro, [to_checksum_address(a) for a in assets], distro[::-1], list(assets)))
+    # With interning, the getters and strategies hand over Address values instead of strings
+    interned = [(d1, [to_address(a) for a in a1], d2, [to_address(a) for a in a2]) for d1, a1, d2, a2 in fleet]
+    if [old_different(*f) for f in fleet] != [new_different(*f) for f in interned] != [new_different(*f) for f in fleet]:
+        print('MISMATCH between the two comparisons')
+        return 1
+    cmp_old = min(timeit.repeat(lambda: [old_different(*f) for f in fleet], number=1, repeat=5))
+    cmp_new = min(timeit.repeat(lambda: [new_different(*f) for f in interned], number=1, repeat=5))
+    print(f"fleet comparison ({args.portfolios} portfolios x {args.assets} assets): lowercase {cmp_old * 1e3:.2f} ms, "
+          f"interned {cmp_new * 1e3:.2f} ms ({cmp_old / cmp_new:.1f}x)")
+
+    # A mis-checksummed spelling is compared, not rejected
+    checksum = to_checksum_address(catalog[0])
+    broken = checksum[:2] + checksum[2:].swapcase()
+    if new_different([1], [broken], [1], [catalog[0]]) != 0:
+        print('FAILED mis-checksummed address')
+        return 1
+    # One registry key per address, however many spellings were seen
+    from addresses import _REGISTRY
+    if len(_REGISTRY) != args.catalog:
+        print(f'FAILED registry holds {len(_REGISTRY)} keys for {args.catalog} addresses')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
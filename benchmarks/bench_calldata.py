@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+from eth_abi.grammar import parse
+from eth_utils import keccak, to_checksum_address
+from web3 import Web3
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+
+from abi_codec import AbiCodec  # noqa: E402
+from stub_chain import NETWORK_DATA  # noqa: E402
+
+ABI_KEYS = ('abiWEDXPro', 'abiWEDXManager', 'abiWEDXDeployerPro', 'abiWEDXIndex')
+
+
+def sample_value(abi_type, rng, length):
+    parsed = parse(abi_type)
+    if parsed.arrlist:
+        item = parsed.item_type.to_type_str()
+        return [sample_value(item, rng, length) for _ in range(length)]
+    if parsed.base == 'address':
+        return to_checksum_address(keccak(rng.getrandbits(64).to_bytes(8, 'big'))[-20:])
+    if parsed.base == 'uint':
+        bits = int(parsed.sub or 256)
+        return rng.choice([0, 1, (1 << bits) - 1, rng.getrandbits(bits)])
+    if parsed.base == 'bool':
+        return rng.choice([True, False])
+    raise ValueError(f"No sample for {abi_type}")
+
+
+def check_equivalence(network, seed=7, lengths=(0, 1, 3, 50)):
+    # web3's ContractFunction calldata and the codec's must match byte for byte
+    rng = random.Random(seed)
+    w3 = Web3()
+    address = to_checksum_address('0x' + '42' * 20)
+    checked, mismatches = 0, []
+    for chain, data in network.items():
+        codec = AbiCodec(data)
+        for abi_key in ABI_KEYS:
+            if abi_key not in data:
+                continue
+            contract = w3.eth.contract(address=address, abi=data[abi_key])
+            for item in data[abi_key]:
+                if item['type'] != 'function':
+                    continue
+                types = [i['type'] for i in item['inputs']]
+                for length in lengths if any('[' in t for t in types) else (0,):
+                    args = [sample_value(t, rng, length) for t in types]
+                    expected = contract.get_function_by_name(item['name'])(*args)._encode_transaction_data()
+                    actual = codec.encode_call(abi_key, item['name'], args)
+                    checked += 1
+                    if actual != expected:
+                        mismatches.append(f"{chain} {abi_key}.{item['name']} (arrays of {length})")
+    return checked, mismatches
+
+
+def check_rejections(network):
+    # Values the direct encoder does not take must still be rejected through eth_abi
+    codec = AbiCodec(network['base'])
+    good = to_checksum_address(keccak(text='asset')[-20:])
+    bad_checksum = good[:2] + good[2:].swapcase()
+    cases = {
+        'bad checksum': ([bad_checksum], [1]),
+        'negative weight': ([good], [-1]),
+        'float weight': ([good], [0.5]),
+        'bool weight': ([good], [True]),
+        'uint256 overflow': ([good], [1 << 256]),
+    }
+    accepted = []
+    for name, args in cases.items():
+        try:
+            codec.encode_call('abiWEDXPro', 'setPortfolio', args)
+            accepted.append(name)
+        except Exception:
+            pass
+    return accepted
+
+
+def micro_benchmark(network, n_assets, number):
+    data = network['base']
+    w3 = Web3()
+    pro = to_checksum_address('0x' + '42' * 20)
+    assets = [to_checksum_address(keccak(text=f'asset-{i}')[-20:]) for i in range(n_assets)]
+    distribution = [10 ** 6 // n_assets] * n_assets
+    tx_fields = {'chainId': 8453, 'gas': 500_000, 'gasPrice': 10 ** 8, 'nonce': 7, 'value': 0}
+
+    def web3_path():
+        # What set_portfolio did before: a contract object, then the call data for
+        # estimate_gas and again inside build_transaction
+        function = w3.eth.contract(address=pro, abi=data['abiWEDXPro']).functions.setPortfolio(assets, distribution)
+        function._encode_transaction_data()
+        return function.build_transaction(tx_fields)
+
+    codec = AbiCodec(data)
+
+    def codec_path():
+        call_data = codec.encode_call('abiWEDXPro', 'setPortfolio', (assets, distribution))
+        return dict(tx_fields, to=pro, data=call_data)
+
+    if web3_path()['data'] != codec_path()['data']:
+        raise ValueError("Calldata differs between the two paths")
+    codec_path()
+    slow = min(timeit.repeat(web3_path, number=max(1, number // 20), repeat=3)) / max(1, number // 20)
+    fast = min(timeit.repeat(codec_path, number=number, repeat=3)) / number
+    return slow, fast
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calldata equivalence check and tx-build micro-benchmark')
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(NETWORK_DATA) as f:
+        network = json.load(f)
+
+    checked, mismatches = check_equivalence(network)
+    print(f"equivalence: {checked} encodings checked, {len(mismatches)} mismatches")
+    for mismatch in mismatches:
+        print(f"MISMATCH {mismatch}")
+
+    accepted = check_rejections(network)
+    for name in accepted:
+        print(f"NOT REJECTED {name}")
+
+    for n_assets in (10, 50, 200):
+        slow, fast = micro_benchmark(network, n_assets, args.number)
+        print(f"setPortfolio with {n_assets:3d} assets: web3 {slow * 1e6:9.1f} us, codec {fast * 1e6:7.1f} us ({slow / fast:.0f}x)")
+    return 1 if mismatches or accepted else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
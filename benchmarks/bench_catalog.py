@@ -0,0 +1,115 @@
+import argparse
+import contextlib
+import io
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench_wedx import new_wedx, user_address, CHAIN_ID
+from stub_chain import StubChain, StubServer, make_exchange_data
+
+
+class CatalogServer:
+    """Serves one pre-encoded exchange file and counts the bytes written before the client hung up."""
+
+    def __init__(self, chain_name, payload, chunk_size=16384):
+        self.sent = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def handle(self):
+                # The streaming client hangs up mid-body by design
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def do_GET(self):
+                if self.path != f'/exchange_data_{chain_name}.json':
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                try:
+                    for start in range(0, len(payload), chunk_size):
+                        self.wfile.write(payload[start:start + chunk_size])
+                        server.sent += min(chunk_size, len(payload) - start)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full exchange-data parse against the streamed top-N read')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    failures = []
+    chain = StubChain(CHAIN_ID, user_address())
+    with StubServer(chain) as rpc:
+        with contextlib.redirect_stdout(io.StringIO()):
+            wedx = new_wedx(rpc.url)
+        from catalog import quality_filter
+        for n_pools in args.sizes:
+            data = make_exchange_data(n_pools, chain.network['wrap_address'])
+            payload = json.dumps(data).encode()
+            expected = {}
+            for key, record in data.items():
+                if quality_filter()(record):
+                    expected[key] = record
+                    if len(expected) == args.limit:
+                        break
+            del data
+            catalog = CatalogServer(wedx.get_chain_name(), payload)
+            wedx.data_url = catalog.url
+            wedx.http.close()
+
+            full, full_s, full_peak = measure(wedx.get_assets_info)
+            full_sent, catalog.sent = catalog.sent, 0
+            del full
+            wedx.http.close()
+            streamed, stream_s, stream_peak = measure(lambda: wedx.stream_assets_info(where=quality_filter(), limit=args.limit))
+            time.sleep(0.05)
+            print(f"{n_pools:6d} pools ({len(payload) / 1e6:6.1f} MB): full {full_s * 1000:8.1f} ms, peak {full_peak / 1e6:7.1f} MB, "
+                  f"sent {full_sent / 1e6:6.1f} MB | top {args.limit} streamed {stream_s * 1000:6.1f} ms, "
+                  f"peak {stream_peak / 1e6:5.2f} MB, sent {catalog.sent / 1e6:5.2f} MB")
+            if streamed != expected:
+                failures.append(f"{n_pools} pools: streamed records differ from the full parse")
+            catalog.close()
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+
+from datasources import DataSources  # noqa: E402
+
+
+class Endpoints:
+    """HTTP server whose paths answer after a set delay, or fail, as configured."""
+
+    def __init__(self, delays):
+        self.delays = dict(delays)
+        self.failing = set()
+        self.hits = 0
+        endpoints = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                name = self.path.strip('/')
+                endpoints.hits += 1
+                time.sleep(endpoints.delays.get(name, 0.0))
+                status = 500 if name in endpoints.failing else 200
+                payload = json.dumps({'source': name, 'at': time.time()}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sequential fetches against the concurrent data-source join')
+    parser.add_argument('--ttl', type=float, default=0.5)
+    args = parser.parse_args()
+
+    delays = {'holdings': 0.3, 'catalog': 0.4, 'prices': 0.2}
+    endpoints = Endpoints(delays)
+    failures = []
+    try:
+        start = time.perf_counter()
+        for name in delays:
+            requests.get(f'{endpoints.url}/{name}', timeout=10).json()
+        sequential = time.perf_counter() - start
+
+        sources = DataSources()
+        for name in delays:
+            sources.register_url(name, f'{endpoints.url}/{name}', ttl=args.ttl, timeout=1.0)
+        start = time.perf_counter()
+        bundle = sources.fetch()
+        joined = time.perf_counter() - start
+        print(f"sequential fetches {sequential * 1000:7.1f} ms, concurrent join {joined * 1000:7.1f} ms "
+              f"(slowest source {max(delays.values()) * 1000:.0f} ms)")
+        if joined > max(delays.values()) + 0.15 or len(bundle.values) != len(delays):
+            failures.append(f"join took {joined:.3f} s for {len(bundle.values)} sources")
+
+        hits = endpoints.hits
+        start = time.perf_counter()
+        sources.fetch()
+        print(f"within TTL: {(time.perf_counter() - start) * 1000:.2f} ms, {endpoints.hits - hits} requests")
+        if endpoints.hits != hits:
+            failures.append('cached sources were refetched')
+
+        time.sleep(args.ttl)
+        endpoints.failing.add('holdings')
+        endpoints.delays['catalog'] = 5.0
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            bundle = sources.fetch()
+        elapsed = time.perf_counter() - start
+        print(f"failing and hanging sources: join {elapsed * 1000:.1f} ms, stale {sorted(bundle.stale)}, "
+              f"ages {', '.join(f'{name} {age:.1f} s' for name, age in sorted(bundle.ages.items()))}")
+        if sorted(bundle.stale) != ['catalog', 'holdings'] or len(bundle.values) != len(delays) or elapsed > 1.2:
+            failures.append(f"fallback: stale {bundle.stale}, {len(bundle.values)} values, {elapsed:.3f} s")
+        sources.close()
+    finally:
+        endpoints.close()
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+from bench_wedx import new_wedx, user_address, CHAIN_ID
+from stub_chain import NETWORK_DATA, StubChain, StubServer
+
+
+def signers(label, n):
+    from signer import LocalSigner
+    from eth_utils import keccak
+    return [LocalSigner('0x' + keccak(text=f'{label}-{i}').hex()) for i in range(n)]
+
+
+def run_fleet(chain, url, network, owners, n_delegates):
+    from delegates import DelegateFleet
+    fleet = DelegateFleet(CHAIN_ID, {CHAIN_ID: url}, signers('delegate', n_delegates), network=network)
+    with contextlib.redirect_stdout(io.StringIO()):
+        registered = [fleet.register(owner) for owner in owners]
+        again = [fleet.register(owner) for owner in owners]
+        chain.reset_counters()
+        start = time.perf_counter()
+        results = fleet.run({owner.address: lambda wedx: wedx.rank_me() for owner in owners})
+        elapsed = time.perf_counter() - start
+    return fleet, registered, again, results, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='One delegate against a fleet of delegates writing for many owners')
+    parser.add_argument('--owners', type=int, default=24)
+    parser.add_argument('--delegates', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.005)
+    args = parser.parse_args()
+
+    failures = []
+    chain = StubChain(CHAIN_ID, user_address())
+    with StubServer(chain, latency=args.latency) as server:
+        with contextlib.redirect_stdout(io.StringIO()):
+            new_wedx(server.url)
+        with open(NETWORK_DATA) as f:
+            network = json.load(f)
+        owners = signers('owner', args.owners)
+        for owner in owners:
+            chain.add_portfolio(owner.address)
+
+        timings = {}
+        for n_delegates in (1, args.delegates):
+            chain.delegated.clear()
+            fleet, registered, again, results, elapsed = run_fleet(chain, server.url, network, owners, n_delegates)
+            timings[n_delegates] = elapsed
+            print(f"{n_delegates} delegate(s): {args.owners} rank_me writes in {elapsed * 1000:.0f} ms "
+                  f"({args.owners / elapsed:.0f} writes/s)")
+
+            # Registration sets each owner's delegate once
+            if any(receipt is None for receipt in registered) or any(receipt is not None for receipt in again):
+                failures.append(f'{n_delegates} delegates: registration sent too few or repeated transactions')
+            for owner in owners:
+                portfolio = chain.portfolio_of[owner.address]
+                if chain.delegated.get(portfolio) != fleet.delegate_for(owner.address).address:
+                    failures.append(f'{n_delegates} delegates: {owner.address} delegates to the wrong wallet')
+                    break
+
+            # Lanes are balanced and every write is signed by its owner's delegate
+            load = Counter(fleet.lane_for(owner.address) for owner in owners)
+            if max(load.values()) - min(load.values()) > 1 or len(load) != n_delegates:
+                failures.append(f'{n_delegates} delegates: unbalanced lanes {dict(load)}')
+            for owner, result in results.items():
+                if isinstance(result, Exception):
+                    failures.append(f'{n_delegates} delegates: {owner} failed with {result!r}')
+                    break
+                if result['from'] != fleet.delegate_for(owner).address:
+                    failures.append(f'{n_delegates} delegates: {owner} was not written by its delegate')
+                    break
+
+        if timings[args.delegates] >= timings[1]:
+            failures.append(f'{args.delegates} delegates were not faster than one')
+
+        # Owners' clients share the fleet's one provider and codec, and differ only in account and signer
+        clients = [fleet.client(owner.address) for owner in owners]
+        if len({id(wedx.w3) for wedx in clients}) != 1 or len({id(wedx.codec) for wedx in clients}) != 1:
+            failures.append('owner clients did not share one provider and codec')
+        if any(wedx.user_address != owner.address or wedx.signer is not fleet.delegate_for(owner.address)
+               for wedx, owner in zip(clients, owners)):
+            failures.append('an owner client has the wrong account or signer')
+
+    # The network data is found from any working directory
+    from wedx import load_network
+    cwd = os.getcwd()
+    try:
+        os.chdir(os.sep)
+        if load_network() != network:
+            failures.append('load_network() read different network data')
+    finally:
+        os.chdir(cwd)
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
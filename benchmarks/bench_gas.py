@@ -0,0 +1,95 @@
+import argparse
+import contextlib
+import io
+import math
+import sys
+import time
+
+from bench_wedx import new_wedx, user_address, CHAIN_ID
+from stub_chain import StubChain, StubServer, StubWebSocketServer
+
+
+def cyclic_base_fee(chain, period, amplitude=0.6, base=10 ** 8):
+    # Starts at the peak, so an immediate write pays the most
+    return lambda number: int(base * (1 + amplitude * math.cos(2 * math.pi * (number - chain.block_offset) / period)))
+
+
+def scheduled_write(chain, wedx, cap, max_wait=None, timeout=None):
+    from gas import ExecutionScheduler
+    scheduler = ExecutionScheduler(wedx)
+    start = time.time()
+    receipt = scheduler.execute('rank_me', cap=cap, max_wait=max_wait, timeout=timeout)
+    write = scheduler.writes[-1]
+    return {
+        'paid_gwei': receipt['effectiveGasPrice'] / 1e9,
+        'waited_s': time.time() - start,
+        'reason': write.reason,
+        'type': int(receipt['type'], 16) if isinstance(receipt['type'], str) else receipt['type'],
+    }
+
+
+def check_unbounded(wedx, timeout, transport):
+    # An unreachable cap must not block forever: refused without a bound, given up after the timeout
+    from gas import ExecutionScheduler
+    scheduler = ExecutionScheduler(wedx)
+    failures = []
+    try:
+        scheduler.execute('rank_me', cap=1)
+        failures.append(f'{transport}: a capped write without max_wait or timeout was accepted')
+    except ValueError:
+        pass
+    start = time.time()
+    try:
+        scheduler.execute('rank_me', cap=1, timeout=timeout)
+        failures.append(f'{transport}: an unreachable cap was released')
+    except TimeoutError:
+        waited = time.time() - start
+        if waited > timeout + 1 or scheduler.writes[-1].status != 'expired' or scheduler.held:
+            failures.append(f'{transport}: timeout raised after {waited:.2f}s, write {scheduler.writes[-1].status}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gas paid by immediate and scheduled writes under a cyclic base fee')
+    parser.add_argument('--block-time', type=float, default=0.1)
+    parser.add_argument('--period', type=int, default=40, help='base fee cycle length in blocks')
+    parser.add_argument('--cap-gwei', type=float, default=0.07)
+    parser.add_argument('--max-wait', type=float, default=1.0, help='deadline for the unreachable-cap run, in seconds')
+    args = parser.parse_args()
+
+    failures = []
+    chain = StubChain(CHAIN_ID, user_address(), block_time=args.block_time)
+    chain.base_fee = cyclic_base_fee(chain, args.period)
+    cap = int(args.cap_gwei * 1e9)
+    with StubServer(chain) as http, StubWebSocketServer(chain) as ws:
+        for transport, url in (('http', http.url), ('ws', ws.url)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                wedx = new_wedx(url)
+                wedx.data_url = http.url
+                immediate = wedx.rank_me()['effectiveGasPrice'] / 1e9
+                chain.reset_counters()
+                gated = scheduled_write(chain, wedx, cap, timeout=60)
+                oracle_calls = chain.calls['eth_feeHistory']
+                forced = scheduled_write(chain, wedx, 1, max_wait=args.max_wait)
+            print(f"{transport:5s} immediate {immediate:.4f} gwei | capped {gated['paid_gwei']:.4f} gwei after "
+                  f"{gated['waited_s']:.2f}s, {oracle_calls} fee reads | unreachable cap released after "
+                  f"{forced['waited_s']:.2f}s ({forced['reason']})")
+            if gated['paid_gwei'] > args.cap_gwei:
+                failures.append(f"{transport}: paid {gated['paid_gwei']:.4f} gwei above the {args.cap_gwei} gwei cap")
+            if (gated['type'], forced['type']) != (2, 2):
+                failures.append(f"{transport}: scheduled writes were not signed with the oracle's EIP-1559 fees")
+            if forced['waited_s'] > args.max_wait + 4 * args.block_time + 1:
+                failures.append(f"{transport}: deadline write waited {forced['waited_s']:.2f}s")
+            if oracle_calls > gated['waited_s'] / args.block_time + 2:
+                failures.append(f"{transport}: {oracle_calls} fee reads in {gated['waited_s'] / args.block_time:.0f} blocks")
+            failures += check_unbounded(wedx, args.max_wait, transport)
+            if transport == 'ws':
+                wedx.w3.provider.disconnect()
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from bench_wedx import create_tvlw_portfolio, new_wedx, user_address, CHAIN_ID
+from stub_chain import StubChain, StubServer
+
+
+class Crash(BaseException):
+    pass
+
+
+def crash_after_send(wedx):
+    send = wedx.w3.eth.send_raw_transaction
+
+    def crashing(raw_tx):
+        send(raw_tx)
+        raise Crash()
+    wedx.w3.eth.send_raw_transaction = crashing
+
+
+def crash_while_waiting(wedx):
+    def crashing(*args, **kwargs):
+        raise Crash()
+    wedx.wait_for_receipt = crashing
+
+
+def crash_before_send(wedx):
+    def crashing(raw_tx):
+        raise Crash()
+    wedx.w3.eth.send_raw_transaction = crashing
+
+
+def open_wedx(url, journal_path):
+    wedx = new_wedx(url)
+    from journal import TxJournal
+    wedx.journal = TxJournal(journal_path)
+    return wedx
+
+
+def restart_run(chain, url, journal_path, crash, downtime=0.0):
+    # The first run dies mid-write; the second repeats the same decision and must not send it again
+    sent_at_start = len(chain.sent)
+    wedx = open_wedx(url, journal_path)
+    assets, distribution = create_tvlw_portfolio(wedx)
+    crash(wedx)
+    try:
+        wedx.set_portfolio(assets, distribution)
+    except Crash:
+        pass
+    wedx.journal.close()
+    time.sleep(downtime)
+
+    wedx = open_wedx(url, journal_path)
+    chain.reset_counters()
+    start = time.perf_counter()
+    outcome = wedx.journal.reconcile(wedx.w3, wedx.chain_id, wedx.event_names())
+    reconcile_s = time.perf_counter() - start
+    reconcile_trips = chain.round_trips
+    if outcome['confirmed']:
+        # A bot re-reading the portfolio here would find it already set and skip the write
+        status = wedx.journal.entries[outcome['confirmed'][0]]['receipt']['status']
+    else:
+        status = wedx.set_portfolio(assets, distribution)['status']
+    wedx.journal.close()
+    return {
+        'outcome': {state: len(ids) for state, ids in outcome.items() if ids},
+        'reconcile_trips': reconcile_trips,
+        'reconcile_ms': reconcile_s * 1000,
+        'transactions': len(chain.sent) - sent_at_start,
+        'status': status,
+    }
+
+
+def check_dropped_send(chain, url, tmp):
+    # The connection drops during the send: the entry stays 'signed' and the same process
+    # writes again without a reconcile in between. It must broadcast the raw bytes, not only wait
+    wedx = open_wedx(url, os.path.join(tmp, 'dropped.jsonl'))
+    assets, distribution = create_tvlw_portfolio(wedx)
+    send = wedx.w3.eth.send_raw_transaction
+
+    def dropping(raw_tx):
+        raise ConnectionError('connection dropped')
+    wedx.w3.eth.send_raw_transaction = dropping
+    try:
+        wedx.set_portfolio(assets, distribution)
+    except ConnectionError:
+        pass
+    wedx.w3.eth.send_raw_transaction = send
+    sent_before = len(chain.sent)
+    start = time.perf_counter()
+    status = wedx.set_portfolio(assets, distribution)['status']
+    elapsed = time.perf_counter() - start
+    transactions = len(chain.sent) - sent_before
+    wedx.journal.close()
+    print(f"dropped send        retried in {elapsed:.2f}s, {transactions} transaction(s) on chain")
+    if transactions != 1 or status != 1:
+        return [f'dropped send: {transactions} transactions, status {status}']
+    return []
+
+
+def check_pending_lookup(tmp):
+    # Finding the open entry of a write must not scan every resolved one
+    from journal import TxJournal
+    journal = TxJournal(os.path.join(tmp, 'history.jsonl'), fsync=False)
+    sender = user_address()
+    for i in range(20_000):
+        entry_id = journal.plan(CHAIN_ID, {'from': sender, 'to': sender, 'data': hex(i), 'value': 0}, 'old')
+        journal.failed(entry_id, 'done')
+    call = {'from': sender, 'to': sender, 'data': '0xff', 'value': 0}
+    entry_id = journal.plan(CHAIN_ID, call, 'open')
+    journal._append(entry_id, 'signed', tx_hash='0x00', nonce=0, gas=0, raw='0x')
+    start = time.perf_counter()
+    for _ in range(1000):
+        entry = journal.pending(CHAIN_ID, call)
+    lookup_us = (time.perf_counter() - start) * 1e3
+    journal.close()
+    print(f"pending lookup with 20000 resolved entries: {lookup_us:.1f} us per write")
+    if entry is None or entry['id'] != entry_id or len(journal.unresolved()) != 1:
+        return ['pending lookup: the open entry was not found']
+    return []
+
+
+def check_torn_lines(tmp):
+    # A garbled middle line and a torn tail must not hide the records around them
+    from journal import TxJournal
+    path = os.path.join(tmp, 'torn.jsonl')
+    call = {'from': user_address(), 'to': user_address(), 'data': '0x', 'value': 0}
+    journal = TxJournal(path, fsync=False)
+    first = journal.plan(CHAIN_ID, call, 'first')
+    journal._file.close()
+    with open(path, 'a') as f:
+        f.write('{"id": "garbled", "sta\n')
+    journal = TxJournal(path, fsync=False)
+    journal.sent(first)
+    journal._file.close()
+    with open(path, 'a') as f:
+        f.write('{"id": "torn", "state": "pl')
+    journal = TxJournal(path, fsync=False)
+    second = journal.plan(CHAIN_ID, call, 'second')
+    journal._file.close()
+    entries = TxJournal(path, fsync=False).entries
+    failures = []
+    if entries.get(first, {}).get('state') != 'sent':
+        failures.append('torn journal: a sent entry after a garbled line was lost')
+    if entries.get(second, {}).get('operation') != 'second':
+        failures.append('torn journal: a record appended after a torn tail was lost')
+    print(f"torn journal: {len(entries)} entries kept ({'ok' if not failures else 'lost records'})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Restart after a crash mid-write, with the transaction journal')
+    parser.add_argument('--block-time', type=float, default=0.3)
+    args = parser.parse_args()
+
+    scenarios = {
+        'crash after send': (crash_after_send, 0.0),
+        'crash while waiting': (crash_while_waiting, 0.0),
+        'crash before send': (crash_before_send, 0.0),
+        'restart after mined': (crash_while_waiting, 3 * args.block_time),
+    }
+    failures = []
+    chain = StubChain(CHAIN_ID, user_address(), block_time=args.block_time)
+    with StubServer(chain) as server, tempfile.TemporaryDirectory() as tmp:
+        for name, (crash, downtime) in scenarios.items():
+            path = os.path.join(tmp, name.replace(' ', '_') + '.jsonl')
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = restart_run(chain, server.url, path, crash, downtime)
+            print(f"{name:20s} reconcile {result['outcome']} in {result['reconcile_trips']} round trips "
+                  f"({result['reconcile_ms']:.1f} ms), {result['transactions']} transaction(s) on chain")
+            if result['transactions'] != 1 or result['status'] != 1:
+                failures.append(f"{name}: {result['transactions']} transactions, status {result['status']}")
+
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            failures.extend(check_dropped_send(chain, server.url, tmp))
+        print(out.getvalue().splitlines()[-1])
+        failures.extend(check_pending_lookup(tmp))
+        failures.extend(check_torn_lines(tmp))
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
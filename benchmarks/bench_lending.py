@@ -0,0 +1,161 @@
+import argparse
+import contextlib
+import io
+import sys
+
+from eth_abi import decode
+
+from bench_wedx import new_wedx, user_address, CHAIN_ID
+from stub_chain import StubChain, StubServer, fake_address
+
+
+def run_plan(chain, wedx, current_assets, new_assets, new_distribution, lending):
+    from rebalance import RebalancePlan
+    chain.reset_counters()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = RebalancePlan.rebalance(wedx, current_assets, new_assets, new_distribution, lending=lending(), rank=False).execute()
+    if not result.success:
+        raise ValueError(f"plan failed: {result.failed}")
+    return {
+        'txs': chain.calls['eth_sendRawTransaction'],
+        'gas': sum(step.tx['gas'] for step in result.steps if step.tx is not None),
+        'round_trips': chain.round_trips,
+        'steps': [step.name for step in result.steps],
+    }
+
+
+def check_mined_reverts(chain, wedx, current_assets, current_distro, new_assets, new_distribution, lent):
+    # Pipelined steps must not run past a revert, and the recovery must restore exactly what was withdrawn
+    from lending import LendingManager
+    from rebalance import RebalancePlan
+    failures = []
+    manager = LendingManager(wedx, lender_id={asset: 3 for asset in lent})
+    plan = manager.plan(current_assets, current_distro, new_assets, new_distribution)
+    for reverted, expected in (
+        ('withdrawLendTokens', ['failed', 'skipped', 'skipped', 'skipped']),
+        ('setPortfolio', ['confirmed', 'failed', 'confirmed', 'skipped']),
+    ):
+        chain.mined_reverts = {reverted}
+        sent_before = len(chain.sent)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = RebalancePlan.rebalance(wedx, current_assets, new_assets, new_distribution, lending=plan).execute()
+        finally:
+            chain.mined_reverts = set()
+        statuses = [step.status for step in result.steps]
+        recovery = [(step.name, step.args) for step in result.recovery_steps]
+        print(f"{reverted} reverts when mined: steps {statuses}, {len(chain.sent) - sent_before} txs, recovery {[name for name, _ in recovery]}")
+        if statuses != expected:
+            failures.append(f'{reverted} revert: steps {statuses}, expected {expected}')
+        if reverted == 'setPortfolio':
+            supplied = {asset for asset in plan.supply}
+            restore = [asset for asset in plan.withdraw if asset not in supplied]
+            if not restore or recovery != [('restore_lending', (restore, [3] * len(restore)))]:
+                failures.append(f'setPortfolio revert: recovery {recovery}')
+        elif recovery:
+            failures.append(f'{reverted} revert: unexpected recovery {recovery}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Withdraw/supply every asset against the selective lending plan')
+    parser.add_argument('--latency', type=float, default=0.005)
+    args = parser.parse_args()
+
+    failures = []
+    chain = StubChain(CHAIN_ID, user_address())
+    with StubServer(chain, latency=args.latency) as server:
+        with contextlib.redirect_stdout(io.StringIO()):
+            wedx = new_wedx(server.url)
+        from addresses import to_address
+        from lending import LendingManager
+        manager = LendingManager(wedx)
+        # The account is resolved once per manager; keep that out of the per-cycle counts
+        manager.portfolio()
+        current_assets = wedx.get_assets_addresses()
+        current_distro = wedx.get_distribution()
+        tokens = current_assets[:-1]
+        lent = {asset for asset in current_assets if int(asset, 16) % 2}
+
+        swapped = tokens[2:] + [to_address(fake_address('token-10')), to_address(fake_address('token-11'))]
+        scenarios = {
+            # Every weight changes: only the lent assets need withdrawing
+            'reweight': (tokens, wedx.normalize_distribution([1.0] * len(tokens) + [0.0]), None),
+            # Two assets replaced, the rest keep their weight
+            'swap two': (swapped, current_distro, None),
+            # Same portfolio with everything lent: nothing to withdraw or supply
+            'all lent': (tokens, current_distro, lambda tx, token: 10 ** 17),
+        }
+        expected = {
+            'reweight': ([asset for asset in current_assets if asset in lent], tokens),
+            'swap two': ([asset for asset in tokens[:2] if asset in lent],
+                         [asset for asset in swapped if asset not in lent or asset in tokens[:2]]),
+            'all lent': ([], []),
+        }
+
+        for name, (new_assets, new_distribution, lend_state) in scenarios.items():
+            original = chain.state['getAmountLendToken']
+            if lend_state is not None:
+                chain.state['getAmountLendToken'] = lend_state
+            full = run_plan(chain, wedx, current_assets, new_assets, new_distribution, lambda: True)
+            plans = []
+            selective = run_plan(chain, wedx, current_assets, new_assets, new_distribution,
+                                 lambda: plans.append(manager.plan(current_assets, current_distro, new_assets, new_distribution)) or plans[-1])
+            chain.state['getAmountLendToken'] = original
+            plan = plans[-1]
+            print(f"{name:9s}: all assets {full['txs']} txs, gas limit {full['gas']:9,d}, {full['round_trips']:3d} round trips | "
+                  f"selective {selective['txs']} txs, gas limit {selective['gas']:9,d}, {selective['round_trips']:3d} round trips "
+                  f"(withdraw {len(plan.withdraw)}, supply {len(plan.supply)}, kept lent {len(plan.keep)})")
+            if (plan.withdraw, plan.supply) != expected[name]:
+                failures.append(f'{name}: unexpected withdraw or supply set')
+            if selective['txs'] > full['txs'] or selective['gas'] >= full['gas']:
+                failures.append(f'{name}: the selective plan did not send less')
+
+        # One batch for the positions of old and new assets together
+        chain.reset_counters()
+        manager.plan(current_assets, current_distro, swapped, current_distro)
+        print(f"lend positions of {len(set(current_assets) | set(swapped))} assets: {chain.round_trips} round trip(s)")
+        if chain.round_trips != 1:
+            failures.append('positions took more than one round trip')
+
+        # Prices moved the actual shares off the unchanged targets: kept lent only within the drift tolerance
+        original = chain.state['getActualDistribution']
+        chain.state['getActualDistribution'] = [weight + (500 if i % 2 else -500) for i, weight in enumerate(current_distro)]
+        all_lent = {asset: 10 ** 17 for asset in current_assets}
+        exact = LendingManager(wedx, drift=0).plan(current_assets, current_distro, tokens, current_distro, lent=all_lent)
+        tolerant = LendingManager(wedx, drift=1_000).plan(current_assets, current_distro, tokens, current_distro, lent=all_lent)
+        # The default tolerance is the portfolio's getMinPercAllowance, read in the same batch
+        chain.reset_counters()
+        allowed = manager.plan(current_assets, current_distro, tokens, current_distro)
+        allowed_trips = chain.round_trips
+        chain.state['getMinPercAllowance'], allowance = 400, chain.state['getMinPercAllowance']
+        strict = manager.plan(current_assets, current_distro, tokens, current_distro, lent=all_lent)
+        chain.state['getMinPercAllowance'] = allowance
+        chain.state['getActualDistribution'] = original
+        print(f"drifted shares: drift 0 withdraws {len(exact.withdraw)}, drift 1000 keeps {len(tolerant.keep)}, "
+              f"allowance {allowance} withdraws {len(allowed.withdraw)} in {allowed_trips} round trip(s), allowance 400 keeps {len(strict.keep)}")
+        if exact.keep or len(tolerant.keep) != len(current_assets):
+            failures.append('drifted shares were not checked against the tolerance')
+        if allowed.withdraw or strict.keep or allowed_trips != 1:
+            failures.append('the default tolerance did not follow getMinPercAllowance in one batch')
+
+        # Drop one lent asset, so a failed rebalance has something to put back into lending
+        remaining = [asset for asset in tokens if asset != min(lent & set(tokens))]
+        failures += check_mined_reverts(chain, wedx, current_assets, current_distro, remaining,
+                                        wedx.normalize_distribution([1.0] * len(remaining) + [0.0]), lent)
+
+        # Per-asset lender ids end up in supplyLendTokens
+        routed = LendingManager(wedx, lender_id={tokens[0]: 2})
+        with wedx.simulator.collect() as planned:
+            routed.supply(routed.plan(current_assets, current_distro, tokens, current_distro, lent={}))
+        _, ids = decode(['address[]', 'uint8[]'], bytes.fromhex(planned[0]['data'][10:]))
+        if list(ids) != [2] + [0] * (len(tokens) - 1):
+            failures.append('lender ids were not passed to supplyLendTokens')
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+from eth_abi import encode
+from eth_utils import keccak, to_checksum_address
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..', 'src'))
+NETWORK_DATA = os.path.join(BENCH_DIR, '..', 'network_data', 'network_data_v1.json')
+sys.path.insert(0, SRC_DIR)
+
+from abi_codec import AbiCodec  # noqa: E402
+from results import PortfolioSnapshot, decode_address_array, decode_trader_data, decode_uint_array, trader_data_decoder  # noqa: E402
+from wedx import WedX  # noqa: E402
+
+from stub_chain import StubChain, StubServer  # noqa: E402
+
+CHAIN_ID = 8453
+TRADER_TYPES = ['(uint256[],uint256[],address[],uint256[],uint256[],uint256[],uint256)']
+
+
+def make_results(n, n_assets, n_points, seed=0):
+    # Raw getTraderData, getActualDistribution and getAddresses results for n portfolios
+    assets = [to_checksum_address(keccak(text=f'token-{i}')[-20:]) for i in range(3 * n_assets)]
+    trader_data, distributions, addresses = [], [], []
+    for k in range(n):
+        held = [assets[(k + j) % len(assets)] for j in range(n_assets)]
+        distro = [10 ** 6 // n_assets + (k + j) % 7 for j in range(n_assets)]
+        performances = [10 ** 18 + (k * 7919 + j * 104729) % 10 ** 15 for j in range(n_points)]
+        timestamps = [1_700_000_000 + 86_400 * j + k for j in range(n_points)]
+        trader_data.append(encode(TRADER_TYPES, [(
+            [10 ** 18 + j for j in range(n_assets)], distro, held, performances, timestamps, [0] * n_assets, 1_690_000_000 + k,
+        )]))
+        distributions.append(encode(['uint256[]'], [distro]))
+        addresses.append(encode(['address[]'], [held]))
+    return trader_data, distributions, addresses
+
+
+def measure(decode, payloads):
+    # Decode time, then the memory the decoded results keep alive
+    start = time.perf_counter()
+    results = [decode(data) for data in payloads]
+    elapsed = time.perf_counter() - start
+    del results
+    tracemalloc.start()
+    results = [decode(data) for data in payloads]
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, retained, results
+
+
+def check_session():
+    # One chain answers and one cannot be reached: both come back as ChainResult, the error kept as raised
+    from bench_wedx import user_address, USER_PRIVATE_KEY
+    from session import ChainResult, WedXSession
+    chain = StubChain(CHAIN_ID, user_address())
+    with StubServer(chain) as server, WedXSession(None, USER_PRIVATE_KEY, {CHAIN_ID: server.url, 1: 'http://127.0.0.1:1'}) as session:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = session.get_portfolios()
+    good, bad = results[CHAIN_ID], results[1]
+    if not all(isinstance(result, ChainResult) for result in results.values()):
+        return ['session results are not all ChainResult']
+    if not good.ok or not isinstance(good.value, PortfolioSnapshot) or bad.ok or not isinstance(bad.error, Exception):
+        return [f'session results: {good!r}, {bad!r}']
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description='eth_abi decoding of portfolio reads against the typed decoders')
+    parser.add_argument('--portfolios', type=int, default=5000)
+    parser.add_argument('--assets', type=int, default=10)
+    parser.add_argument('--points', type=int, default=30)
+    args = parser.parse_args()
+
+    import json
+    with open(NETWORK_DATA) as f:
+        codec = AbiCodec(json.load(f)['base'])
+    trader_data, distributions, addresses = make_results(args.portfolios, args.assets, args.points)
+    failures = []
+
+    cases = [
+        ('getTraderData, all fields', trader_data,
+         lambda data: codec.decode_result('abiWEDXManager', 'getTraderData', data), decode_trader_data),
+        ('getTraderData, leaderboard fields', trader_data,
+         lambda data: codec.decode_result('abiWEDXManager', 'getTraderData', data),
+         trader_data_decoder(('performances', 'timestamps', 'init_timestamp'))),
+        ('getActualDistribution', distributions,
+         lambda data: codec.decode_result('abiWEDXPro', 'getActualDistribution', data), decode_uint_array),
+        ('getAddresses', addresses,
+         lambda data: codec.decode_result('abiWEDXPro', 'getAddresses', data), decode_address_array),
+    ]
+    for name, payloads, old, new in cases:
+        old_s, old_mem, old_results = measure(old, payloads)
+        new_s, new_mem, new_results = measure(new, payloads)
+        print(f"{name:34s} x{len(payloads)}: eth_abi {old_s * 1000:7.1f} ms, {old_mem / 1e6:6.2f} MB | "
+              f"typed {new_s * 1000:7.1f} ms, {new_mem / 1e6:6.2f} MB ({old_s / new_s:4.1f}x faster, {old_mem / new_mem:4.1f}x smaller)")
+        for old_value, new_value in zip(old_results, new_results):
+            if name.startswith('getTraderData'):
+                fields = [i for i, value in enumerate(new_value) if value is not None]
+                same = all(list(old_value[i]) == list(new_value[i]) if i < 6 else old_value[i] == new_value[i] for i in fields)
+            else:
+                same = list(old_value) == list(new_value)
+            if not same:
+                failures.append(f'{name}: typed result differs from eth_abi')
+                break
+
+    # Values above 64 bits fall back to Python ints
+    big = [2 ** 64, 5, 2 ** 200]
+    if list(decode_uint_array(encode(['uint256[]'], [big]))) != big:
+        failures.append('uint256 values above 64 bits')
+    try:
+        decode_trader_data(trader_data[0][:100])
+        failures.append('truncated getTraderData decoded without an error')
+    except ValueError:
+        pass
+
+    # Old dict and list habits still work on the typed results
+    snapshot = PortfolioSnapshot(CHAIN_ID, 1, None, 0, 5, distribution=decode_uint_array(distributions[0]))
+    if 'assets' not in snapshot or 'nope' in snapshot or snapshot.get('nope', 1) != 1 or 'supply' not in snapshot.keys():
+        failures.append('PortfolioSnapshot does not behave as a mapping')
+    normalized = WedX.normalize_distribution(types.SimpleNamespace(DISTRO_NORM=10 ** 6), snapshot.distribution)
+    if not isinstance(normalized, list) or sum(normalized) != 10 ** 6:
+        failures.append('normalize_distribution failed on a typed distribution')
+    failures += check_session()
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from bench_wedx import new_wedx, user_address, CHAIN_ID
+from stub_chain import StubChain, StubServer, fake_address
+
+
+def expected_rows(chain):
+    rows = {portfolio: (0, owner) for portfolio, owner in chain.portfolios.items()}
+    rows.update((portfolio, (1, owner)) for portfolio, owner in chain.index_portfolios.items())
+    return rows
+
+
+def check(dataset, chain, label):
+    # Every active Pro and Index portfolio once, with its kind, owner and holdings
+    failures = []
+    rows = {address: (int(kind), owner) for address, kind, owner in zip(dataset.addresses, dataset.kinds, dataset.owners)}
+    if rows != expected_rows(chain):
+        missing = set(expected_rows(chain)) - set(rows)
+        extra = set(rows) - set(expected_rows(chain))
+        failures.append(f'{label}: {len(missing)} portfolio(s) missing, {len(extra)} unexpected, or wrong kind/owner')
+    assets, distribution = chain.state['getAddresses'], chain.state['getActualDistribution']
+    for i in range(len(dataset)):
+        held, weights = dataset.holdings(i)
+        if held != assets or weights.tolist() != distribution:
+            failures.append(f'{label}: holdings of {dataset.addresses[i]} differ from the chain')
+            break
+    return failures
+
+
+def check_parquet(dataset, streamed, path):
+    # The streamed file holds the same rows as the in-memory dataset's export
+    import pyarrow.parquet as pq
+    dataset.to_parquet(path)
+    expected, actual = pq.read_table(path), pq.read_table(streamed)
+    if expected.schema != actual.schema:
+        return ['the streamed Parquet schema differs from the dataset export']
+    if sorted(expected.to_pylist(), key=str) != sorted(actual.to_pylist(), key=str):
+        return ['the streamed Parquet rows differ from the dataset export']
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full portfolio scan and incremental refresh against the stub chain')
+    parser.add_argument('--traders', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.005)
+    args = parser.parse_args()
+
+    failures = []
+    chain = StubChain(CHAIN_ID, user_address(), n_traders=args.traders)
+    # Found only through its creation log: an unranked Index portfolio
+    chain.add_portfolio(fake_address('unranked-owner'), index=True)
+    # A contract created by another factory and a portfolio event from an unknown address are never fetched
+    stranger = fake_address('not-a-portfolio')
+    chain.emit('OwnershipTransferred', stranger, topics=['0x' + '00' * 32, '0x' + '00' * 12 + fake_address('other-factory')[2:].lower()])
+    chain.emit('ProPortfolioDeposited', stranger)
+    filters = []
+    get_logs = chain.rpc_eth_getLogs
+    chain.rpc_eth_getLogs = lambda params: filters.append(params) or get_logs(params)
+
+    with StubServer(chain, latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            wedx = new_wedx(server.url)
+        from scanner import PortfolioScanner
+        state = os.path.join(tmp, 'scan.json')
+        scanner = PortfolioScanner(wedx, path=state)
+
+        chain.reset_counters()
+        start = time.perf_counter()
+        dataset = scanner.scan()
+        scan_s = time.perf_counter() - start
+        scan_trips = chain.round_trips
+        n_index = int(dataset.kinds.sum())
+        print(f"scan: {len(dataset)} portfolios ({len(dataset) - n_index} Pro, {n_index} Index) in {scan_s * 1000:.0f} ms, "
+              f"{scan_trips} round trips")
+        failures += check(dataset, chain, 'scan')
+
+        # Nothing happened: the refresh only looks for events
+        chain.reset_counters()
+        scanner.refresh()
+        idle_trips = chain.round_trips
+
+        # One Index portfolio closed, one new Pro portfolio opened
+        closed = next(iter(chain.index_portfolios))
+        owner = chain.index_portfolios.pop(closed)
+        del chain.index_of[owner]
+        chain.emit('IndexPortfolioWithdrawn', closed)
+        chain.emit('ProPortfolioRebalanced', chain.add_portfolio(fake_address('new-owner')))
+        chain.reset_counters()
+        start = time.perf_counter()
+        dataset = scanner.refresh()
+        refresh_s = time.perf_counter() - start
+        print(f"refresh: {idle_trips} round trip(s) with no events, {chain.round_trips} for 2 changed portfolios "
+              f"in {refresh_s * 1000:.0f} ms")
+        failures += check(dataset, chain, 'refresh')
+        if closed in set(dataset.addresses):
+            failures.append('refresh kept a closed portfolio')
+        if chain.round_trips >= scan_trips:
+            failures.append('refresh took as many round trips as a full scan')
+
+        # Every log query names the deployers or the known portfolios
+        fetched = {log['address'] for log_filter in filters for log in get_logs(log_filter)}
+        if stranger in fetched or any(len(f.get('topics') or []) < 3 and not f.get('address') for f in filters):
+            failures.append('a log query was not filtered by deployer or portfolio address')
+
+        # A new scanner resumes the log search after the saved block and streams to Parquet
+        chain.add_portfolio(fake_address('late-owner'))
+        filters.clear()
+        resumed = PortfolioScanner(wedx, path=state)
+        streamed = os.path.join(tmp, 'streamed.parquet')
+        written = resumed.to_parquet(streamed)
+        starts = [int(f['fromBlock'], 16) if isinstance(f['fromBlock'], str) else f['fromBlock'] for f in filters]
+        print(f"resumed scan: {written} portfolios streamed, logs read from block {min(starts, default=None)} "
+              f"(last scanned {scanner.last_block})")
+        if not starts or min(starts) <= scanner.last_block:
+            failures.append('the resumed scan searched logs before the saved block')
+        if resumed._rows is not None:
+            failures.append('the streamed scan kept its rows in memory')
+        failures += check_parquet(scanner.refresh(), streamed, os.path.join(tmp, 'dataset.parquet'))
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+
+from catalog import SharedCatalog, quality_filter, write_catalog  # noqa: E402
+from stub_chain import make_exchange_data  # noqa: E402
+
+
+def private_kib():
+    # Memory only this process holds (Linux); shared page-cache pages are not counted
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            return sum(int(line.split()[1]) for line in f if line.startswith(('Private_Clean', 'Private_Dirty')))
+    except OSError:
+        return 0
+
+
+def worker(mode, path):
+    before = private_kib()
+    start = time.perf_counter()
+    if mode == 'json':
+        with open(path, 'rb') as f:
+            assets_info = json.loads(f.read())
+        passes = quality_filter()
+        selected = [key for key, record in assets_info.items() if passes(record)][:10]
+        total_tvl = sum(record.get('totalValueLockedUSD', 0) for record in assets_info.values() if isinstance(record, dict))
+    else:
+        catalog = SharedCatalog(path)
+        selected = [catalog.address(i).lowercase for i in catalog.select(limit=10)]
+        total_tvl = float(catalog.tvl_usd.sum())
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'wall_s': elapsed, 'private_kib': private_kib() - before,
+                      'selected': selected, 'total_tvl': total_tvl}))
+
+
+def publisher(path, n_writes):
+    data = make_exchange_data(50, '0x' + '11' * 20)
+    print(json.dumps([write_catalog(path, data) for _ in range(int(n_writes))]))
+
+
+def run_publishers(path, n_publishers, n_writes):
+    procs = [subprocess.Popen([sys.executable, __file__, '--publish', path, str(n_writes)], stdout=subprocess.PIPE, text=True)
+             for _ in range(n_publishers)]
+    return [version for proc in procs for version in json.loads(proc.communicate()[0].strip().splitlines()[-1])]
+
+
+def run_workers(mode, path, n_workers):
+    procs = [subprocess.Popen([sys.executable, __file__, '--worker', mode, path], stdout=subprocess.PIPE, text=True)
+             for _ in range(n_workers)]
+    return [json.loads(proc.communicate()[0].strip().splitlines()[-1]) for proc in procs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-process JSON catalogs against one shared binary catalog')
+    parser.add_argument('--pools', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--worker', nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument('--publish', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker(*args.worker)
+        return 0
+    if args.publish:
+        publisher(*args.publish)
+        return 0
+
+    failures = []
+    data = make_exchange_data(args.pools, '0x' + '11' * 20)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'exchange_data.json')
+        with open(json_path, 'w') as f:
+            json.dump(data, f)
+        binary_path = os.path.join(tmp, 'catalog.bin')
+        start = time.perf_counter()
+        write_catalog(binary_path, data)
+        publish_s = time.perf_counter() - start
+        print(f"{args.pools} pools: JSON {os.path.getsize(json_path) / 1e6:.1f} MB, binary {os.path.getsize(binary_path) / 1e6:.1f} MB "
+              f"(published in {publish_s * 1000:.0f} ms)")
+
+        results = {mode: run_workers(mode, path, args.workers) for mode, path in (('json', json_path), ('attach', binary_path))}
+        for mode, runs in results.items():
+            wall = sorted(run['wall_s'] for run in runs)[len(runs) // 2]
+            private = max(run['private_kib'] for run in runs)
+            print(f"{mode:6s} x{args.workers}: median {wall * 1000:8.2f} ms, "
+                  f"private memory {private / 1024:7.1f} MB per worker")
+        if any(run['selected'] != results['json'][0]['selected'] for run in results['attach']):
+            failures.append('attached workers selected different pools')
+        if any(abs(run['total_tvl'] - results['json'][0]['total_tvl']) > 1e-6 * results['json'][0]['total_tvl'] for run in results['attach']):
+            failures.append('attached workers see different TVLs')
+
+        # A refresh while attached: swap in a new version, the old arrays stay readable
+        catalog = SharedCatalog(binary_path)
+        old_scores = catalog.gt_score
+        data[next(iter(data))]['gtScore'] = 12.5
+        write_catalog(binary_path, data)
+        start = time.perf_counter()
+        swapped = catalog.refresh()
+        refresh_s = time.perf_counter() - start
+        print(f"refresh to version {catalog.version}: {refresh_s * 1e6:.0f} us, old arrays still readable: {len(old_scores) == args.pools}")
+        if not swapped or catalog.version != 2 or catalog.gt_score[0] != 12.5 or catalog.refresh():
+            failures.append('refresh did not attach exactly once to the new version')
+
+        # Concurrent publishers of one path never reuse a version
+        shared_path = os.path.join(tmp, 'published.bin')
+        versions = run_publishers(shared_path, args.workers, 25)
+        with SharedCatalog(shared_path) as published:
+            final = published.version
+        print(f"{args.workers} concurrent publishers x 25 writes: {len(set(versions))} distinct versions, last {final}")
+        if sorted(versions) != list(range(1, len(versions) + 1)) or final != len(versions):
+            failures.append('concurrent publishers reused a catalog version')
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import argparse
+import contextlib
+import io
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_wedx import new_wedx, user_address, CHAIN_ID, USER_PRIVATE_KEY
+from stub_chain import StubChain, StubServer, fake_address
+
+TOKEN = 'bench-token'
+
+
+def tx_to(to, nonce):
+    return {'chainId': CHAIN_ID, 'to': to, 'data': '0x', 'value': 0, 'gas': 100_000, 'gasPrice': 10 ** 9, 'nonce': nonce}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local signing against the socket signer, with its access checks')
+    parser.add_argument('--txs', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    failures = []
+    chain = StubChain(CHAIN_ID, user_address())
+    with StubServer(chain) as rpc, tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            wedx = new_wedx(rpc.url)
+        from signer import LocalSigner, SignerServer, SocketSigner
+        local = LocalSigner(USER_PRIVATE_KEY)
+        allowed = wedx.contract_addresses()
+        if chain.pro not in allowed or chain.deployer not in allowed:
+            failures.append('contract_addresses() misses the portfolio or the deployer')
+
+        path = os.path.join(tmp, 'signer.sock')
+        server = SignerServer(local, path, TOKEN, allowed_to=allowed)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            if stat.S_IMODE(os.stat(path).st_mode) != 0o600:
+                failures.append(f'socket mode is {oct(stat.S_IMODE(os.stat(path).st_mode))}')
+
+            remote = SocketSigner(path, TOKEN)
+            txs = [tx_to(chain.pro, nonce) for nonce in range(args.txs)]
+            start = time.perf_counter()
+            expected = [bytes(local.sign_transaction(tx)) for tx in txs]
+            local_s = time.perf_counter() - start
+            # Threads share one connection; each must get its own signature back
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.threads) as pool:
+                signed = [bytes(raw) for raw in pool.map(remote.sign_transaction, txs)]
+            socket_s = time.perf_counter() - start
+            print(f"{args.txs} signatures: local {local_s * 1000:.0f} ms, socket from {args.threads} threads "
+                  f"{socket_s * 1000:.0f} ms")
+            if signed != expected:
+                failures.append('threads sharing a SocketSigner got mixed-up signatures')
+
+            for name, attempt in (
+                ('wrong token', lambda: SocketSigner(path, 'not-the-token')),
+                ('disallowed address', lambda: remote.sign_transaction(tx_to(fake_address('elsewhere'), 0))),
+                ('contract creation', lambda: remote.sign_many([dict(tx_to(chain.pro, 0), to='')])),
+                ('TCP without opt-in', lambda: SignerServer(local, ('127.0.0.1', 0), TOKEN, allowed_to=allowed)),
+            ):
+                try:
+                    attempt()
+                    failures.append(f'{name} was accepted')
+                except ValueError:
+                    pass
+            remote.close()
+        finally:
+            server.shutdown()
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import argparse
+import contextlib
+import io
+import sys
+import time
+
+from bench_wedx import new_wedx, user_address, CHAIN_ID
+from stub_chain import StubChain, StubServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sequential against parallel simulation, with reverts and node errors')
+    parser.add_argument('--latency', type=float, default=0.005)
+    args = parser.parse_args()
+
+    failures = []
+    chain = StubChain(CHAIN_ID, user_address())
+    with StubServer(chain, latency=args.latency) as server:
+        with contextlib.redirect_stdout(io.StringIO()):
+            wedx = new_wedx(server.url)
+        assets = wedx.get_assets_addresses()[:-1]
+        distribution = wedx.normalize_distribution([1.0] * len(assets) + [0.0])
+        with wedx.simulator.collect() as planned:
+            wedx.withdraw_from_lending(assets)
+            wedx.set_portfolio(assets, distribution)
+            wedx.earn_with_lending(assets)
+            wedx.deposit_eth(1)
+            wedx.rank_me()
+
+        start = time.perf_counter()
+        sequential = [wedx.simulator.simulate(tx) for tx in planned]
+        sequential_s = time.perf_counter() - start
+        start = time.perf_counter()
+        parallel = wedx.simulator.simulate_many(planned)
+        parallel_s = time.perf_counter() - start
+        print(f"{len(planned)} writes: sequential {sequential_s * 1000:.1f} ms, parallel {parallel_s * 1000:.1f} ms")
+        if [result.success for result in sequential] != [result.success for result in parallel]:
+            failures.append('parallel and sequential simulation disagree')
+
+        # A revert and a node error are predicted failures; the other results are kept
+        chain.reverts['rankMe'] = 'Not enough interactions'
+        chain.rpc_errors['deposit'] = (-32000, 'insufficient funds for gas * price + value')
+        try:
+            results = wedx.simulator.simulate_many(planned)
+        except Exception as error:
+            failures.append(f'simulate_many raised {error!r}')
+            results = []
+        finally:
+            chain.reverts.clear()
+            chain.rpc_errors.clear()
+        for result in results:
+            print(f"  {result}")
+        if results and ([result.success for result in results] != [True, True, True, False, False]
+                        or 'insufficient funds' not in results[3].revert_reason
+                        or results[4].revert_reason != 'Not enough interactions'):
+            failures.append('a revert or node error was not reported as a predicted failure')
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
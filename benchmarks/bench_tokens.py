@@ -0,0 +1,122 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from bench_wedx import new_wedx, user_address, CHAIN_ID
+from stub_chain import RpcError, StubChain, StubServer
+
+
+def catalog_tokens(chain):
+    tokens = []
+    for info in chain.exchange_data.values():
+        tokens.extend(token['id'] for token in info.get('inputTokens', []))
+    return list(dict.fromkeys(tokens))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-token ERC-20 reads against the persistent token index')
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--pools', type=int, default=200)
+    args = parser.parse_args()
+
+    failures = []
+    chain = StubChain(CHAIN_ID, user_address(), n_pools=args.pools)
+    with StubServer(chain, latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            wedx = new_wedx(server.url)
+        from tokens import TokenIndex, _decode_symbol
+        from addresses import to_address
+        from valuation import ValuationEngine
+        from eth_abi import encode
+        tokens = catalog_tokens(chain)
+        abi = wedx.network[wedx.get_chain_name()]['abiWEDXPay']
+
+        chain.reset_counters()
+        start = time.perf_counter()
+        for token in tokens:
+            contract = wedx.w3.eth.contract(address=wedx.w3.to_checksum_address(token), abi=abi)
+            contract.functions.decimals().call()
+            contract.functions.symbol().call()
+        per_token = time.perf_counter() - start
+        print(f"{len(tokens)} tokens, per-token calls : {per_token * 1000:8.1f} ms, {chain.round_trips} round trips")
+
+        path = os.path.join(tmp, 'tokens.json')
+        chain.reset_counters()
+        start = time.perf_counter()
+        index = TokenIndex(wedx, path)
+        index.fill(tokens)
+        cold = time.perf_counter() - start
+        print(f"{len(tokens)} tokens, index cold fill  : {cold * 1000:8.1f} ms, {chain.round_trips} round trips")
+
+        chain.reset_counters()
+        start = time.perf_counter()
+        index = TokenIndex(wedx, path)
+        decimals = index.decimals_array(tokens)
+        symbols = [index.symbol(token) for token in tokens]
+        warm = time.perf_counter() - start
+        print(f"{len(tokens)} tokens, index from disk  : {warm * 1000:8.1f} ms, {chain.round_trips} round trips")
+        if chain.round_trips:
+            failures.append('lookups after a restart went to the chain')
+        expected = [6 if int(token, 16) % 3 == 0 else 18 for token in tokens]
+        if list(decimals) != expected or symbols != ['T' + token[2:6].upper() for token in tokens]:
+            failures.append('decimals or symbols differ from the chain')
+
+        mismatches = index.verify_catalog(chain.exchange_data)
+        print(f"catalog check: {sum(1 for m in mismatches if m[1] == 'decimals')} decimals and "
+              f"{sum(1 for m in mismatches if m[1] == 'symbol')} symbols differ from the chain")
+
+        # Valuation with on-chain decimals: no extra round trips once the index is filled
+        engine = ValuationEngine(wedx)
+        engine.value()
+        chain.reset_counters()
+        engine.value()
+        plain_trips = chain.round_trips
+        engine = ValuationEngine(wedx, tokens=index)
+        engine.value()
+        chain.reset_counters()
+        engine.value()
+        print(f"valuation round trips: {plain_trips} with catalog decimals, {chain.round_trips} with the token index")
+        if chain.round_trips != plain_trips:
+            failures.append('valuation with the token index made extra round trips')
+
+        # A rate limit is not a revert: the token is not stored and is asked again
+        fresh = [tokens[0], tokens[1]]
+        index = TokenIndex(wedx, os.path.join(tmp, 'errors.json'))
+        decimals_state = chain.state['decimals']
+
+        def limited(tx):
+            if tx['to'].lower() == fresh[0].lower():
+                raise RpcError(-32005, 'rate limit exceeded')
+            return decimals_state(tx)
+        chain.state['decimals'] = limited
+        try:
+            index.fill(fresh)
+            failures.append('a rate-limited token did not raise')
+        except ValueError as error:
+            print(f"rate-limited fill: {error}")
+        chain.state['decimals'] = decimals_state
+        if fresh[0] in index.entries or fresh[1] not in index.entries:
+            failures.append('a rate-limited token was stored, or the rest of the batch was not')
+        if index.decimals(fresh[0]) != expected[0]:
+            failures.append('a rate-limited token was not read again')
+        # A revert is stored as None and not asked again
+        chain.reverts['decimals'] = 'not a token'
+        index.fill([tokens[2]])
+        del chain.reverts['decimals']
+        if index.entries[to_address(tokens[2])][0] is not None:
+            failures.append('a reverting token was not stored as None')
+
+        if _decode_symbol(b'MKR'.ljust(32, b'\0')) != 'MKR' or _decode_symbol(encode(['string'], ['WETH'])) != 'WETH':
+            failures.append('symbol decoding')
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
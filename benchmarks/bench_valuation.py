@@ -0,0 +1,93 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+
+from valuation import ValuationEngine  # noqa: E402
+from bench_wedx import new_wedx, user_address, CHAIN_ID  # noqa: E402
+from stub_chain import StubChain, StubServer  # noqa: E402
+
+
+def loop_sums(values, offsets):
+    return np.array([float(sum(values[offsets[i]:offsets[i + 1]])) for i in range(len(offsets) - 1)])
+
+
+def check_chain():
+    # NAV is getAssetsExtended (stored plus lent on the stub) at the price; the lent part is not counted twice
+    chain = StubChain(CHAIN_ID, user_address())
+    with StubServer(chain) as server:
+        with contextlib.redirect_stdout(io.StringIO()):
+            wedx = new_wedx(server.url)
+        assets = chain.state['getAddresses']
+        prices = {asset: float(i + 1) for i, asset in enumerate(assets)}
+        engine = ValuationEngine(wedx, prices=prices)
+        engine.refresh_prices({})
+        valuation = engine.value([chain.pro])
+        stored = chain.state['getStoredAssets']
+        lent = [chain.state['getAmountLendToken'](None, asset) for asset in assets]
+        nav = sum((s + l) * prices[asset] / 1e18 for asset, s, l in zip(assets, stored, lent))
+        lent_nav = sum(l * prices[asset] / 1e18 for asset, l in zip(assets, lent))
+    print(f"stub portfolio: NAV {valuation.nav[0]:.2f} (expected {nav:.2f}), lending share {valuation.lending_share[0]:.4f}")
+    failures = []
+    if not np.isclose(valuation.nav[0], nav) or not np.isclose(valuation.lent_value[0], lent_nav):
+        failures.append(f'stub portfolio: NAV {valuation.nav[0]} and lent {valuation.lent_value[0]}, expected {nav} and {lent_nav}')
+    if valuation.held.tolist() != [float(amount) for amount in stored] or valuation.lent.tolist() != [float(amount) for amount in lent]:
+        failures.append('stub portfolio: held and lent columns do not split the extended amounts')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-portfolio NAV sums against a Python loop, with empty portfolios')
+    parser.add_argument('--portfolios', type=int, default=20000)
+    args = parser.parse_args()
+
+    failures = []
+    cases = {
+        'empty middle and trailing': ([1, 2, 4, 8], [0, 3, 3, 4, 4]),
+        'trailing empty': ([1, 2, 4], [0, 3, 3]),
+        'leading empty': ([1, 2, 4], [0, 0, 3]),
+        'all empty': ([], [0, 0, 0]),
+        'no portfolios': ([], [0]),
+    }
+    for name, (values, offsets) in cases.items():
+        values = np.array(values, dtype=np.float64)
+        offsets = np.array(offsets, dtype=np.int64)
+        totals = ValuationEngine._sum_rows(values, offsets)
+        if not np.array_equal(totals, loop_sums(values, offsets)):
+            failures.append(f'{name}: {totals.tolist()} instead of {loop_sums(values, offsets).tolist()}')
+
+    # A fleet with every third portfolio empty, the last one included
+    rng = np.random.default_rng(0)
+    counts = rng.integers(1, 15, args.portfolios)
+    counts[::3] = 0
+    counts[-1] = 0
+    offsets = np.zeros(args.portfolios + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    values = rng.random(offsets[-1])
+    start = time.perf_counter()
+    totals = ValuationEngine._sum_rows(values, offsets)
+    vector_s = time.perf_counter() - start
+    start = time.perf_counter()
+    expected = loop_sums(values, offsets)
+    loop_s = time.perf_counter() - start
+    print(f"{args.portfolios} portfolios ({int((counts == 0).sum())} empty): loop {loop_s * 1000:.1f} ms, "
+          f"reduceat {vector_s * 1000:.2f} ms")
+    if not np.allclose(totals, expected):
+        failures.append('fleet sums differ from the loop')
+
+    failures += check_chain()
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
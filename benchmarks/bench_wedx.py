@@ -0,0 +1,235 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BENCH_DIR, '..', 'src'))
+sys.path.append(BENCH_DIR)
+
+from stub_chain import StubChain, StubServer  # noqa: E402
+
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+CHAIN_ID = 8453
+USER_PRIVATE_KEY = '0x' + '11' * 32
+
+
+def user_address():
+    from eth_account import Account
+    return Account.from_key(USER_PRIVATE_KEY).address
+
+
+def new_wedx(url):
+    # Runs from src, as the examples do; the network data path no longer depends on it
+    sys.path.insert(0, SRC_DIR)
+    os.chdir(SRC_DIR)
+    from wedx import WedX
+    wedx = WedX(CHAIN_ID, user_address(), USER_PRIVATE_KEY, {CHAIN_ID: url})
+    wedx.data_url = url
+    return wedx
+
+
+def create_tvlw_portfolio(wedx):
+    # Same selection as examples/traderProTVLWBase.py
+    assets_info = wedx.get_assets_info()
+    assets = []
+    for key in assets_info.keys():
+        if 'inputTokens' in assets_info[key].keys():
+            if assets_info[key]['inputTokens'][0]['symbol'] == 'WETH':
+                asset = assets_info[key]['inputTokens'][1]['id']
+            else:
+                asset = assets_info[key]['inputTokens'][0]['id']
+            if assets_info[key]['gtScore'] >= 75.0 and assets_info[key]['totalValueLockedUSD'] >= 500_000 and assets_info[key]['whitelisted'] == True and len(assets_info[key]['websites']) > 0:
+                assets.append(asset)
+            if len(assets) == 10:
+                break
+
+    tvls = [float(assets_info[asset]['totalValueLockedUSD']) for asset in assets]
+    assets = [wedx.w3.to_checksum_address(asset) for asset in assets]
+    distribution = tvls + [0.0]
+    return assets, wedx.normalize_distribution(distribution)
+
+
+def rebalance_cycle(wedx):
+    # Same check-and-rebalance flow as the TVLW examples, without the sleeps
+    wedx.get_trading_account_address()
+    current_distro = wedx.get_distribution()
+    current_assets = wedx.get_assets_addresses()
+    new_assets, new_distribution = create_tvlw_portfolio(wedx)
+    native_asset = wedx.network[wedx.get_chain_name()]['wrap_address']
+    threshold = 1.5 * wedx.get_distribution_threshold()
+    update = wedx.are_distributions_different(current_distro, current_assets, new_distribution, new_assets + [native_asset], threshold)
+    trader_data = wedx.get_trader_data()
+    required_interactions = wedx.get_required_interactions()
+    if update:
+        wedx.set_portfolio(new_assets, new_distribution)
+        trader_data = wedx.get_trader_data()
+        if len(trader_data[3]) == required_interactions:
+            wedx.rank_me()
+    wedx.get_user_score()
+
+
+def simulate_rebalance(wedx, assets, distribution):
+    with wedx.simulator.collect() as planned:
+        wedx.withdraw_from_lending(assets)
+        wedx.set_portfolio(assets, distribution)
+        wedx.earn_with_lending(assets)
+    return wedx.simulator.simulate_many(planned)
+
+
+def read_leaderboard(wedx):
+    from leaderboard import Leaderboard
+    return Leaderboard(wedx).read()
+
+
+def value_portfolio(wedx):
+    from valuation import ValuationEngine
+    return ValuationEngine(wedx).value()
+
+
+def execute_rebalance_plan(wedx, assets, distribution):
+    from rebalance import RebalancePlan
+    return RebalancePlan.rebalance(wedx, assets, assets, distribution).execute()
+
+
+def operations(wedx):
+    assets = wedx.get_assets_addresses()[:-1]
+    distribution = wedx.normalize_distribution([1.0] * len(assets) + [0.0])
+    return {
+        'get_trading_account_address': lambda: wedx.get_trading_account_address(),
+        'get_distribution': lambda: wedx.get_distribution(),
+        'get_assets_addresses': lambda: wedx.get_assets_addresses(),
+        'get_trader_data': lambda: wedx.get_trader_data(),
+        'get_user_score': lambda: wedx.get_user_score(),
+        'get_assets_info': lambda: wedx.get_assets_info(),
+        'get_portfolio_snapshot': lambda: wedx.get_portfolio_snapshot(),
+        'set_portfolio': lambda: wedx.set_portfolio(assets, distribution),
+        'earn_with_lending': lambda: wedx.earn_with_lending(assets),
+        'withdraw_from_lending': lambda: wedx.withdraw_from_lending(assets),
+        'rank_me': lambda: wedx.rank_me(),
+        'simulate_rebalance': lambda: simulate_rebalance(wedx, assets, distribution),
+        'leaderboard': lambda: read_leaderboard(wedx),
+        'valuation': lambda: value_portfolio(wedx),
+        'rebalance_plan': lambda: execute_rebalance_plan(wedx, assets, distribution),
+    }
+
+
+def measure_operations(chain, wedx):
+    results = {}
+    for name, op in operations(wedx).items():
+        chain.reset_counters()
+        start = time.perf_counter()
+        op()
+        elapsed = time.perf_counter() - start
+        results[name] = {'rpc_calls': sum(chain.calls.values()), 'round_trips': chain.round_trips, 'wall_s': elapsed, 'methods': dict(chain.calls)}
+    return results
+
+
+def measure_cycle(chain, wedx, repeats):
+    times = []
+    for _ in range(repeats):
+        chain.reset_counters()
+        start = time.perf_counter()
+        rebalance_cycle(wedx)
+        times.append(time.perf_counter() - start)
+    return {'rpc_calls': sum(chain.calls.values()), 'round_trips': chain.round_trips, 'wall_s': statistics.median(times), 'methods': dict(chain.calls)}
+
+
+def startup_probe(url):
+    # Runs in a fresh interpreter so import cost is measured cold
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        new_wedx(url)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    print(json.dumps({'wall_s': elapsed, 'peak_kib': peak / 1024}))
+
+
+def measure_startup(url, probes=3):
+    # Best of a few cold starts, the first one also pays for the OS file cache
+    samples = []
+    for _ in range(probes):
+        out = subprocess.run([sys.executable, __file__, '--startup-probe', url], capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return min(samples, key=lambda sample: sample['wall_s'])
+
+
+def run(latency, repeats, n_pools):
+    chain = StubChain(CHAIN_ID, user_address(), n_pools=n_pools)
+    with StubServer(chain, latency=latency) as server:
+        results = {'config': {'latency_s': latency, 'repeats': repeats, 'n_pools': n_pools}}
+        results['startup'] = measure_startup(server.url)
+        with contextlib.redirect_stdout(io.StringIO()):
+            wedx = new_wedx(server.url)
+            results['operations'] = measure_operations(chain, wedx)
+            results['cycle'] = measure_cycle(chain, wedx, repeats)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # RPC and round-trip counts must not grow at all; timings and memory may drift within the tolerance
+    failures = []
+    entries = [(name, current, baseline['operations'].get(name)) for name, current in results['operations'].items()]
+    entries.append(('cycle', results['cycle'], baseline['cycle']))
+    for name, current, previous in entries:
+        if not previous:
+            continue
+        for key in ('rpc_calls', 'round_trips'):
+            if key in previous and current[key] > previous[key]:
+                failures.append(f"{name}: {current[key]} {key}, baseline {previous[key]}")
+    for section, key in (('cycle', 'wall_s'), ('startup', 'wall_s'), ('startup', 'peak_kib')):
+        limit = baseline[section][key] * (1 + tolerance)
+        if results[section][key] > limit:
+            failures.append(f"{section} {key}: {results[section][key]:.4f}, limit {limit:.4f}")
+    return failures
+
+
+def report(results):
+    print(f"startup: {results['startup']['wall_s'] * 1000:.1f} ms, peak {results['startup']['peak_kib']:.0f} KiB")
+    for name, op in results['operations'].items():
+        print(f"{name:32s} {op['rpc_calls']:4d} calls {op['round_trips']:4d} trips {op['wall_s'] * 1000:9.2f} ms")
+    cycle = results['cycle']
+    print(f"{'rebalance cycle':32s} {cycle['rpc_calls']:4d} calls {cycle['round_trips']:4d} trips {cycle['wall_s'] * 1000:9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark WedX hot paths against a local JSON-RPC stand-in')
+    parser.add_argument('--latency', type=float, default=0.005, help='injected latency per request in seconds')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--pools', type=int, default=200, help='entries in the synthetic exchange data')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown before failing')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--startup-probe', metavar='URL', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.startup_probe:
+        startup_probe(args.startup_probe)
+        return 0
+
+    results = run(args.latency, args.repeats, args.pools)
+    report(results)
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Baseline saved to {args.baseline}')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    failures = compare(results, baseline, args.tolerance)
+    for failure in failures:
+        print(f'REGRESSION {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_wedx import SRC_DIR, USER_PRIVATE_KEY, user_address, CHAIN_ID
+from stub_chain import StubChain, StubServer
+
+CLI = os.path.join(SRC_DIR, 'wedx_cli.py')
+EXAMPLES_DIR = os.path.abspath(os.path.join(SRC_DIR, '..', 'examples'))
+
+
+def write_config(directory, url):
+    config = {
+        'interval': 0,
+        'rpcs': {str(CHAIN_ID): url},
+        'data_url': url,
+        'strategies': [
+            {'name': 'EW', 'chain_id': CHAIN_ID, 'run': 'strategies:equal_weighted'},
+            {'name': 'TVLW', 'chain_id': CHAIN_ID, 'run': 'strategies:tvl_weighted'},
+        ],
+    }
+    # Strategy modules are looked up next to the config file
+    shutil.copy(os.path.join(EXAMPLES_DIR, 'strategies.py'), directory)
+    path = os.path.join(directory, 'worker.json')
+    with open(path, 'w') as f:
+        json.dump(config, f)
+    return path
+
+
+def cli(args, cwd):
+    env = dict(os.environ, USER_ADDRESS=user_address(), USER_PRIVATE_KEY=USER_PRIVATE_KEY)
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, CLI, 'run'] + args, capture_output=True, text=True, env=env, cwd=cwd)
+    if out.returncode != 0:
+        raise ValueError(out.stderr[-2000:])
+    return time.perf_counter() - start, out.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cron-style cold runs against the warm wedx worker')
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--cycles', type=int, default=5)
+    args = parser.parse_args()
+
+    failures = []
+    chain = StubChain(CHAIN_ID, user_address())
+    with StubServer(chain, latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        config_path = write_config(tmp, server.url)
+
+        # One fresh process per cycle, as examples/script.sh does
+        cold = []
+        for _ in range(args.cycles):
+            elapsed, stdout = cli([config_path, '--once'], tmp)
+            cold.append(elapsed)
+            if 'failed' in stdout:
+                failures.append('cold cycle: ' + stdout)
+
+        sys.path.insert(0, SRC_DIR)
+        from wedx_cli import Worker, format_cycle, load_config
+        reports = []
+        os.environ.update(USER_ADDRESS=user_address(), USER_PRIVATE_KEY=USER_PRIVATE_KEY)
+        with contextlib.redirect_stdout(io.StringIO()):
+            worker = Worker(load_config(config_path))
+            worker.run(on_cycle=lambda report: (reports.append(report), worker.stop.set() if len(reports) == args.cycles else None))
+            worker.close()
+        print(f"cold process per cycle: median {sorted(cold)[len(cold) // 2] * 1000:8.1f} ms")
+        warm = sorted(report['wall_s'] for report in reports[1:])
+        print(f"warm worker, first     : {reports[0]['wall_s'] * 1000:8.1f} ms")
+        print(f"warm worker, later     : median {warm[len(warm) // 2] * 1000:8.1f} ms")
+        print(format_cycle(reports[-1]))
+        failures += [f"{name}: {status}" for report in reports for name, status, _ in report['strategies'] if status != 'ok']
+        catalogs = reports[-1]['phases'].get('catalog', (0, 0))[1]
+        if catalogs != 2:
+            failures.append(f"{catalogs} catalog reads in a cycle, expected 2 (one fetch, one cached)")
+
+        _, stdout = cli([config_path, '--once', '--profile', os.path.join(tmp, 'w.prof'), '--trace', os.path.join(tmp, 'w.txt')], tmp)
+        for name in ('w.prof', 'w.txt'):
+            if not os.path.getsize(os.path.join(tmp, name)):
+                failures.append(f"{name} is empty")
+        if 'phases:' not in stdout or 'cumulative' not in stdout:
+            failures.append('profile or phase report missing')
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+
+from bench_wedx import new_wedx, user_address, CHAIN_ID
+from stub_chain import StubChain, StubServer, StubWebSocketServer
+
+
+def block_start(chain, number):
+    return chain.genesis + (number - chain.block_offset) * chain.block_time
+
+
+def measure_confirmations(chain, wedx, n_txs):
+    # Delay between a transaction's block being produced and WedX returning its receipt
+    delays = []
+    chain.reset_counters()
+    for _ in range(n_txs):
+        receipt = wedx.rank_me()
+        delays.append(time.time() - block_start(chain, receipt['blockNumber']))
+    return {
+        'median_ms': statistics.median(delays) * 1000,
+        'max_ms': max(delays) * 1000,
+        'receipt_reads_per_tx': chain.calls['eth_getTransactionReceipt'] / n_txs,
+        'round_trips_per_tx': chain.round_trips / n_txs,
+    }
+
+
+def check_reconnect(chain, ws_server, wedx, outage):
+    # Logs and blocks produced while the socket is down must still arrive, exactly once
+    logs, blocks = [], []
+    wedx.subscribe_events(logs.append, addresses=[chain.pro])
+    wedx.w3.provider.follower.on_block(blocks.append)
+    time.sleep(0.2)
+
+    emitted = 0
+    first = chain.block_number
+    chain.emit('ProPortfolioRebalanced', chain.pro)
+    emitted += 1
+    time.sleep(0.2)
+    ws_server.outage(outage)
+    for _ in range(3):
+        chain.emit('ProPortfolioDeposited', chain.pro)
+        emitted += 1
+        time.sleep(outage / 4)
+    time.sleep(outage)
+    chain.emit('ProPortfolioWithdrawn', chain.pro)
+    emitted += 1
+    last = chain.block_number
+    deadline = time.time() + 10
+    while time.time() < deadline and (len(logs) < emitted or not blocks or blocks[-1] < last):
+        time.sleep(0.05)
+
+    failures = []
+    seen = [block for block in blocks if first < block <= last]
+    if seen != list(range(first + 1, last + 1)):
+        missing = sorted(set(range(first + 1, last + 1)) - set(seen))
+        failures.append(f"blocks not delivered in order without gaps (missing {missing})")
+    keys = [(log['blockNumber'], log['logIndex']) for log in logs]
+    if len(keys) != emitted or len(set(keys)) != emitted:
+        failures.append(f"{len(keys)} logs delivered ({len(set(keys))} distinct), {emitted} emitted")
+    if wedx.w3.provider.connection.reconnects < 1:
+        failures.append("connection was not re-established")
+    return failures
+
+
+def check_dropped_send(chain, ws_server, wedx):
+    # The node takes the transaction, then the connection drops before it answers
+    sent = len(chain.sent)
+    ws_server.drop_after.add('eth_sendRawTransaction')
+    try:
+        receipt = wedx.rank_me()
+    except Exception as error:
+        return [f"a transaction broadcast before the drop was reported as failed: {error}"]
+    failures = []
+    if len(chain.sent) - sent != 1 or receipt['status'] != 1:
+        failures.append(f"{len(chain.sent) - sent} transactions sent for one write after a drop")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Confirmation latency over HTTP polling and WebSocket push, plus a reconnect check')
+    parser.add_argument('--block-time', type=float, default=0.5)
+    parser.add_argument('--latency', type=float, default=0.005, help='injected latency per request in seconds')
+    parser.add_argument('--txs', type=int, default=5)
+    parser.add_argument('--outage', type=float, default=1.0, help='seconds the WebSocket server stays down')
+    args = parser.parse_args()
+
+    chain = StubChain(CHAIN_ID, user_address(), block_time=args.block_time)
+    with StubServer(chain, latency=args.latency) as http, StubWebSocketServer(chain, latency=args.latency) as ws:
+        with contextlib.redirect_stdout(io.StringIO()):
+            http_wedx = new_wedx(http.url)
+            ws_wedx = new_wedx(ws.url)
+            ws_wedx.data_url = http.url
+            results = {
+                'http': measure_confirmations(chain, http_wedx, args.txs),
+                'ws': measure_confirmations(chain, ws_wedx, args.txs),
+            }
+            failures = check_reconnect(chain, ws, ws_wedx, args.outage)
+            failures += check_dropped_send(chain, ws, ws_wedx)
+        ws_wedx.w3.provider.disconnect()
+
+    for transport, result in results.items():
+        print(f"{transport:5s} confirmation delay median {result['median_ms']:7.1f} ms, max {result['max_ms']:7.1f} ms, "
+              f"{result['receipt_reads_per_tx']:.1f} receipt reads/tx, {result['round_trips_per_tx']:.1f} round trips/tx")
+    for failure in failures:
+        print(f'FAILED {failure}')
+    if not failures:
+        print('reconnect: all blocks and logs delivered once, a send cut off by a drop confirmed once')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,595 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+
+import rlp
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_utils import event_abi_to_log_topic, function_abi_to_4byte_selector, keccak, to_checksum_address
+from eth_utils.abi import get_abi_input_types, get_abi_output_types
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.server import serve
+
+NETWORK_DATA = os.path.join(os.path.dirname(__file__), '..', 'network_data', 'network_data_v1.json')
+
+CHAIN_NAMES = {1: "ethereum", 8453: "base", 42161: "arbitrum"}
+
+
+def fake_address(label):
+    return to_checksum_address(keccak(text=label)[-20:])
+
+
+def make_exchange_data(n_pools, wrap_address):
+    # Synthetic stand-in for app.wedefin.com/exchange_data_{chain}.json, keyed by token address
+    data = {}
+    for i in range(n_pools):
+        token = fake_address(f'token-{i}').lower()
+        data[token] = {
+            'id': token,
+            'inputTokens': [
+                {'id': token, 'symbol': f'TKN{i}', 'decimals': 18},
+                {'id': wrap_address.lower(), 'symbol': 'WETH', 'decimals': 18},
+            ],
+            'gtScore': 60.0 + (i * 7) % 40,
+            'totalValueLockedUSD': 250_000 + 97_531 * ((i * 13) % 50),
+            'tokenPriceUSD': 0.5 + (i % 17),
+            'whitelisted': i % 5 != 4,
+            'websites': [f'https://token{i}.example'] if i % 3 else [],
+        }
+    data['lastUpdate'] = {'timestamp': 1700000000}
+    return data
+
+
+class StubChain:
+    """In-memory chain state answering the JSON-RPC methods WedX uses."""
+
+    def __init__(self, chain_id=8453, user_address=None, n_assets=10, n_pools=200, n_traders=50, block_time=0.0):
+        self.chain_id = chain_id
+        self.chain_name = CHAIN_NAMES[chain_id]
+        with open(NETWORK_DATA) as f:
+            self.network = json.load(f)[self.chain_name]
+
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.round_trips = 0
+        self.block_time = block_time
+        self.genesis = time.time()
+        self.block_offset = 1000
+        self.nonces = Counter()
+        self.sender_blocks = {}
+        self.receipts = {}
+        self.sent = []
+        self.block_txs = {}
+        self.base_fee = lambda number: 10 ** 8
+        self.reverts = {}
+        # Function name → (code, message) of a node error that is not a revert
+        self.rpc_errors = {}
+        # Function names that pass eth_call and estimateGas but revert once mined
+        self.mined_reverts = set()
+        self.logs = []
+
+        self.group = to_checksum_address(self.network['contractWEDXGroup'])
+        self.deployer = fake_address('deployer-pro')
+        self.deployer_index = fake_address('deployer-index')
+        self.manager = fake_address('manager')
+        self.pro = fake_address('pro-portfolio')
+        self.user_address = user_address
+
+        assets = [fake_address(f'token-{i}') for i in range(n_assets)]
+        assets.append(to_checksum_address(self.network['wrap_address']))
+        distro = [10 ** 6 // len(assets)] * len(assets)
+        distro[-1] += 10 ** 6 - sum(distro)
+        traders = [fake_address(f'trader-{i}') for i in range(n_traders)]
+        self.portfolios = {fake_address(f'portfolio-{trader}'): trader for trader in traders}
+        self.portfolios[self.pro] = user_address
+        self.portfolio_of = {trader: portfolio for portfolio, trader in self.portfolios.items()}
+        # Every third ranked trader also owns an Index portfolio
+        self.index_portfolios = {fake_address(f'index-{trader}'): trader for trader in traders[::3]}
+        self.index_of = {trader: portfolio for portfolio, trader in self.index_portfolios.items()}
+        self.delegated = {}
+        trader_data = ([1] * len(assets), distro, assets, [10 ** 6] * 5, [1700000000] * 5, [0] * len(assets), 1690000000)
+        self.state = {
+            'getDeployerProAddress': self.deployer,
+            'getDeployerIndexAddress': self.deployer_index,
+            'getAssetManagerAddress': self.manager,
+            'getUserProPortfolioAddress': lambda tx, user: self.portfolio_of.get(to_checksum_address(user), self.pro),
+            'getActualDistribution': distro,
+            'getAddresses': assets,
+            'getMinPercAllowance': 10_000,
+            'maxSlippage': 10_000,
+            'getNPoints': 5,
+            'getTraderScore': lambda tx, user: int.from_bytes(keccak(text=user.lower())[:4], 'big'),
+            'getTraderData': trader_data,
+            'getRankingList': traders,
+            'rankingList': lambda tx, i: traders[i],
+            'totalRankSum': n_traders * (n_traders + 1) // 2,
+            'maxRanking': n_traders,
+            'minRanking': 1,
+            'initialBlock': 0,
+            'userProPortfolio': lambda tx, user: self.portfolio_of.get(to_checksum_address(user), '0x' + '00' * 20),
+            'isProPortfolioActive': lambda tx, portfolio: to_checksum_address(portfolio) in self.portfolios,
+            'proPortfolioUser': lambda tx, portfolio: self.portfolios.get(to_checksum_address(portfolio), '0x' + '00' * 20),
+            'userIndexPortfolio': lambda tx, user: self.index_of.get(to_checksum_address(user), '0x' + '00' * 20),
+            'isIndexPortfolioActive': lambda tx, portfolio: to_checksum_address(portfolio) in self.index_portfolios,
+            'indexPortfolioUser': lambda tx, portfolio: self.index_portfolios.get(to_checksum_address(portfolio), '0x' + '00' * 20),
+            'getDelegatedAddress': lambda tx: self.delegated.get(to_checksum_address(tx['to']), '0x' + '00' * 20),
+            'changeDelegatedAddress': self._change_delegated,
+            'getSupply': 10 ** 18,
+            'getStoredAssets': [10 ** 18] * len(assets),
+            # Stored amounts plus whatever is lent, as the contract reports them
+            'getAssetsExtended': self._assets_extended,
+            'getAmountLendToken': lambda tx, token: 10 ** 17 if int(token, 16) % 2 else 0,
+            'getDepositWithdrawFee': 1_000,
+            # ERC-20 metadata of whichever token is called
+            'decimals': lambda tx: 6 if int(tx['to'], 16) % 3 == 0 else 18,
+            'symbol': lambda tx: 'T' + tx['to'][2:6].upper(),
+        }
+        self.exchange_data = make_exchange_data(n_pools, self.network['wrap_address'])
+
+        self.functions = {}
+        self.events = {}
+        for key, abi in self.network.items():
+            if not key.startswith('abi'):
+                continue
+            for item in abi:
+                if item['type'] == 'function':
+                    self.functions.setdefault(function_abi_to_4byte_selector(item), item)
+                elif item['type'] == 'event':
+                    self.events.setdefault(item['name'], item)
+        # Creation logs of the portfolios that exist from the start
+        for portfolio in self.portfolios:
+            self.emit('OwnershipTransferred', portfolio, topics=self.creation_topics(), block=1)
+        for portfolio in self.index_portfolios:
+            self.emit('OwnershipTransferred', portfolio, topics=self.creation_topics(index=True), block=1)
+
+    def add_portfolio(self, owner, index=False, label=None):
+        # Registers an active portfolio outside the ranking list; it is found only through its creation log
+        owner = to_checksum_address(owner)
+        portfolio = fake_address(label or f"{'index' if index else 'portfolio'}-{owner}")
+        portfolios, owned = (self.index_portfolios, self.index_of) if index else (self.portfolios, self.portfolio_of)
+        portfolios[portfolio] = owner
+        owned[owner] = portfolio
+        self.emit('OwnershipTransferred', portfolio, topics=self.creation_topics(index))
+        return portfolio
+
+    def creation_topics(self, index=False):
+        # A deployer creates its portfolios, which log OwnershipTransferred(0x0, deployer) when constructed
+        deployer = self.deployer_index if index else self.deployer
+        return ['0x' + '00' * 32, '0x' + '00' * 12 + deployer[2:].lower()]
+
+    @property
+    def block_number(self):
+        if not self.block_time:
+            return self.block_offset + len(self.sent)
+        return self.block_offset + int((time.time() - self.genesis) / self.block_time)
+
+    def reset_counters(self):
+        with self.lock:
+            self.calls.clear()
+            self.round_trips = 0
+
+    def handle(self, request):
+        method = request.get('method')
+        with self.lock:
+            self.calls[method] += 1
+        try:
+            result = getattr(self, 'rpc_' + method)(*request.get('params', []))
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
+        except RpcError as error:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': error.payload}
+        except Exception as error:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': -32603, 'message': repr(error)}}
+
+    # --- contract reads
+
+    def _call(self, tx):
+        data = bytes.fromhex(tx.get('data', tx.get('input', '0x'))[2:])
+        abi = self.functions.get(data[:4])
+        if abi is None:
+            raise RpcError(-32000, 'execution reverted')
+        name = abi['name']
+        if name in self.rpc_errors:
+            raise RpcError(*self.rpc_errors[name])
+        if name in self.reverts:
+            reason = self.reverts[name]
+            payload = '0x08c379a0' + encode(['string'], [reason]).hex()
+            raise RpcError(3, f'execution reverted: {reason}', payload)
+        args = decode(get_abi_input_types(abi), data[4:])
+        value = self.state.get(name)
+        if callable(value):
+            value = value(tx, *args)
+        output_types = get_abi_output_types(abi)
+        if not output_types:
+            return '0x'
+        if value is None:
+            value = 0 if output_types[0].startswith('uint') else self.state.get('zero', '0x' + '00' * 20)
+        if len(output_types) == 1:
+            value = [value]
+        return '0x' + encode(output_types, value).hex()
+
+    def _assets_extended(self, tx):
+        lent = self.state['getAmountLendToken']
+        return [stored + (lent(tx, asset) if callable(lent) else lent)
+                for asset, stored in zip(self.state['getAddresses'], self.state['getStoredAssets'])]
+
+    def _change_delegated(self, tx, new_address):
+        # Only a sent transaction changes state, not eth_call or eth_estimateGas
+        if tx.get('mined'):
+            self.delegated[to_checksum_address(tx['to'])] = to_checksum_address(new_address)
+
+    def rpc_eth_call(self, tx, block='latest'):
+        return self._call(tx)
+
+    def rpc_eth_estimateGas(self, tx, block=None):
+        self._call(tx)
+        return hex(150_000 + len(tx.get('data', '0x')) * 16)
+
+    # --- chain metadata
+
+    def rpc_web3_clientVersion(self):
+        return 'wedx-stub/0.1'
+
+    def rpc_eth_chainId(self):
+        return hex(self.chain_id)
+
+    def rpc_net_version(self):
+        return str(self.chain_id)
+
+    def rpc_eth_blockNumber(self):
+        return hex(self.block_number)
+
+    def rpc_eth_gasPrice(self):
+        return hex(self.base_fee(self.block_number + 1) + 10 ** 6)
+
+    def rpc_eth_maxPriorityFeePerGas(self):
+        return hex(10 ** 6)
+
+    def rpc_eth_getBalance(self, address, block='latest'):
+        return hex(10 ** 18)
+
+    def rpc_eth_getTransactionCount(self, address, block='latest'):
+        if block == 'pending':
+            return hex(self.nonces[address.lower()])
+        # Only mined transactions count towards the latest nonce
+        head = self.block_number
+        return hex(sum(1 for number in self.sender_blocks.get(address.lower(), []) if number <= head))
+
+    def rpc_eth_getBlockByNumber(self, block, full=False):
+        number = self.block_number if block in ('latest', 'pending') else int(block, 16)
+        if number > self.block_number:
+            return None
+        return {
+            'number': hex(number),
+            'hash': '0x' + keccak(text=f'block-{number}').hex(),
+            'parentHash': '0x' + keccak(text=f'block-{number - 1}').hex(),
+            'timestamp': hex(int(self.genesis) + number),
+            'baseFeePerGas': hex(self.base_fee(number)),
+            'gasLimit': hex(30_000_000),
+            'gasUsed': hex(15_000_000),
+            'miner': '0x' + '00' * 20,
+            'transactions': list(self.block_txs.get(number, [])),
+            'logsBloom': '0x' + '00' * 256,
+            'extraData': '0x',
+            'difficulty': '0x0',
+            'nonce': '0x' + '00' * 8,
+            'sha3Uncles': '0x' + '00' * 32,
+            'stateRoot': '0x' + '00' * 32,
+            'receiptsRoot': '0x' + '00' * 32,
+            'transactionsRoot': '0x' + '00' * 32,
+            'mixHash': '0x' + '00' * 32,
+            'size': '0x0',
+            'uncles': [],
+        }
+
+    def rpc_eth_feeHistory(self, block_count, newest, percentiles=None):
+        count = int(block_count, 16) if isinstance(block_count, str) else block_count
+        newest = self.block_number if newest in ('latest', 'pending') else int(newest, 16)
+        oldest = max(0, newest - count + 1)
+        blocks = range(oldest, newest + 1)
+        history = {
+            'oldestBlock': hex(oldest),
+            'baseFeePerGas': [hex(self.base_fee(number)) for number in range(oldest, newest + 2)],
+            'gasUsedRatio': [0.5 for _ in blocks],
+        }
+        if percentiles:
+            history['reward'] = [[hex(10 ** 6) for _ in percentiles] for _ in blocks]
+        return history
+
+    def emit(self, event_name, address, data=b'', topics=(), block=None):
+        # Records a log in a new block, or in an earlier ``block`` without moving the chain
+        with self.lock:
+            if block is None:
+                self.block_offset += 1
+                block = self.block_number
+            self.logs.append({
+                'address': address,
+                'topics': ['0x' + event_abi_to_log_topic(self.events[event_name]).hex()] + list(topics),
+                'data': '0x' + data.hex(),
+                'blockNumber': hex(block),
+                'blockHash': '0x' + keccak(text=f'block-{block}').hex(),
+                'transactionHash': '0x' + keccak(text=f'log-{len(self.logs)}').hex(),
+                'transactionIndex': '0x0',
+                'logIndex': hex(len(self.logs)),
+                'removed': False,
+            })
+
+    def rpc_eth_getLogs(self, params):
+        def block(value, default):
+            if value is None or value in ('latest', 'pending'):
+                return default
+            return int(value, 16) if isinstance(value, str) else value
+
+        from_block = block(params.get('fromBlock'), self.block_number)
+        to_block = block(params.get('toBlock'), self.block_number)
+        # One entry per topic position: None for any, a topic, or a list of alternatives
+        topics = [[wanted] if isinstance(wanted, str) else wanted for wanted in params.get('topics') or []]
+        addresses = params.get('address')
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        addresses = {address.lower() for address in addresses or []}
+        return [
+            log for log in self.logs
+            if from_block <= int(log['blockNumber'], 16) <= to_block
+            and all(not wanted or (i < len(log['topics']) and log['topics'][i] in wanted) for i, wanted in enumerate(topics))
+            and (not addresses or log['address'].lower() in addresses)
+        ]
+
+    # --- transactions
+
+    def rpc_eth_sendRawTransaction(self, raw):
+        raw_bytes = bytes.fromhex(raw[2:])
+        sender = Account.recover_transaction(raw_bytes)
+        fees = None
+        if raw_bytes[0] >= 0xc0:
+            fields = rlp.decode(raw_bytes)
+            to, data = fields[3], fields[5]
+        else:
+            fields = rlp.decode(raw_bytes[1:])
+            to, data = fields[5], fields[7]
+            if raw_bytes[0] == 2:
+                fees = (int.from_bytes(fields[2], 'big'), int.from_bytes(fields[3], 'big'))
+        tx_hash = '0x' + keccak(raw_bytes).hex()
+        if tx_hash in self.receipts:
+            raise RpcError(-32000, 'already known')
+        to_address = to_checksum_address(to) if to else None
+        function = self.functions.get(bytes(data[:4]))
+        reverted = function is not None and function['name'] in self.mined_reverts
+        if not reverted:
+            self._call({'to': to_address, 'data': '0x' + data.hex(), 'mined': True})
+        with self.lock:
+            self.nonces[sender.lower()] += 1
+            self.sent.append(tx_hash)
+            # With a block time the transaction lands in the next block
+            block = self.block_number + 1 if self.block_time else self.block_number
+            self.block_txs.setdefault(block, []).append(tx_hash)
+            self.sender_blocks.setdefault(sender.lower(), []).append(block)
+            self.receipts[tx_hash] = {
+                'transactionHash': tx_hash,
+                'transactionIndex': '0x0',
+                'blockHash': '0x' + keccak(text=f'block-{block}').hex(),
+                'blockNumber': hex(block),
+                'from': sender,
+                'to': to_address,
+                'gasUsed': hex(120_000),
+                'cumulativeGasUsed': hex(120_000),
+                # EIP-1559 transactions pay base fee plus tip, never more than maxFeePerGas
+                'effectiveGasPrice': hex(self.base_fee(block) + 10 ** 6 if fees is None
+                                         else min(fees[1], self.base_fee(block) + fees[0])),
+                'contractAddress': None,
+                'logs': [],
+                'logsBloom': '0x' + '00' * 256,
+                'status': '0x0' if reverted else '0x1',
+                'type': '0x0' if fees is None else '0x2',
+            }
+        return tx_hash
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash):
+        receipt = self.receipts.get(tx_hash)
+        if receipt is None or int(receipt['blockNumber'], 16) > self.block_number:
+            return None
+        return receipt
+
+    def rpc_eth_getTransactionByHash(self, tx_hash):
+        receipt = self.rpc_eth_getTransactionReceipt(tx_hash)
+        if receipt is None:
+            return None
+        return {'hash': tx_hash, 'blockNumber': receipt['blockNumber'], 'from': receipt['from'], 'to': receipt['to']}
+
+
+class RpcError(Exception):
+    def __init__(self, code, message, data=None):
+        super().__init__(message)
+        self.payload = {'code': code, 'message': message}
+        if data is not None:
+            self.payload['data'] = data
+
+
+class StubServer:
+    """Threaded HTTP server serving JSON-RPC on / and the exchange data on GET."""
+
+    def __init__(self, chain, latency=0.0, host='127.0.0.1', port=0):
+        self.chain = chain
+        self.latency = latency
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length))
+                with server.chain.lock:
+                    server.chain.round_trips += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if isinstance(request, list):
+                    self._reply(200, [server.chain.handle(r) for r in request])
+                else:
+                    self._reply(200, server.chain.handle(request))
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                with server.chain.lock:
+                    server.chain.calls['GET ' + self.path] += 1
+                    server.chain.round_trips += 1
+                if self.path == f'/exchange_data_{server.chain.chain_name}.json':
+                    self._reply(200, server.chain.exchange_data)
+                else:
+                    self._reply(404, {'error': 'not found'})
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StubWebSocketServer:
+    """JSON-RPC over WebSocket with newHeads and logs subscriptions.
+
+    A ticker pushes every new block of the chain to subscribers. ``outage`` drops all
+    connections and refuses new ones for a while, so clients have to reconnect and
+    fill the blocks they missed.
+    """
+
+    def __init__(self, chain, latency=0.0, host='127.0.0.1', port=0, tick=0.005):
+        self.chain = chain
+        self.latency = latency
+        self.tick = tick
+        self.notifications = 0
+        # Methods whose next call is executed but answered by dropping the connection instead
+        self.drop_after = set()
+        self._clients = {}
+        self._ids = count(1)
+        self._lock = threading.Lock()
+        self._down = threading.Event()
+        self._stopped = threading.Event()
+        self.server = serve(self._serve_client, host, port, max_size=None)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.ticker = threading.Thread(target=self._tick, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.socket.getsockname()[:2]
+        return f'ws://{host}:{port}'
+
+    def _send(self, ws, payload):
+        with self._clients[ws]['lock']:
+            ws.send(json.dumps(payload))
+
+    def _serve_client(self, ws):
+        if self._down.is_set():
+            ws.close()
+            return
+        with self._lock:
+            self._clients[ws] = {'lock': threading.Lock(), 'subscriptions': {}}
+        try:
+            for message in ws:
+                request = json.loads(message)
+                with self.chain.lock:
+                    self.chain.round_trips += 1
+                if self.latency:
+                    time.sleep(self.latency)
+                if isinstance(request, list):
+                    reply = [self._handle(ws, item) for item in request]
+                else:
+                    reply = self._handle(ws, request)
+                    if request.get('method') in self.drop_after:
+                        self.drop_after.discard(request.get('method'))
+                        ws.close()
+                        return
+                self._send(ws, reply)
+        except ConnectionClosed:
+            pass
+        finally:
+            with self._lock:
+                self._clients.pop(ws, None)
+
+    def _handle(self, ws, request):
+        method = request.get('method')
+        params = request.get('params', [])
+        if method == 'eth_subscribe':
+            with self.chain.lock:
+                self.chain.calls[method] += 1
+            subscription = hex(next(self._ids))
+            self._clients[ws]['subscriptions'][subscription] = params
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': subscription}
+        if method == 'eth_unsubscribe':
+            removed = self._clients[ws]['subscriptions'].pop(params[0], None) is not None
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': removed}
+        return self.chain.handle(request)
+
+    def _tick(self):
+        last = self.chain.block_number
+        while not self._stopped.wait(self.tick):
+            head = self.chain.block_number
+            for number in range(last + 1, head + 1):
+                self._publish(number)
+            last = max(last, head)
+
+    def _publish(self, number):
+        block = self.chain.rpc_eth_getBlockByNumber(hex(number))
+        head = {key: block[key] for key in ('number', 'hash', 'parentHash', 'timestamp', 'baseFeePerGas')}
+        with self._lock:
+            clients = list(self._clients.items())
+        for ws, client in clients:
+            for subscription, params in list(client['subscriptions'].items()):
+                if params[0] == 'newHeads':
+                    results = [head]
+                elif params[0] == 'logs':
+                    log_filter = dict(params[1] if len(params) > 1 else {}, fromBlock=hex(number), toBlock=hex(number))
+                    results = self.chain.rpc_eth_getLogs(log_filter)
+                else:
+                    continue
+                for result in results:
+                    try:
+                        self._send(ws, {'jsonrpc': '2.0', 'method': 'eth_subscription',
+                                        'params': {'subscription': subscription, 'result': result}})
+                        self.notifications += 1
+                    except (ConnectionClosed, KeyError):
+                        break
+
+    def outage(self, seconds):
+        self._down.set()
+        with self._lock:
+            clients = list(self._clients)
+        for ws in clients:
+            ws.close()
+        threading.Timer(seconds, self._down.clear).start()
+
+    def __enter__(self):
+        self.thread.start()
+        self.ticker.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stopped.set()
+        self.server.shutdown()
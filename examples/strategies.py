@@ -0,0 +1,58 @@
+# Strategies for the wedx worker (src/wedx_cli.py): each one takes the chain's WedX client
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from addresses import to_address
+
+
+def select_assets(wedx, n_assets=10):
+    # Same filter as the traderProEW/TVLW examples
+    assets_info = wedx.get_assets_info()
+    assets = []
+    for key in assets_info.keys():
+        if 'inputTokens' in assets_info[key].keys():
+            if assets_info[key]['inputTokens'][0]['symbol'] == 'WETH':
+                asset = assets_info[key]['inputTokens'][1]['id']
+            else:
+                asset = assets_info[key]['inputTokens'][0]['id']
+            if assets_info[key]['gtScore'] >= 75.0 and assets_info[key]['totalValueLockedUSD'] >= 500_000 and assets_info[key]['whitelisted'] == True and len(assets_info[key]['websites']) > 0:
+                assets.append(asset)
+            if len(assets) == n_assets:
+                break
+    return assets_info, assets
+
+
+def rebalance(wedx, new_assets, new_distribution, threshold_factor=1.5):
+    trading_account_address = wedx.get_trading_account_address()
+    if trading_account_address == wedx.zero_address:
+        raise ValueError("User does not have an account")
+
+    current_distro = wedx.get_distribution()
+    current_assets = wedx.get_assets_addresses()
+    native_asset = wedx.network[wedx.get_chain_name()]['wrap_address']
+    threshold = threshold_factor * wedx.get_distribution_threshold()
+
+    update = wedx.are_distributions_different(current_distro, current_assets, new_distribution, new_assets + [native_asset], threshold)
+    print(f'Update needed: {update}')
+    if update:
+        wedx.set_portfolio(new_assets, new_distribution)
+        trader_data = wedx.get_trader_data()
+        required_interactions = wedx.get_required_interactions()
+        print(f'Interactions: {trader_data.interactions} / {required_interactions}')
+        if trader_data.interactions == required_interactions:
+            wedx.rank_me()
+    print(f'Current score: {wedx.get_user_score()}')
+
+
+def equal_weighted(wedx, n_assets=10):
+    _, assets = select_assets(wedx, n_assets)
+    distribution = wedx.normalize_distribution([1.0] * len(assets) + [0.0])  # no native allocation
+    rebalance(wedx, [to_address(asset) for asset in assets], distribution)
+
+
+def tvl_weighted(wedx, n_assets=10):
+    assets_info, assets = select_assets(wedx, n_assets)
+    tvls = [float(assets_info[asset]['totalValueLockedUSD']) for asset in assets]
+    distribution = wedx.normalize_distribution(tvls + [0.0])  # no native allocation
+    rebalance(wedx, [to_address(asset) for asset in assets], distribution)
@@ -6,6 +6,8 @@ from dotenv import load_dotenv
 # Add the src directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 from wedx import WedX
+from addresses import to_address
+from lending import LendingManager
 
 # Load environment variables
 load_dotenv()
@@ -22,13 +24,14 @@ CHAIN_RPCS = {
 # Initialize the SDK
 CHAIN_ID = 8453  # 8453 for Base mainnet, 42161 for Arbitrum, 1 for Ethereum
 wedx = WedX(CHAIN_ID, USER_ADDRESS, USER_PRIVATE_KEY, CHAIN_RPCS)
+lending = LendingManager(wedx)
 
 def create_ew_portfolio():
     assets_info = wedx.get_assets_info()
     assets_ew_portfolio_top_10_non_native = list(assets_info.keys())[:10]
 
     for a in range(len(assets_ew_portfolio_top_10_non_native)):
-        assets_ew_portfolio_top_10_non_native[a] = wedx.w3.to_checksum_address(assets_ew_portfolio_top_10_non_native[a])
+        assets_ew_portfolio_top_10_non_native[a] = to_address(assets_ew_portfolio_top_10_non_native[a])
 
     distribution = [1.0 for _ in range(len(assets_ew_portfolio_top_10_non_native))]
     distribution.append(0.0)  # adding native allocation
@@ -45,7 +48,7 @@ def create_tvlw_portfolio():
         tvls.append(float(assets_info[asset]['totalValueLockedUSD']))
 
     for a in range(len(assets_ew_portfolio_top_10_non_native)):
-        assets_ew_portfolio_top_10_non_native[a] = wedx.w3.to_checksum_address(assets_ew_portfolio_top_10_non_native[a])
+        assets_ew_portfolio_top_10_non_native[a] = to_address(assets_ew_portfolio_top_10_non_native[a])
 
     distribution = [tvls[i] for i in range(len(assets_ew_portfolio_top_10_non_native))]
     distribution.append(0.0)  # adding native allocation
@@ -90,17 +93,19 @@ def main():
 
         if update:
             try:
-                wedx.withdraw_from_lending(current_assets)
-                time.sleep(2)
+                # Only lent assets that change weight are withdrawn, only unlent ones supplied
+                lending_plan = lending.plan(current_assets, current_distro, new_assets, new_distribution)
+                if lending.withdraw(lending_plan) is not None:
+                    time.sleep(2)
                 wedx.set_portfolio(new_assets, new_distribution)
                 time.sleep(2)
-                wedx.earn_with_lending(new_assets)
-                time.sleep(2)
+                if lending.supply(lending_plan) is not None:
+                    time.sleep(2)
 
                 trader_data = wedx.get_trader_data()
                 required_interactions = wedx.get_required_interactions()
 
-                if len(trader_data[3]) == required_interactions:
+                if trader_data.interactions == required_interactions:
                     wedx.rank_me()
 
             except ValueError as error:
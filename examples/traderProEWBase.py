@@ -6,6 +6,8 @@ from dotenv import load_dotenv
 # Add the src directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 from wedx import WedX
+from addresses import to_address
+from catalog import quality_filter
 
 # Load environment variables
 load_dotenv()
@@ -24,7 +26,8 @@ CHAIN_ID = 8453  # 8453 for Base mainnet, 42161 for Arbitrum
 wedx = WedX(CHAIN_ID, USER_ADDRESS, USER_PRIVATE_KEY, CHAIN_RPCS)
 
 def create_ew_portfolio():
-    assets_info = wedx.get_assets_info()
+    # Only the first 10 qualifying pools are read from the exchange data
+    assets_info = wedx.stream_assets_info(where=quality_filter(), limit=10)
     assets_ew_portfolio_top_10_non_native = []
     for key in assets_info.keys():
         if 'inputTokens' in assets_info[key].keys():
@@ -38,7 +41,7 @@ def create_ew_portfolio():
                 break
 
     for a in range(len(assets_ew_portfolio_top_10_non_native)):
-        assets_ew_portfolio_top_10_non_native[a] = wedx.w3.to_checksum_address(assets_ew_portfolio_top_10_non_native[a])
+        assets_ew_portfolio_top_10_non_native[a] = to_address(assets_ew_portfolio_top_10_non_native[a])
 
     distribution = [1.0 for _ in range(len(assets_ew_portfolio_top_10_non_native))]
     distribution.append(0.0)  # adding native allocation
@@ -85,7 +88,7 @@ def main():
     print(f'Update needed: {update}')
     trader_data = wedx.get_trader_data()
     required_interactions = wedx.get_required_interactions()
-    print(f'Interactions: {len(trader_data[3])} / {required_interactions}')
+    print(f'Interactions: {trader_data.interactions} / {required_interactions}')
 
     if update:
         # try:
@@ -106,9 +109,9 @@ def main():
         try:
             trader_data = wedx.get_trader_data()
             required_interactions = wedx.get_required_interactions()
-            print(f'Interactions: {len(trader_data[3])} / {required_interactions}')
+            print(f'Interactions: {trader_data.interactions} / {required_interactions}')
 
-            if len(trader_data[3]) == required_interactions:
+            if trader_data.interactions == required_interactions:
                 wedx.rank_me()
 
         except ValueError as error:
@@ -2,12 +2,13 @@ import os
 import sys
 import time
 from dotenv import load_dotenv
-import requests
-from web3 import Web3
 
 # Add the src directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 from wedx import WedX
+from addresses import to_address
+from gas import ExecutionScheduler
+from datasources import DataSources
 
 # Load environment variables
 load_dotenv()
@@ -25,19 +26,19 @@ CHAIN_RPCS = {
 CHAIN_ID = 1  # 8453 for Base mainnet, 42161 for Arbitrum
 wedx = WedX(CHAIN_ID, USER_ADDRESS, USER_PRIVATE_KEY, CHAIN_RPCS)
 
+# Both inputs are fetched at once; if one endpoint is down, its last good answer is used
+sources = DataSources()
+sources.register_url('liberty', 'https://api2.icodrops.com/portfolio/api/portfolioGroup/individualShare/world-liberty-financial-holdings-m574rtlqs8', ttl=600)
+sources.register_catalog(wedx)
+
 def get_liberty_portfolio():
-    url = 'https://api2.icodrops.com/portfolio/api/portfolioGroup/individualShare/world-liberty-financial-holdings-m574rtlqs8'
-    response = requests.get(url)
-    if response.status_code == 200:
-        result_json = response.json()
-    else:
-        raise RuntimeError("Error accessing API")
-    
+    bundle = sources.fetch()
+
     portfolio = {}
-    for item in result_json['portfolios']:
+    for item in bundle['liberty']['portfolios']:
         portfolio[item['symbol']] = float(item['totalCap']['ETH'])
 
-    assets_info = wedx.get_assets_info()
+    assets_info = bundle['assets_info']
     assets_portfolio = []
     distribution = []
     for key in assets_info.keys():
@@ -47,7 +48,7 @@ def get_liberty_portfolio():
             else:
                 asset = assets_info[key]['inputTokens'][0]['symbol']
             if asset in portfolio.keys() and asset != 'TRX' and assets_info[key]['gtScore'] >= 75.0 and assets_info[key]['totalValueLockedUSD'] >= 500_000 and assets_info[key]['whitelisted'] == True and len(assets_info[key]['websites']) > 0:
-                assets_portfolio.append(wedx.w3.to_checksum_address(key))
+                assets_portfolio.append(to_address(key))
                 distribution.append(portfolio[asset])
 
     distribution.append(portfolio['ETH'])
@@ -59,7 +60,7 @@ def create_ew_portfolio():
     assets_ew_portfolio_top_10_non_native = list(assets_info.keys())[:10]
 
     for a in range(len(assets_ew_portfolio_top_10_non_native)):
-        assets_ew_portfolio_top_10_non_native[a] = wedx.w3.to_checksum_address(assets_ew_portfolio_top_10_non_native[a])
+        assets_ew_portfolio_top_10_non_native[a] = to_address(assets_ew_portfolio_top_10_non_native[a])
 
     distribution = [1.0 for _ in range(len(assets_ew_portfolio_top_10_non_native))]
     distribution.append(0.0)  # adding native allocation
@@ -106,29 +107,26 @@ def main():
     print(f'Update needed: {update}')
     trader_data = wedx.get_trader_data()
     required_interactions = wedx.get_required_interactions()
-    print(f'Interactions: {len(trader_data[3])} / {required_interactions}')
-
-    w3 = Web3(Web3.HTTPProvider(CHAIN_RPCS[1]))
-    gas_price = w3.eth.gas_price
-    print(f"Gas price is {gas_price}, permitted max. {w3.to_wei(0.3, 'gwei')}")
-    if gas_price > w3.to_wei(0.3, 'gwei'):
-        update = False           
+    print(f'Interactions: {trader_data.interactions} / {required_interactions}')
 
     print(f"My current slippage is {wedx.get_current_slippage()}")
 #    wedx.change_slippage(20000)
 
     if update:
+        # Wait for gas under 0.3 gwei, but rebalance anyway after 45 minutes
+        scheduler = ExecutionScheduler(wedx)
+        print(f"Gas price is {scheduler.oracle.gas_price()}, permitted max. {wedx.w3.to_wei(0.3, 'gwei')}")
         try:
-            wedx.set_portfolio(new_assets, new_distribution)
+            scheduler.execute('set_portfolio', new_assets, new_distribution, cap=wedx.w3.to_wei(0.3, 'gwei'), max_wait=45 * 60)
         except ValueError as error:
             print(error)
         time.sleep(60)
         try:
             trader_data = wedx.get_trader_data()
             required_interactions = wedx.get_required_interactions()
-            print(f'Interactions: {len(trader_data[3])} / {required_interactions}')
+            print(f'Interactions: {trader_data.interactions} / {required_interactions}')
 
-            if len(trader_data[3]) == required_interactions:
+            if trader_data.interactions == required_interactions:
                 wedx.rank_me()
 
         except ValueError as error:
@@ -0,0 +1,172 @@
+from array import array
+
+from eth_abi import decode, encode
+from eth_abi.grammar import TupleType, parse
+from eth_utils import function_abi_to_4byte_selector, is_checksum_address
+from eth_utils.abi import get_abi_input_types, get_abi_output_types
+
+from addresses import to_address
+
+
+def _normalizer(abi_type):
+    # Matches web3's call results (checksummed, here interned, addresses and lists for arrays)
+    parsed = parse(abi_type) if isinstance(abi_type, str) else abi_type
+    if parsed.is_array:
+        item = _normalizer(parsed.item_type)
+        if item is None:
+            return list
+        return lambda values: [item(value) for value in values]
+    if isinstance(parsed, TupleType):
+        items = [_normalizer(component) or (lambda value: value) for component in parsed.components]
+        return lambda values: tuple(fn(value) for fn, value in zip(items, values))
+    if parsed.base == 'address':
+        return to_address
+    return None
+
+
+class _Fallback(Exception):
+    pass
+
+
+# Validated address → its 32-byte word; fleets reuse the same few hundred addresses
+_ADDRESS_WORDS = {}
+
+
+def _address_word(value):
+    word = _ADDRESS_WORDS.get(value)
+    if word is None:
+        if not isinstance(value, str):
+            raise _Fallback()
+        # eth_abi does not check EIP-55 checksums; web3 did, so a mistyped address still fails here
+        if value[2:] != value[2:].lower() and value[2:] != value[2:].upper() and not is_checksum_address(value):
+            raise ValueError(f"Address {value} has an invalid checksum")
+        word = encode(['address'], [value])
+        if len(_ADDRESS_WORDS) < 100_000:
+            _ADDRESS_WORDS[value] = word
+    return word
+
+
+def _uint_word(bits):
+    limit = 1 << bits
+
+    def word(value):
+        if value.__class__ is not int or not 0 <= value < limit:
+            raise _Fallback()
+        return value.to_bytes(32, 'big')
+    return word
+
+
+def _bool_word(value):
+    if value is True:
+        return b'\x00' * 31 + b'\x01'
+    if value is False:
+        return b'\x00' * 32
+    raise _Fallback()
+
+
+def _word_encoder(parsed):
+    if parsed.base == 'address':
+        return _address_word
+    if parsed.base == 'uint':
+        return _uint_word(int(parsed.sub or 256))
+    if parsed.base == 'bool':
+        return _bool_word
+    return None
+
+
+def _compile_encoder(input_types):
+    """Direct encoder for arguments that are one-word values or dynamic arrays of them.
+
+    Covers every input of the WEDX write functions (address, uint, bool and their ``[]``
+    arrays). Returns None for anything else. The encoder raises _Fallback on any value it
+    does not handle exactly like eth_abi, which then encodes it (or raises its usual error).
+    """
+    parts = []
+    for abi_type in input_types:
+        parsed = parse(abi_type)
+        if isinstance(parsed, TupleType) or (parsed.arrlist and (len(parsed.arrlist) > 1 or len(parsed.arrlist[0]) > 0)):
+            return None
+        word = _word_encoder(parsed)
+        if word is None:
+            return None
+        parts.append((word, bool(parsed.arrlist)))
+    head_size = 32 * len(parts)
+
+    def encoder(args):
+        if len(args) != len(parts):
+            raise _Fallback()
+        heads = []
+        tails = []
+        offset = head_size
+        for (word, dynamic), value in zip(parts, args):
+            if dynamic:
+                if not isinstance(value, (list, tuple, array)):
+                    raise _Fallback()
+                tail = len(value).to_bytes(32, 'big') + b''.join([word(item) for item in value])
+                heads.append(offset.to_bytes(32, 'big'))
+                tails.append(tail)
+                offset += len(tail)
+            else:
+                heads.append(word(value))
+        return b''.join(heads) + b''.join(tails)
+    return encoder
+
+
+class AbiFunction:
+    __slots__ = ('name', 'selector', 'input_types', 'output_types', '_normalizers', '_encoder')
+
+    def __init__(self, item):
+        self.name = item['name']
+        self.selector = function_abi_to_4byte_selector(item)
+        self.input_types = get_abi_input_types(item)
+        self.output_types = get_abi_output_types(item)
+        self._normalizers = [_normalizer(output_type) for output_type in self.output_types]
+        self._encoder = _compile_encoder(self.input_types)
+
+    def encode(self, args=()):
+        if self._encoder is not None:
+            try:
+                return self.selector + self._encoder(args)
+            except _Fallback:
+                pass
+        # eth_abi wants lists for arrays; typed reads (results.py) return array('Q')
+        args = [list(value) if isinstance(value, array) else value for value in args]
+        return self.selector + encode(self.input_types, args)
+
+    def decode(self, data):
+        values = decode(self.output_types, bytes(data))
+        values = [fn(value) if fn else value for fn, value in zip(self._normalizers, values)]
+        if len(values) == 1:
+            return values[0]
+        return values
+
+
+class AbiCodec:
+    """Cached selectors and precompiled encoders for one chain's WEDX contracts.
+
+    Skips web3's per-call ABI lookup and validation, which dominates the cost of bulk
+    reads and of building write calldata.
+    """
+
+    def __init__(self, network):
+        self.network = network
+        self._functions = {}
+
+    def function(self, abi_key, name):
+        key = (abi_key, name)
+        function = self._functions.get(key)
+        if function is None:
+            for item in self.network[abi_key]:
+                if item['type'] == 'function' and item['name'] == name:
+                    function = AbiFunction(item)
+                    break
+            else:
+                raise ValueError(f"Function {name} not found in {abi_key}")
+            self._functions[key] = function
+        return function
+
+    def encode_call(self, abi_key, name, args=()):
+        return '0x' + self.function(abi_key, name).encode(args).hex()
+
+    def decode_result(self, abi_key, name, data):
+        return self.function(abi_key, name).decode(data)
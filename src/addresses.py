@@ -0,0 +1,55 @@
+import threading
+
+from eth_utils import is_checksum_address, to_canonical_address, to_checksum_address
+
+
+class Address(str):
+    """An EIP-55 checksummed address string, interned per process.
+
+    Behaves as the checksum string everywhere (web3, eth_abi, JSON), and also carries
+    ``lowercase`` and ``raw`` (20 bytes). Instances come from ``to_address``, which
+    returns the same object for every spelling of an address, so ``is`` compares them.
+    ``==`` and ``hash`` stay str's: CPython caches a str's hash and dicts and sets check
+    identity before equality, and a Python-level override measured 3x slower. Interning
+    saves the checksum and lowercase conversions, not comparison time.
+    """
+
+    def __reduce__(self):
+        return to_address, (str(self),)
+
+
+# Lowercase hex form → its Address; one key per address, however it was spelled
+_REGISTRY = {}
+_LOCK = threading.Lock()
+
+
+def to_address(value):
+    if isinstance(value, Address):
+        return value
+    if isinstance(value, str):
+        key = value.lower()
+    elif isinstance(value, (bytes, bytearray)) and len(value) == 20:
+        key = '0x' + value.hex()
+    else:
+        key = '0x' + to_canonical_address(value).hex()
+    address = _REGISTRY.get(key)
+    # Mixed case must be the checksum; all-lower and all-upper spellings carry none
+    if (isinstance(value, str) and value != key and value != address and value[2:] != value[2:].upper()
+            and not is_checksum_address(value)):
+        raise ValueError(f"Address {value} has an invalid checksum")
+    if address is not None:
+        return address
+    raw = to_canonical_address(key)
+    with _LOCK:
+        address = _REGISTRY.get(key)
+        if address is None:
+            checksum = to_checksum_address(raw)
+            address = str.__new__(Address, checksum)
+            address.lowercase = checksum.lower()
+            address.raw = raw
+            _REGISTRY[address.lowercase] = address
+    return address
+
+
+def same_address(a, b):
+    return to_address(a) is to_address(b)
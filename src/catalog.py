@@ -0,0 +1,358 @@
+import codecs
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from addresses import to_address
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',:}'
+_DECODER = json.JSONDecoder()
+
+
+def iter_records(chunks):
+    """Yields the (key, value) pairs of a top-level JSON object as its bytes arrive.
+
+    Only the unparsed tail is buffered, so memory follows the largest record rather
+    than the whole document. Closing the generator stops reading.
+    """
+    chunks = iter(chunks)
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer, pos, eof = '', 0, False
+    expect, key, error = '{', None, None
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos < len(buffer):
+            char = buffer[pos]
+            if expect == '{' or expect == ':':
+                if char != expect:
+                    raise ValueError(f"Invalid catalog JSON: expected {expect!r} at {char!r}")
+                pos += 1
+                expect = 'key' if expect == '{' else 'value'
+                continue
+            if expect == ',':
+                if char == '}':
+                    return
+                if char != ',':
+                    raise ValueError(f"Invalid catalog JSON: expected ',' at {char!r}")
+                pos += 1
+                expect = 'key'
+                continue
+            if expect == 'key' and char == '}' and key is None:
+                return
+            if expect == 'key' and char != '"':
+                raise ValueError(f"Invalid catalog JSON: expected a key at {char!r}")
+            try:
+                value, end = _DECODER.raw_decode(buffer, pos)
+                error = None
+            except json.JSONDecodeError as decode_error:
+                # Most likely cut off by the end of the chunk; read on
+                error = decode_error
+            else:
+                # A number cut off by the chunk end parses too ('1.' of '1.5'), so a delimiter must follow
+                if eof or (end < len(buffer) and buffer[end] in _DELIMITERS):
+                    pos = end
+                    if expect == 'key':
+                        key, expect = value, ':'
+                    else:
+                        expect = ','
+                        yield key, value
+                    continue
+        if eof:
+            raise ValueError(f"Invalid catalog JSON: {error}" if error else "Catalog JSON ended early")
+        buffer, pos = buffer[pos:], 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            buffer += utf8.decode(b'', final=True)
+        else:
+            buffer += utf8.decode(chunk)
+
+
+def read_catalog(chunks, where=None, limit=None):
+    """Keeps the records that pass ``where`` (all by default), stopping after ``limit`` of them."""
+    records = {}
+    stream = iter_records(chunks)
+    try:
+        for key, record in stream:
+            if where is None or where(record):
+                records[key] = record
+                if limit is not None and len(records) >= limit:
+                    break
+    finally:
+        stream.close()
+    return records
+
+
+def quality_filter(min_gt_score=75.0, min_tvl_usd=500_000):
+    # The pool selection of the traderProEW/TVLW examples
+    def passes(record):
+        return (isinstance(record, dict) and 'inputTokens' in record
+                and record.get('gtScore', 0) >= min_gt_score
+                and record.get('totalValueLockedUSD', 0) >= min_tvl_usd
+                and record.get('whitelisted') == True
+                and len(record.get('websites') or []) > 0)
+    return passes
+
+
+# Binary catalog: a header, fixed-width columns (each 8-byte aligned) and a string table.
+# Files are written once and swapped in with os.replace, so a mapped file never changes.
+MAGIC = b'WEDXCAT1'
+_HEADER = struct.Struct('<8sQQdqQ')
+_HEADER_SIZE = 64
+COLUMNS = (
+    ('addresses', 'S20'),
+    ('token0', 'S20'),
+    ('token1', 'S20'),
+    ('symbol0_start', '<u4'),
+    ('symbol1_start', '<u4'),
+    ('symbol0_len', '<u2'),
+    ('symbol1_len', '<u2'),
+    ('n_websites', '<u2'),
+    ('n_tokens', 'u1'),
+    ('decimals0', 'u1'),
+    ('decimals1', 'u1'),
+    ('whitelisted', '?'),
+    ('gt_score', '<f8'),
+    ('tvl_usd', '<f8'),
+    ('price_usd', '<f8'),
+    # Addresses in sorted order and their row, for lookups without a per-process dict
+    ('sorted_address', 'S20'),
+    ('sorted_row', '<u4'),
+)
+NO_DECIMALS = 255
+
+
+def default_catalog_path(chain_name):
+    # /dev/shm keeps the file in memory on Linux; any path works
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, f'wedx_catalog_{chain_name}.bin')
+
+
+def _raw_address(value):
+    # The exchange data's addresses are lowercase hex, so there is no checksum to verify
+    if isinstance(value, str) and len(value) == 42 and value[:2] in ('0x', '0X'):
+        try:
+            return bytes.fromhex(value[2:])
+        except ValueError:
+            return None
+    return None
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _decimals(value):
+    try:
+        decimals = int(value)
+    except (TypeError, ValueError):
+        return NO_DECIMALS
+    return decimals if 0 <= decimals < NO_DECIMALS else NO_DECIMALS
+
+
+def _columns_layout(n_records):
+    offsets, position = {}, _HEADER_SIZE
+    for name, dtype in COLUMNS:
+        offsets[name] = position
+        position += -(-np.dtype(dtype).itemsize * n_records // 8) * 8
+    return offsets, position
+
+
+def write_catalog(path, assets_info):
+    """Writes the exchange data as a binary catalog and swaps it in; returns its version.
+
+    Records whose key is not an address (e.g. lastUpdate) are left out. Only the fields
+    strategies select on are kept: the first two input tokens, gtScore, TVL, price,
+    whitelisting and the number of websites.
+
+    Reading the previous version and swapping the file in happen under an advisory
+    lock on ``path + '.lock'``, so concurrent publishers get distinct versions. The
+    lock needs fcntl; on other platforms run one publisher per path.
+    """
+    rows = [(raw, record) for raw, record in ((_raw_address(key), record) for key, record in assets_info.items())
+            if raw is not None and isinstance(record, dict)]
+    n = len(rows)
+    columns = {name: np.zeros(n, dtype=dtype) for name, dtype in COLUMNS}
+    strings = bytearray()
+    for i, (raw, record) in enumerate(rows):
+        columns['addresses'][i] = raw
+        tokens = [token for token in record.get('inputTokens') or [] if isinstance(token, dict)][:2]
+        columns['n_tokens'][i] = len(tokens)
+        for side, token in enumerate(tokens):
+            columns[f'token{side}'][i] = _raw_address(token.get('id')) or b''
+            symbol = str(token.get('symbol', '')).encode()[:0xffff]
+            columns[f'symbol{side}_start'][i] = len(strings)
+            columns[f'symbol{side}_len'][i] = len(symbol)
+            strings += symbol
+            columns[f'decimals{side}'][i] = _decimals(token.get('decimals'))
+        for side in range(len(tokens), 2):
+            columns[f'decimals{side}'][i] = NO_DECIMALS
+        columns['gt_score'][i] = _number(record.get('gtScore'))
+        columns['tvl_usd'][i] = _number(record.get('totalValueLockedUSD'))
+        columns['price_usd'][i] = _number(record.get('tokenPriceUSD'))
+        columns['whitelisted'][i] = record.get('whitelisted') == True
+        columns['n_websites'][i] = min(len(record.get('websites') or []), 0xffff)
+    order = np.argsort(columns['addresses'], kind='stable')
+    columns['sorted_address'] = columns['addresses'][order]
+    columns['sorted_row'] = order.astype('<u4')
+
+    last_update = assets_info.get('lastUpdate')
+    updated_at = int(last_update.get('timestamp') or 0) if isinstance(last_update, dict) else 0
+    offsets, strings_offset = _columns_layout(n)
+
+    # Publishers of the same path take turns, so no two of them write the same version
+    with _publish_lock(path):
+        version = 1
+        if os.path.exists(path):
+            try:
+                with SharedCatalog(path) as previous:
+                    version = previous.version + 1
+            except ValueError:
+                pass
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, version, n, time.time(), updated_at, len(strings)).ljust(_HEADER_SIZE, b'\0'))
+            for name, _ in COLUMNS:
+                f.seek(offsets[name])
+                f.write(columns[name].tobytes())
+            f.seek(strings_offset)
+            f.write(strings)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    return version
+
+
+@contextmanager
+def _publish_lock(path):
+    # An advisory flock on path + '.lock'. fcntl is POSIX only; elsewhere there is no lock
+    # and only one publisher per path may run at a time
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(f'{path}.lock', 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def publish_catalog(wedx, path=None):
+    # Fetches the chain's exchange data once and publishes it for every process on the host
+    assets_info = wedx.get_assets_info()
+    if assets_info is None:
+        raise ValueError("Exchange data could not be fetched")
+    path = path or default_catalog_path(wedx.get_chain_name())
+    return path, write_catalog(path, assets_info)
+
+
+class SharedCatalog:
+    """Read-only, zero-copy view of a binary catalog.
+
+    The columns are numpy arrays over the memory-mapped file, so every process attached
+    to the same file shares one copy through the page cache. ``refresh`` attaches to a
+    newer version once it has been swapped in; arrays taken from the old one stay valid.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._stat = None
+        self._attach()
+
+    def _attach(self):
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n, built_at, updated_at, strings_size = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a WEDX binary catalog")
+        offsets, strings_offset = _columns_layout(n)
+        for name, dtype in COLUMNS:
+            setattr(self, name, np.frombuffer(buffer, dtype=dtype, count=n, offset=offsets[name]))
+        self._strings = memoryview(buffer)[strings_offset:strings_offset + strings_size]
+        self._buffer = buffer
+        self._stat = (stat.st_ino, stat.st_mtime_ns)
+        self.version = version
+        self.built_at = built_at
+        self.updated_at = updated_at
+
+    def refresh(self):
+        """Attaches to a newer published version if there is one; returns whether it did."""
+        stat = os.stat(self.path)
+        if (stat.st_ino, stat.st_mtime_ns) == self._stat:
+            return False
+        self._attach()
+        return True
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def address(self, i):
+        # numpy drops trailing zero bytes of fixed-width bytes
+        return to_address(self.addresses[i].ljust(20, b'\0'))
+
+    def token(self, i, side=0):
+        if side >= self.n_tokens[i]:
+            return None
+        return to_address(getattr(self, f'token{side}')[i].ljust(20, b'\0'))
+
+    def symbol(self, i, side=0):
+        start = int(getattr(self, f'symbol{side}_start')[i])
+        return bytes(self._strings[start:start + int(getattr(self, f'symbol{side}_len')[i])]).decode()
+
+    def decimals(self, i, side=0):
+        decimals = int(getattr(self, f'decimals{side}')[i])
+        return None if decimals == NO_DECIMALS else decimals
+
+    def index_of(self, address):
+        raw = to_address(address).raw
+        k = int(np.searchsorted(self.sorted_address, raw))
+        if k < len(self) and self.sorted_address[k].ljust(20, b'\0') == raw:
+            return int(self.sorted_row[k])
+        return None
+
+    def select(self, min_gt_score=75.0, min_tvl_usd=500_000, limit=None):
+        # Row indices passing the examples' pool selection (quality_filter), in catalog order
+        mask = ((self.n_tokens > 0) & (self.gt_score >= min_gt_score) & (self.tvl_usd >= min_tvl_usd)
+                & self.whitelisted & (self.n_websites > 0))
+        rows = np.flatnonzero(mask)
+        return rows if limit is None else rows[:limit]
+
+    def record(self, i):
+        # The stored fields in the exchange data's shape; websites are only counted
+        tokens = [{'id': self.token(i, side).lowercase, 'symbol': self.symbol(i, side), 'decimals': self.decimals(i, side)}
+                  for side in range(int(self.n_tokens[i]))]
+        return {
+            'id': self.address(i).lowercase,
+            'inputTokens': tokens,
+            'gtScore': float(self.gt_score[i]),
+            'totalValueLockedUSD': float(self.tvl_usd[i]),
+            'tokenPriceUSD': float(self.price_usd[i]),
+            'whitelisted': bool(self.whitelisted[i]),
+            'nWebsites': int(self.n_websites[i]),
+        }
+
+    def close(self):
+        # The mapping itself goes once no column array refers to it
+        self._strings.release()
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
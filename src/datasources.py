@@ -0,0 +1,137 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+
+
+class DataBundle:
+    """The values of one join, plus how fresh each one is.
+
+    ``stale`` lists the sources served from their last good value because the refetch
+    failed or timed out; ``errors`` holds the sources that have no value at all.
+    """
+
+    def __init__(self, values, ages, stale, errors):
+        self.values = values
+        self.ages = ages
+        self.stale = stale
+        self.errors = errors
+
+    def __getitem__(self, name):
+        if name not in self.values:
+            raise ValueError(f"Data source {name} is unavailable: {self.errors.get(name)}")
+        return self.values[name]
+
+    def __contains__(self, name):
+        return name in self.values
+
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+
+
+class _Source:
+    def __init__(self, name, fetch, ttl, timeout):
+        self.name = name
+        self.fetch = fetch
+        self.ttl = ttl
+        self.timeout = timeout
+        self.value = None
+        self.fetched_at = None
+        self.error = None
+        self.future = None
+        self.lock = threading.Lock()
+
+
+class DataSources:
+    """Registry of named external inputs for strategies, fetched concurrently and cached.
+
+    A source is reused until its TTL expires. Expired sources are refetched all at once,
+    so ``fetch`` takes as long as the slowest of them, bounded by the longest timeout.
+    A source that fails or times out falls back to its last good value. A fetch that is
+    still running after its timeout keeps going and refreshes the cache for the next join.
+    """
+
+    def __init__(self, max_workers=8, http=None):
+        self.http = http if http is not None else requests.Session()
+        self._sources = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    def register(self, name, fetch, ttl=60, timeout=10):
+        # fetch(timeout) returns the value or raises
+        self._sources[name] = _Source(name, fetch, ttl, timeout)
+        return self
+
+    def register_url(self, name, url, ttl=60, timeout=10, parse=None):
+        def fetch(timeout):
+            response = self.http.get(url() if callable(url) else url, timeout=timeout)
+            response.raise_for_status()
+            data = response.json()
+            return parse(data) if parse is not None else data
+        return self.register(name, fetch, ttl, timeout)
+
+    def register_catalog(self, wedx, name='assets_info', ttl=300, timeout=30):
+        # The exchange data get_assets_info reads, but raising on failure so the last good copy is used
+        return self.register_url(name, lambda: f'{wedx.data_url}/exchange_data_{wedx.get_chain_name()}.json', ttl, timeout)
+
+    def _run(self, source):
+        try:
+            value = source.fetch(source.timeout)
+        except Exception as error:
+            with source.lock:
+                source.error = error
+                source.future = None
+            raise
+        with source.lock:
+            source.value = value
+            source.fetched_at = time.time()
+            source.error = None
+            source.future = None
+        return value
+
+    def _start(self, source):
+        # At most one fetch in flight per source
+        with source.lock:
+            if source.future is None:
+                source.future = self._pool.submit(self._run, source)
+            return source.future
+
+    def fetch(self, names=None):
+        """Joins the given sources (all by default) into one DataBundle."""
+        names = list(names) if names is not None else list(self._sources)
+        unknown = [name for name in names if name not in self._sources]
+        if unknown:
+            raise ValueError(f"Unknown data sources: {', '.join(unknown)}")
+
+        now = time.time()
+        futures = {}
+        for name in names:
+            source = self._sources[name]
+            if source.fetched_at is None or now - source.fetched_at >= source.ttl:
+                futures[name] = self._start(source)
+        if futures:
+            wait(list(futures.values()), timeout=max(self._sources[name].timeout for name in futures))
+
+        values, ages, stale, errors = {}, {}, [], {}
+        now = time.time()
+        for name in names:
+            source = self._sources[name]
+            future = futures.get(name)
+            with source.lock:
+                value, fetched_at = source.value, source.fetched_at
+            failed = future is not None and (not future.done() or future.exception() is not None)
+            if failed:
+                error = future.exception() if future.done() else TimeoutError(f"no answer within {source.timeout} s")
+                errors[name] = error
+            if fetched_at is None:
+                print(f"Data source {name} is unavailable: {errors.get(name)}")
+                continue
+            if failed:
+                stale.append(name)
+                print(f"Data source {name} failed ({errors.pop(name)}), using data from {now - fetched_at:.0f} s ago")
+            values[name] = value
+            ages[name] = now - fetched_at
+        return DataBundle(values, ages, stale, errors)
+
+    def close(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,89 @@
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from addresses import to_address
+from wedx import WedX, load_network
+
+
+class DelegateFleet:
+    """Spreads a fleet's writes over several delegate hot wallets.
+
+    Each portfolio owner is pinned to one delegate (its lane). Lanes run in parallel, one
+    thread per delegate, while the jobs inside a lane run in order, so every delegate
+    keeps a single clean nonce sequence and independent portfolios confirm side by side.
+    """
+
+    def __init__(self, chain_id, chain_rpcs, delegates, network=None):
+        if not delegates:
+            raise ValueError("At least one delegate signer is required")
+        self.chain_id = chain_id
+        self.chain_rpcs = chain_rpcs
+        self.network = network if network is not None else load_network()
+        self.delegates = list(delegates)
+        self._lanes = {}
+        self._clients = {}
+        self._base = None
+        self._lock = threading.Lock()
+
+    def lane_for(self, owner_address):
+        # Sticky assignment to the least loaded delegate
+        key = to_address(owner_address)
+        with self._lock:
+            if key not in self._lanes:
+                load = Counter(self._lanes.values())
+                self._lanes[key] = min(range(len(self.delegates)), key=lambda lane: load[lane])
+            return self._lanes[key]
+
+    def delegate_for(self, owner_address):
+        return self.delegates[self.lane_for(owner_address)]
+
+    def base(self):
+        # The one connected WedX; owners' clients share its provider and codec
+        with self._lock:
+            if self._base is None:
+                delegate = self.delegates[0]
+                self._base = WedX(self.chain_id, delegate.address, None, self.chain_rpcs, signer=delegate, network=self.network)
+            return self._base
+
+    def client(self, owner_address):
+        # WedX reading the owner's portfolio but signing with the owner's delegate
+        key = to_address(owner_address)
+        with self._lock:
+            wedx = self._clients.get(key)
+        if wedx is None:
+            wedx = self.base().for_account(key, self.delegate_for(key))
+            with self._lock:
+                wedx = self._clients.setdefault(key, wedx)
+        return wedx
+
+    def register(self, owner_signer):
+        # Must be signed by the portfolio owner; skipped when the delegate is already set
+        delegate = self.delegate_for(owner_signer.address)
+        owner = self.base().for_account(owner_signer.address, owner_signer)
+        if owner.get_delegated_address() is to_address(delegate.address):
+            return None
+        return owner.change_delegated_address(delegate.address)
+
+    def run(self, jobs):
+        """Runs {owner_address: fn(wedx)} with one worker per lane.
+
+        Returns {owner_address: result}; a job that raised maps to its exception.
+        """
+        lanes = {}
+        for owner_address, fn in jobs.items():
+            lanes.setdefault(self.lane_for(owner_address), []).append((owner_address, fn))
+
+        results = {}
+
+        def run_lane(lane_jobs):
+            for owner_address, fn in lane_jobs:
+                try:
+                    results[owner_address] = fn(self.client(owner_address))
+                except Exception as error:
+                    results[owner_address] = error
+
+        if lanes:
+            with ThreadPoolExecutor(max_workers=len(lanes)) as pool:
+                list(pool.map(run_lane, lanes.values()))
+        return results
@@ -0,0 +1,247 @@
+import math
+import threading
+import time
+
+# Fallback block times (seconds) until enough blocks have been observed
+BLOCK_TIMES = {1: 12.0, 8453: 2.0, 42161: 0.25}
+
+
+class GasOracle:
+    """Base fee and priority fee, read once per block with eth_feeHistory.
+
+    One call returns the recent base fees, the node's exact base fee for the next block
+    and the median tips, so nothing is re-read until the chain moves. Over a WebSocket
+    RPC the pushed head decides when a new read is due; over HTTP it is at most one read
+    per ``max_age`` seconds.
+    """
+
+    def __init__(self, wedx, history=20, max_age=1.0, tip_percentile=50):
+        self.wedx = wedx
+        self.history = history
+        self.max_age = max_age
+        self.tip_percentile = tip_percentile
+        self.block_number = None
+        self._base_fees = []
+        self._tips = []
+        self._next_base_fee = None
+        self._fetched_at = None
+        self._first_seen = None
+        self._lock = threading.Lock()
+
+    def _stale(self):
+        if self.block_number is None:
+            return True
+        follower = getattr(self.wedx.w3.provider, 'follower', None)
+        if follower is not None and follower.last_block is not None:
+            return follower.last_block > self.block_number
+        return time.monotonic() - self._fetched_at >= self.max_age
+
+    def refresh(self):
+        with self._lock:
+            if not self._stale():
+                return
+            history = self.wedx.w3.eth.fee_history(self.history, 'latest', [self.tip_percentile])
+            base_fees = list(history['baseFeePerGas'])
+            # The last entry is the base fee of the block after 'latest'
+            self._base_fees = base_fees[:-1]
+            self._next_base_fee = base_fees[-1]
+            self._tips = [reward[0] for reward in history.get('reward') or [] if reward]
+            self.block_number = history['oldestBlock'] + len(self._base_fees) - 1
+            self._fetched_at = time.monotonic()
+            if self._first_seen is None:
+                self._first_seen = (self._fetched_at, self.block_number)
+
+    def base_fee(self):
+        self.refresh()
+        return self._base_fees[-1]
+
+    def priority_fee(self):
+        self.refresh()
+        if not self._tips:
+            return 0
+        tips = sorted(self._tips[-5:])
+        return tips[len(tips) // 2]
+
+    def trend(self, window=5):
+        # Geometric mean of the per-block base fee change, bounded by the EIP-1559 step
+        self.refresh()
+        fees = (self._base_fees + [self._next_base_fee])[-(window + 1):]
+        ratios = [b / a for a, b in zip(fees, fees[1:]) if a > 0 and b > 0]
+        if not ratios:
+            return 1.0
+        ratio = math.exp(sum(math.log(r) for r in ratios) / len(ratios))
+        return min(max(ratio, 7 / 8), 9 / 8)
+
+    def forecast(self, blocks=1):
+        """Base fee expected ``blocks`` blocks ahead; 1 is the next block and is exact."""
+        self.refresh()
+        if blocks <= 1:
+            return self._next_base_fee
+        return int(self._next_base_fee * self.trend() ** (blocks - 1))
+
+    def gas_price(self, blocks=1):
+        return self.forecast(blocks) + self.priority_fee()
+
+    def block_time(self):
+        self.refresh()
+        started, first_block = self._first_seen
+        if self.block_number - first_block >= 3:
+            return (self._fetched_at - started) / (self.block_number - first_block)
+        return BLOCK_TIMES.get(self.wedx.chain_id, 2.0)
+
+
+class ScheduledWrite:
+    def __init__(self, operation, args, cap, deadline):
+        self.operation = operation
+        self.args = args
+        self.cap = cap
+        self.deadline = deadline
+        self.status = 'held'
+        self.result = None
+        self.error = None
+        self.gas_price = None
+        self.reason = None
+
+    @property
+    def name(self):
+        return self.operation if isinstance(self.operation, str) else getattr(self.operation, '__name__', 'operation')
+
+    def __repr__(self):
+        return f"ScheduledWrite({self.name!r}, status={self.status!r})"
+
+
+class ExecutionScheduler:
+    """Holds WedX writes until gas is cheap enough or their deadline arrives.
+
+    An operation is a WedX write method name ('set_portfolio', 'rank_me', ...) or any
+    callable taking the WedX instance, e.g. ``lambda wedx: plan.execute()``. Each one is
+    released when the price the next block will charge (exact base fee plus the median
+    tip) is at or below its cap, when its deadline passes, or early when the price is
+    rising and the forecast shows it will not fall under the cap before the deadline.
+    """
+
+    def __init__(self, wedx, oracle=None, caps=None, default_cap=None, horizon=10):
+        self.wedx = wedx
+        self.oracle = oracle if oracle is not None else GasOracle(wedx)
+        self.caps = caps or {}
+        self.default_cap = default_cap
+        self.horizon = horizon
+        self.writes = []
+        self._new_block = threading.Event()
+        follower = getattr(wedx.w3.provider, 'follower', None)
+        if follower is not None:
+            follower.on_block(lambda number: self._new_block.set())
+
+    def submit(self, operation, *args, cap=None, max_wait=None):
+        name = operation if isinstance(operation, str) else None
+        if cap is None:
+            cap = self.caps.get(name, self.default_cap)
+        deadline = None if max_wait is None else time.time() + max_wait
+        write = ScheduledWrite(operation, args, cap, deadline)
+        self.writes.append(write)
+        return write
+
+    @property
+    def held(self):
+        return [write for write in self.writes if write.status == 'held']
+
+    def _release_reason(self, write, price, now):
+        if write.cap is None or price <= write.cap:
+            return 'under cap'
+        if write.deadline is None:
+            return None
+        if now >= write.deadline:
+            return 'deadline'
+        blocks_left = int((write.deadline - now) / self.oracle.block_time())
+        if blocks_left <= self.horizon and self.oracle.trend() > 1.0 and self.oracle.gas_price(blocks_left + 1) > write.cap:
+            return 'rising before deadline'
+        return None
+
+    def fees(self, write, reason):
+        """(maxPriorityFeePerGas, maxFeePerGas) a released write is signed with.
+
+        A write released under its cap pays at most the cap; one released by its
+        deadline gets the usual headroom of twice the next base fee.
+        """
+        tip = self.oracle.priority_fee()
+        base_fee = self.oracle.forecast(1)
+        if reason == 'under cap' and write.cap is not None:
+            return min(tip, write.cap), write.cap
+        return tip, 2 * base_fee + tip
+
+    def _release(self, write, price, reason):
+        write.status = 'running'
+        write.gas_price = price
+        write.reason = reason
+        tip, max_fee = self.fees(write, reason)
+        try:
+            with self.wedx.fee_limits(max_fee, tip):
+                if isinstance(write.operation, str):
+                    write.result = getattr(self.wedx, write.operation)(*write.args)
+                else:
+                    write.result = write.operation(self.wedx, *write.args)
+            write.status = 'done'
+        except Exception as error:
+            write.status = 'failed'
+            write.error = error
+
+    def poll(self):
+        """Evaluates held writes against the current price once; returns the released ones."""
+        held = self.held
+        if not held:
+            return []
+        price = self.oracle.gas_price()
+        now = time.time()
+        released = []
+        for write in held:
+            reason = self._release_reason(write, price, now)
+            if reason is not None:
+                self._release(write, price, reason)
+                released.append(write)
+        return released
+
+    def _wait_for_block(self, stop=None):
+        timeout = min(max(self.oracle.block_time(), 0.25), 12.0)
+        deadlines = [write.deadline for write in self.held if write.deadline is not None]
+        if deadlines:
+            timeout = max(0.0, min(timeout, min(deadlines) - time.time()))
+        if stop is not None:
+            timeout = max(0.0, min(timeout, stop - time.monotonic()))
+        if getattr(self.wedx.w3.provider, 'follower', None) is not None:
+            self._new_block.wait(timeout)
+            self._new_block.clear()
+        else:
+            time.sleep(timeout)
+
+    def run(self, timeout=None):
+        # Polls once per block until nothing is held or the timeout expires
+        stop = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.poll()
+            if not self.held or (stop is not None and time.monotonic() >= stop):
+                return self.writes
+            self._wait_for_block(stop)
+
+    def execute(self, operation, *args, cap=None, max_wait=None, timeout=None):
+        """Blocking form: one write, returned (or raised) once it has been released.
+
+        A capped write needs ``max_wait`` (released at the deadline whatever the price)
+        or ``timeout`` (given up with TimeoutError, status 'expired'), since a cap the
+        chain never reaches would otherwise block forever.
+        """
+        write = self.submit(operation, *args, cap=cap, max_wait=max_wait)
+        if write.cap is not None and write.deadline is None and timeout is None:
+            self.writes.remove(write)
+            raise ValueError(f"{write.name} has a gas cap but neither max_wait nor timeout")
+        stop = None if timeout is None else time.monotonic() + timeout
+        while write.status == 'held':
+            self.poll()
+            if write.status != 'held':
+                break
+            if stop is not None and time.monotonic() >= stop:
+                write.status = 'expired'
+                raise TimeoutError(f"{write.name} was not released under its cap within {timeout} s")
+            self._wait_for_block(stop)
+        if write.status == 'failed':
+            raise write.error
+        return write.result
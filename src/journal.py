@@ -0,0 +1,244 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+from eth_utils import event_abi_to_log_topic, keccak
+
+PENDING = ('signed', 'sent')
+UNRESOLVED = ('planned',) + PENDING
+
+
+def _int(value):
+    if value is None or isinstance(value, int):
+        return value
+    return int(value, 16)
+
+
+def _hex(value):
+    if value is None or isinstance(value, str):
+        return value
+    return '0x' + bytes(value).hex()
+
+
+def event_names(network):
+    # topic0 → event name for every ABI of one chain's network data
+    names = {}
+    for key, abi in network.items():
+        if key.startswith('abi'):
+            for item in abi:
+                if item['type'] == 'event':
+                    names.setdefault('0x' + event_abi_to_log_topic(item).hex(), item['name'])
+    return names
+
+
+def summarize_receipt(receipt, names=None):
+    """Compact receipt: hash, block, status, gas, fee and the decoded event names.
+
+    Accepts web3's formatted receipts as well as raw JSON-RPC ones.
+    """
+    names = names or {}
+    events = []
+    for log in receipt.get('logs') or []:
+        topics = log.get('topics') or []
+        if topics:
+            topic = _hex(topics[0]).lower()
+            events.append(names.get(topic, topic[:10]))
+    gas_used = _int(receipt.get('gasUsed'))
+    gas_price = _int(receipt.get('effectiveGasPrice'))
+    return {
+        'tx_hash': _hex(receipt['transactionHash']),
+        'block': _int(receipt['blockNumber']),
+        'status': _int(receipt['status']),
+        'gas_used': gas_used,
+        'fee_wei': gas_used * gas_price if gas_used is not None and gas_price is not None else None,
+        'events': events,
+    }
+
+
+def format_summary(summary):
+    status = 'success' if summary['status'] == 1 else 'reverted'
+    events = ', '.join(summary['events']) or 'no events'
+    return f"Transaction {summary['tx_hash']} {status} in block {summary['block']}, gas used {summary['gas_used']} ({events})"
+
+
+class TxJournal:
+    """Append-only record of every transaction the SDK plans, signs, sends and confirms.
+
+    Each state change is one JSON line, flushed and fsync'ed before the SDK moves on, so
+    after a crash the file says exactly how far each transaction got. A garbled line is
+    skipped, and a torn last line is cut off before anything new is appended. Signed
+    transactions keep their raw bytes, so an unconfirmed one can be re-broadcast as is
+    rather than rebuilt with a new nonce.
+    """
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self.entries = {}
+        # key → id of the unresolved entry for that action, so lookups do not scan the history
+        self._open = {}
+        self._lock = threading.Lock()
+        self._load()
+        self._file = open(path, 'a')
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        tail_ok = True
+        for line in data.splitlines():
+            tail_ok = self._apply(line)
+        if data and not data.endswith(b'\n'):
+            with open(self.path, 'r+b') as f:
+                if tail_ok:
+                    # Complete record, only its newline is missing
+                    f.seek(0, os.SEEK_END)
+                    f.write(b'\n')
+                else:
+                    # Cut the torn tail so the next record starts on a line of its own
+                    f.truncate(data.rfind(b'\n') + 1)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _apply(self, line):
+        try:
+            record = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            # A garbled line loses only itself; later records still count
+            return False
+        if not isinstance(record, dict) or 'id' not in record:
+            return False
+        self._update(record)
+        return True
+
+    def _update(self, record):
+        entry = self.entries.setdefault(record['id'], {})
+        entry.update(record)
+        key = entry.get('key')
+        if entry.get('state') in UNRESOLVED:
+            self._open[key] = entry['id']
+        elif self._open.get(key) == entry['id']:
+            del self._open[key]
+
+    def _append(self, entry_id, state, **fields):
+        record = dict(fields, id=entry_id, state=state, at=time.time())
+        line = json.dumps(record, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._update(record)
+
+    @staticmethod
+    def key(chain_id, call):
+        # Same chain, sender, target, calldata and value: the same on-chain action
+        text = f"{chain_id}:{call['from']}:{call['to']}:{call['data']}:{call.get('value', 0)}".lower()
+        return '0x' + keccak(text=text).hex()
+
+    def plan(self, chain_id, call, operation):
+        entry_id = uuid.uuid4().hex
+        self._append(entry_id, 'planned', chain_id=chain_id, key=self.key(chain_id, call), operation=operation,
+                     sender=call['from'], to=call['to'], data=call['data'], value=call.get('value', 0))
+        return entry_id
+
+    def signed(self, entry_id, tx, raw_tx):
+        tx_hash = '0x' + keccak(bytes(raw_tx)).hex()
+        self._append(entry_id, 'signed', tx_hash=tx_hash, nonce=tx['nonce'], gas=tx['gas'],
+                     gas_price=tx.get('gasPrice', tx.get('maxFeePerGas')), raw='0x' + bytes(raw_tx).hex())
+        return tx_hash
+
+    def sent(self, entry_id):
+        self._append(entry_id, 'sent')
+
+    def confirmed(self, entry_id, summary):
+        self._append(entry_id, 'confirmed', receipt=summary)
+
+    def failed(self, entry_id, error):
+        self._append(entry_id, 'failed', error=str(error))
+
+    def pending(self, chain_id, call):
+        entry_id = self._open.get(self.key(chain_id, call))
+        entry = self.entries.get(entry_id)
+        if entry is not None and entry['state'] in PENDING:
+            return entry
+        return None
+
+    def unresolved(self, chain_id=None):
+        entries = [self.entries[entry_id] for entry_id in list(self._open.values())]
+        return [entry for entry in entries if chain_id is None or entry.get('chain_id') == chain_id]
+
+    def reconcile(self, w3, chain_id, names=None):
+        """Settles the unresolved entries of one chain against it, in one batched lookup.
+
+        Mined transactions are marked confirmed, transactions whose nonce was taken by
+        another one are marked dropped, and still-pending ones are re-broadcast from their
+        raw bytes. Entries that never got signed left nothing on chain and are abandoned.
+        """
+        outcome = {'confirmed': [], 'dropped': [], 'resumed': [], 'abandoned': []}
+        entries = self.unresolved(chain_id)
+        for entry in entries:
+            if entry['state'] == 'planned':
+                self._append(entry['id'], 'abandoned')
+                outcome['abandoned'].append(entry['id'])
+        entries = [entry for entry in entries if entry['state'] in PENDING]
+        if not entries:
+            return outcome
+
+        senders = sorted({entry['sender'] for entry in entries})
+        requests = [('eth_getTransactionReceipt', [entry['tx_hash']]) for entry in entries]
+        requests += [('eth_getTransactionCount', [sender, 'latest']) for sender in senders]
+        responses = w3.provider.make_batch_request(requests)
+        if not isinstance(responses, list):
+            raise ValueError(f"Journal reconciliation failed: {responses.get('error')}")
+        nonces = {sender: _int(response.get('result')) for sender, response in zip(senders, responses[len(entries):])}
+
+        rebroadcast, replaced = [], []
+        for entry, response in zip(entries, responses):
+            receipt = response.get('result')
+            if receipt is not None:
+                self.confirmed(entry['id'], summarize_receipt(receipt, names))
+                outcome['confirmed'].append(entry['id'])
+            elif nonces.get(entry['sender']) is not None and entry['nonce'] < nonces[entry['sender']]:
+                replaced.append(entry)
+            else:
+                rebroadcast.append(entry)
+        if replaced:
+            # The nonce is used; look once more in case the transaction was mined between the two reads
+            responses = w3.provider.make_batch_request([('eth_getTransactionReceipt', [entry['tx_hash']]) for entry in replaced])
+            for entry, response in zip(replaced, responses):
+                receipt = response.get('result') if isinstance(response, dict) else None
+                if receipt is not None:
+                    self.confirmed(entry['id'], summarize_receipt(receipt, names))
+                    outcome['confirmed'].append(entry['id'])
+                else:
+                    self._append(entry['id'], 'dropped')
+                    outcome['dropped'].append(entry['id'])
+        if rebroadcast:
+            # Already-known errors are expected here; the transaction stays pending either way
+            w3.provider.make_batch_request([('eth_sendRawTransaction', [entry['raw']]) for entry in rebroadcast])
+            for entry in rebroadcast:
+                self.sent(entry['id'])
+                outcome['resumed'].append(entry['id'])
+        return outcome
+
+    def compact(self):
+        # Rewrites the file with one line per entry; resolved entries keep only their outcome
+        with self._lock:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                for entry in self.entries.values():
+                    if entry['state'] not in UNRESOLVED:
+                        entry = {k: v for k, v in entry.items() if k not in ('raw', 'data')}
+                    f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp, self.path)
+            self._file = open(self.path, 'a')
+
+    def close(self):
+        self._file.close()
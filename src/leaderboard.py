@@ -0,0 +1,118 @@
+import numpy as np
+
+from addresses import to_address
+from results import decode_address_array, decode_trader_data, trader_data_decoder
+
+# The getTraderData fields a LeaderboardSnapshot is built from
+_decode_snapshot_fields = trader_data_decoder(('performances', 'timestamps', 'init_timestamp'))
+
+
+def uint_array(values):
+    # uint256 values that fit in 64 bits are stored packed, anything larger falls back to Python ints
+    values = list(values)
+    if not values or max(values) < 2 ** 64:
+        return np.array(values, dtype=np.uint64)
+    return np.array(values, dtype=object)
+
+
+class LeaderboardSnapshot:
+    def __init__(self, block_number, traders, scores, interactions, last_performance, last_timestamp, init_timestamp,
+                 total_rank_sum, max_ranking, min_ranking, required_interactions, trader_data=None):
+        self.block_number = block_number
+        self.traders = traders
+        self.scores = scores
+        self.interactions = interactions
+        self.last_performance = last_performance
+        self.last_timestamp = last_timestamp
+        self.init_timestamp = init_timestamp
+        self.total_rank_sum = total_rank_sum
+        self.max_ranking = max_ranking
+        self.min_ranking = min_ranking
+        self.required_interactions = required_interactions
+        self.trader_data = trader_data
+        self._index = {to_address(trader): i for i, trader in enumerate(traders)}
+
+    def __len__(self):
+        return len(self.traders)
+
+    def index_of(self, trader):
+        return self._index.get(to_address(trader))
+
+    def score_of(self, trader):
+        i = self.index_of(trader)
+        return None if i is None else int(self.scores[i])
+
+    def position_for(self, score):
+        # 1-based position a trader with this score would take
+        return int(np.count_nonzero(self.scores > score)) + 1
+
+    def rank_of(self, trader):
+        score = self.score_of(trader)
+        return None if score is None else self.position_for(score)
+
+    def order(self):
+        # Indices of traders from best to worst score
+        return np.argsort(-self.scores.astype(np.float64), kind='stable')
+
+
+class Leaderboard:
+    """Bulk reader for the WEDXManager ranking, cached per block.
+
+    Reads the ranking list and the manager totals in one batch, then every listed
+    trader's score and data in batches of wedx.batch_size.
+    """
+
+    def __init__(self, wedx, keep_trader_data=False):
+        self.wedx = wedx
+        self.keep_trader_data = keep_trader_data
+        self._manager = None
+        self._snapshot = None
+
+    def _manager_address(self):
+        manager_account_address = self.wedx.get_manager_account_address()
+        if manager_account_address == self.wedx.zero_address:
+            raise ValueError("Error retrieving manager contract address")
+        return manager_account_address
+
+    def read(self, block_number=None):
+        if block_number is None:
+            block_number = self.wedx.w3.eth.block_number
+        if self._snapshot is not None and self._snapshot.block_number == block_number:
+            return self._snapshot
+
+        if self._manager is None:
+            self._manager = self._manager_address()
+        manager = self._manager
+        traders, total_rank_sum, max_ranking, min_ranking, required_interactions = self.wedx.batch_read([
+            (manager, 'abiWEDXManager', 'getRankingList', ()),
+            (manager, 'abiWEDXManager', 'totalRankSum', ()),
+            (manager, 'abiWEDXManager', 'maxRanking', ()),
+            (manager, 'abiWEDXManager', 'minRanking', ()),
+            (manager, 'abiWEDXManager', 'getNPoints', ()),
+        ], block_number, decoders={'getRankingList': decode_address_array})
+
+        calls = []
+        for trader in traders:
+            calls.append((manager, 'abiWEDXManager', 'getTraderScore', (trader,)))
+            calls.append((manager, 'abiWEDXManager', 'getTraderData', (trader,)))
+        # Only the fields the snapshot needs are decoded, unless the full data is kept
+        decoder = decode_trader_data if self.keep_trader_data else _decode_snapshot_fields
+        results = self.wedx.batch_read(calls, block_number, decoders={'getTraderData': decoder})
+        scores = results[0::2]
+        trader_data = results[1::2]
+
+        self._snapshot = LeaderboardSnapshot(
+            block_number,
+            traders,
+            uint_array(scores),
+            np.array([len(data.performances) for data in trader_data], dtype=np.uint32),
+            uint_array([data.performances[-1] if data.performances else 0 for data in trader_data]),
+            np.array([data.timestamps[-1] if data.timestamps else 0 for data in trader_data], dtype=np.uint64),
+            np.array([data.init_timestamp for data in trader_data], dtype=np.uint64),
+            total_rank_sum,
+            max_ranking,
+            min_ranking,
+            required_interactions,
+            trader_data if self.keep_trader_data else None,
+        )
+        return self._snapshot
@@ -0,0 +1,141 @@
+from addresses import to_address
+from results import decode_address_array, decode_uint_array
+
+
+class LendingPlan:
+    def __init__(self, withdraw, supply, lender_ids, keep, lent, withdraw_lender_ids=None):
+        self.withdraw = withdraw
+        self.supply = supply
+        self.lender_ids = lender_ids
+        # Lender ids to supply the withdrawn assets with again if the rebalance fails
+        self.withdraw_lender_ids = withdraw_lender_ids
+        self.keep = keep
+        self.lent = lent
+
+    def __repr__(self):
+        return f"LendingPlan(withdraw={len(self.withdraw)}, supply={len(self.supply)}, keep={len(self.keep)})"
+
+
+class LendingManager:
+    """Withdraws and supplies only the assets a rebalance actually touches.
+
+    Lent amounts (getAmountLendToken) of the old and new assets and the portfolio's
+    actual distribution are read in one batch. A lent asset is withdrawn when it leaves
+    the portfolio or changes weight, so setPortfolio can trade it. An unchanged target
+    weight is not enough to keep it lent: prices drift, and setPortfolio trades any asset
+    whose actual value share is off its target. So an asset stays lent only when its
+    weight does not change and its share in getActualDistribution is within ``drift``
+    of that weight (distribution units, 10**6 = 100%).
+
+    By default ``drift`` is the portfolio's getMinPercAllowance, read in the same batch:
+    the smallest per-asset change the contract acts on, so a smaller deviation is taken
+    to be left untraded. A lower drift withdraws more often and costs more gas; 0 keeps
+    an asset lent only on an exact match. A higher one risks setPortfolio trading an
+    asset that is still lent.
+
+    This assumes getActualDistribution counts lent balances. If the contract does not,
+    a lent asset shows too small a share and is withdrawn, which is the safe outcome.
+
+    Afterwards only new assets that are not kept lent are supplied. An empty set sends
+    no transaction. ``lender_id`` is the lenderIds entry passed to supplyLendTokens: one
+    id for every asset or a dict of asset → id (missing assets get 0).
+    """
+
+    def __init__(self, wedx, lender_id=0, drift=None):
+        self.wedx = wedx
+        self.lender_id = lender_id
+        self.drift = drift
+        self._portfolio = None
+
+    def portfolio(self):
+        # Resolved once; an account never moves once created
+        if self._portfolio is None:
+            portfolio = self.wedx.get_trading_account_address()
+            if portfolio == self.wedx.zero_address:
+                raise ValueError("User does not have an account")
+            self._portfolio = portfolio
+        return self._portfolio
+
+    def positions(self, assets, block_identifier='latest'):
+        # Lent amount of every asset, in raw token units
+        assets = list(dict.fromkeys(to_address(asset) for asset in assets))
+        if not assets:
+            return {}
+        portfolio = self.portfolio()
+        calls = [(portfolio, 'abiWEDXPro', 'getAmountLendToken', (asset,)) for asset in assets]
+        return dict(zip(assets, self.wedx.batch_read(calls, block_identifier)))
+
+    def holdings(self, assets, block_identifier='latest'):
+        # positions() and the actual share of every held asset, in the same batch
+        positions, shares, _ = self._holdings(assets, False, block_identifier)
+        return positions, shares
+
+    def _holdings(self, assets, allowance, block_identifier='latest'):
+        # holdings(), plus getMinPercAllowance when asked for, still in one batch
+        assets = list(dict.fromkeys(to_address(asset) for asset in assets))
+        portfolio = self.portfolio()
+        calls = [(portfolio, 'abiWEDXPro', 'getAmountLendToken', (asset,)) for asset in assets]
+        calls += [(portfolio, 'abiWEDXPro', 'getAddresses', ()), (portfolio, 'abiWEDXPro', 'getActualDistribution', ())]
+        if allowance:
+            calls.append((portfolio, 'abiWEDXPro', 'getMinPercAllowance', ()))
+        results = self.wedx.batch_read(calls, block_identifier, decoders={
+            'getAddresses': decode_address_array, 'getActualDistribution': decode_uint_array})
+        allowance = results.pop() if allowance else None
+        return dict(zip(assets, results[:-2])), self._weights(results[-2], results[-1]), allowance
+
+    def _weights(self, assets, distribution):
+        # New distributions carry the native asset's weight last, without its address
+        assets = [to_address(asset) for asset in assets]
+        if len(distribution) == len(assets) + 1:
+            assets.append(to_address(self.wedx.network[self.wedx.get_chain_name()]['wrap_address']))
+        elif len(distribution) != len(assets):
+            raise ValueError("Distribution and assets have different lengths")
+        return dict(zip(assets, distribution))
+
+    def plan(self, current_assets, current_distribution, new_assets, new_distribution, lent=None, actual=None):
+        drift = self.drift
+        if lent is None or actual is None:
+            positions, shares, allowance = self._holdings(list(current_assets) + list(new_assets), drift is None)
+            lent = positions if lent is None else lent
+            actual = shares if actual is None else actual
+            drift = allowance if drift is None else drift
+        elif drift is None:
+            drift = self.wedx.batch_read([(self.portfolio(), 'abiWEDXPro', 'getMinPercAllowance', ())])[0]
+        current = self._weights(current_assets, current_distribution)
+        new = self._weights(new_assets, new_distribution)
+        withdraw, keep = [], []
+        for asset, weight in current.items():
+            if not lent.get(asset):
+                continue
+            if new.get(asset) == weight and abs(actual.get(asset, 0) - weight) <= drift:
+                keep.append(asset)
+            else:
+                withdraw.append(asset)
+        kept = set(keep)
+        supply = [asset for asset in dict.fromkeys(to_address(asset) for asset in new_assets)
+                  if new[asset] > 0 and asset not in kept]
+        return LendingPlan(withdraw, supply, self.lender_ids(supply), keep, lent, self.lender_ids(withdraw))
+
+    def lender_ids(self, assets):
+        if isinstance(self.lender_id, dict):
+            ids = {to_address(asset): lender_id for asset, lender_id in self.lender_id.items()}
+            return [ids.get(to_address(asset), 0) for asset in assets]
+        return [self.lender_id] * len(assets)
+
+    def withdraw(self, plan):
+        if not plan.withdraw:
+            return None
+        return self.wedx.withdraw_from_lending(plan.withdraw)
+
+    def supply(self, plan):
+        if not plan.supply:
+            return None
+        return self.wedx.earn_with_lending(plan.supply, plan.lender_ids)
+
+    def rebalance(self, current_assets, current_distribution, new_assets, new_distribution):
+        # withdraw → set_portfolio → supply, as in the examples, skipping what is already in place
+        plan = self.plan(current_assets, current_distribution, new_assets, new_distribution)
+        self.withdraw(plan)
+        self.wedx.set_portfolio(new_assets, new_distribution)
+        self.supply(plan)
+        return plan
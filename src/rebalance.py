@@ -0,0 +1,273 @@
+import time
+
+from hexbytes import HexBytes
+from web3.exceptions import ContractLogicError, Web3RPCError
+
+from journal import format_summary, summarize_receipt
+
+
+class PlanStep:
+    def __init__(self, name, method, args=(), condition=None, wait=False):
+        self.name = name
+        self.method = method
+        self.args = args
+        self.condition = condition
+        self.wait = wait
+        self.call = None
+        self.tx = None
+        self.raw_tx = None
+        self.tx_hash = None
+        self.receipt = None
+        self.entry_id = None
+        self.status = 'planned'
+        self.error = None
+
+    def __repr__(self):
+        return f"PlanStep({self.name!r}, status={self.status!r})"
+
+
+class PlanResult:
+    def __init__(self, steps, recovery_steps, elapsed):
+        self.steps = steps
+        self.recovery_steps = recovery_steps
+        self.elapsed = elapsed
+
+    @property
+    def success(self):
+        return all(step.status in ('confirmed', 'skipped') for step in self.steps) and not self.failed
+
+    @property
+    def failed(self):
+        return [step for step in self.steps if step.status == 'failed']
+
+    @property
+    def receipts(self):
+        return {step.name: step.receipt for step in self.steps + self.recovery_steps if step.receipt is not None}
+
+
+class RebalancePlan:
+    """Builds a sequence of WedX writes up front and submits them back to back.
+
+    Unconditional steps are estimated, signed with consecutive nonces and broadcast
+    without waiting for each other; the chain executes them in nonce order, but a revert
+    does not stop the ones after it. So a step added with ``wait=True`` (the lending
+    withdraw) is confirmed before anything after it is broadcast. Steps with a condition
+    (e.g. rank_me once enough interactions are recorded) are evaluated and sent after
+    everything before them is confirmed.
+
+    Once a broadcast fails or a step reverts, later steps are not sent, so no nonce gap
+    is left behind. The plan's recovery function is then called with the result and may
+    return further (name, method, args) steps, which are sent one at a time.
+    """
+
+    def __init__(self, wedx, pipeline=True, gas_buffer=1.2, fallback_gas=1_500_000, timeout=180, poll_latency=0.5,
+                 recovery=None):
+        self.wedx = wedx
+        self.pipeline = pipeline
+        self.gas_buffer = gas_buffer
+        self.fallback_gas = fallback_gas
+        self.timeout = timeout
+        self.poll_latency = poll_latency
+        self.recovery = recovery
+        self.steps = []
+        self._nonce = None
+        self._fees = None
+
+    def add(self, name, method, *args, condition=None, wait=False):
+        self.steps.append(PlanStep(name, method, args, condition, wait))
+        return self
+
+    @classmethod
+    def rebalance(cls, wedx, current_assets, new_assets, new_distribution, lending=True, rank=True, **kwargs):
+        # The withdraw → set_portfolio → supply → rank_me sequence from the examples, without the sleeps.
+        # lending may also be a LendingPlan, whose withdraw and supply sets replace the full lists
+        withdraw, supply, lender_ids, withdraw_ids = current_assets, new_assets, None, None
+        if hasattr(lending, 'withdraw'):
+            withdraw, supply = lending.withdraw, lending.supply
+            lender_ids, withdraw_ids = lending.lender_ids, lending.withdraw_lender_ids
+        plan = cls(wedx, recovery=restore_lending(withdraw, withdraw_ids), **kwargs)
+        if lending and withdraw:
+            # set_portfolio needs the assets back, so it is not broadcast before this lands
+            plan.add('withdraw_from_lending', 'withdraw_from_lending', withdraw, wait=True)
+        plan.add('set_portfolio', 'set_portfolio', new_assets, new_distribution)
+        if lending and supply:
+            if lender_ids is None:
+                plan.add('earn_with_lending', 'earn_with_lending', supply)
+            else:
+                plan.add('earn_with_lending', 'earn_with_lending', supply, lender_ids)
+        if rank:
+            plan.add('rank_me', 'rank_me', condition=interactions_complete)
+        return plan
+
+    def _collect(self, step):
+        with self.wedx.simulator.collect() as planned:
+            getattr(self.wedx, step.method)(*step.args)
+        if len(planned) != 1:
+            raise ValueError(f"{step.method} does not map to a single transaction")
+        step.call = planned[0]
+
+    def _estimate(self, step, required):
+        try:
+            return int(self.wedx.w3.eth.estimate_gas(step.call) * self.gas_buffer)
+        except (ContractLogicError, Web3RPCError, ValueError) as error:
+            # Later steps may only succeed once earlier ones land, so they get the fallback limit
+            if required:
+                raise ValueError(f"{step.name} would revert: {error}")
+            return self.fallback_gas
+
+    def _sign(self, step, required=False):
+        self._collect(step)
+        journal = self.wedx.journal
+        if journal is not None:
+            entry = journal.pending(self.wedx.chain_id, step.call)
+            if entry is not None:
+                # Sent by an earlier run that did not see it confirmed; wait for it instead
+                step.entry_id = entry['id']
+                step.tx_hash = HexBytes(entry['tx_hash'])
+                step.status = 'sent'
+                return
+            step.entry_id = journal.plan(self.wedx.chain_id, step.call, step.method)
+        gas = self._estimate(step, required)
+        step.tx = {
+            'chainId': self.wedx.chain_id,
+            'to': step.call['to'],
+            'data': step.call['data'],
+            'value': step.call['value'],
+            'gas': gas,
+            **self._fees,
+            'nonce': self._nonce,
+        }
+        step.raw_tx = self.wedx.signer.sign_transaction(step.tx)
+        if step.entry_id is not None:
+            journal.signed(step.entry_id, step.tx, step.raw_tx)
+        self._nonce += 1
+        step.status = 'signed'
+
+    def _send(self, step):
+        try:
+            step.tx_hash = self.wedx.w3.eth.send_raw_transaction(step.raw_tx)
+            step.status = 'sent'
+            if step.entry_id is not None:
+                self.wedx.journal.sent(step.entry_id)
+        except Exception as error:
+            step.status = 'failed'
+            step.error = str(error)
+            if step.entry_id is not None and isinstance(error, (Web3RPCError, ValueError)):
+                self.wedx.journal.failed(step.entry_id, error)
+            # This nonce was not used, so the next signed step would be stuck behind it
+            self._nonce = step.tx['nonce']
+        return step.status == 'sent'
+
+    def _wait(self, step):
+        try:
+            step.receipt = self.wedx.wait_for_receipt(step.tx_hash, timeout=self.timeout, poll_latency=self.poll_latency)
+        except Exception as error:
+            step.status = 'failed'
+            step.error = str(error)
+            return False
+        if step.entry_id is not None:
+            self.wedx.journal.confirmed(step.entry_id, summarize_receipt(step.receipt, self.wedx.event_names()))
+        if step.receipt['status'] == 1:
+            step.status = 'confirmed'
+            return True
+        step.status = 'failed'
+        step.error = 'reverted'
+        return False
+
+    def _run(self, steps):
+        pending = []
+        for i, step in enumerate(steps):
+            if step.condition is not None:
+                # Conditions read chain state, so everything before must be confirmed first
+                ok = all([self._wait(sent) for sent in pending])
+                pending = []
+                if not ok:
+                    self._skip(steps[i:])
+                    return
+                if not step.condition(self.wedx):
+                    step.status = 'skipped'
+                    continue
+            try:
+                self._sign(step, required=not pending)
+            except Exception as error:
+                step.status = 'failed'
+                step.error = str(error)
+                if step.entry_id is not None:
+                    self.wedx.journal.failed(step.entry_id, error)
+                self._skip(steps[i + 1:])
+                break
+            if step.status != 'sent' and not self._send(step):
+                self._skip(steps[i + 1:])
+                break
+            pending.append(step)
+            if step.wait or not self.pipeline:
+                ok = all([self._wait(sent) for sent in pending])
+                pending = []
+                if not ok:
+                    self._skip(steps[i + 1:])
+                    break
+        for step in pending:
+            self._wait(step)
+
+    @staticmethod
+    def _skip(steps):
+        for step in steps:
+            step.status = 'skipped'
+
+    def execute(self):
+        start = time.perf_counter()
+        address = self.wedx.signer.address
+        self._nonce = self.wedx.w3.eth.get_transaction_count(address, 'pending')
+        self._fees = self.wedx.fee_fields()
+
+        self._run(self.steps)
+        result = PlanResult(self.steps, [], 0.0)
+
+        if result.failed and self.recovery is not None:
+            result.recovery_steps = [PlanStep(name, method, args) for name, method, args in self.recovery(result)]
+            pipeline, self.pipeline = self.pipeline, False
+            try:
+                self._run(result.recovery_steps)
+            finally:
+                self.pipeline = pipeline
+
+        result.elapsed = time.perf_counter() - start
+        for step in result.steps + result.recovery_steps:
+            if step.receipt is not None:
+                print(f"{step.name}: {format_summary(summarize_receipt(step.receipt, self.wedx.event_names()))}")
+            elif step.tx_hash is not None:
+                print(f"{step.name}: {step.status} {step.tx_hash.hex()}")
+        return result
+
+
+def interactions_complete(wedx):
+    trader_data = wedx.get_trader_data(fields=('performances',))
+    return trader_data.interactions == wedx.get_required_interactions()
+
+
+def restore_lending(current_assets, lender_ids=None):
+    # If the portfolio change failed after lending was withdrawn, put the old assets back to work
+    # with their own lender ids, leaving out any a confirmed earn_with_lending already supplied
+    def recovery(result):
+        status = {step.name: step.status for step in result.steps}
+        if status.get('withdraw_from_lending') == 'confirmed' and status.get('set_portfolio') != 'confirmed':
+            supplied = set()
+            if status.get('earn_with_lending') == 'confirmed':
+                supplied = {str(asset).lower() for asset in _step_args(result, 'earn_with_lending')[0]}
+            ids = lender_ids if lender_ids is not None else [0] * len(current_assets)
+            restore = [(asset, lender_id) for asset, lender_id in zip(current_assets, ids) if str(asset).lower() not in supplied]
+            if not restore:
+                return []
+            assets, ids = zip(*restore)
+            return [('restore_lending', 'earn_with_lending', (list(assets), list(ids)))]
+        if status.get('earn_with_lending') == 'failed':
+            return [('retry_earn_with_lending', 'earn_with_lending', _step_args(result, 'earn_with_lending'))]
+        return []
+    return recovery
+
+
+def _step_args(result, name):
+    for step in result.steps:
+        if step.name == name:
+            return step.args
+    return ()
@@ -0,0 +1,162 @@
+import sys
+from array import array
+
+from addresses import to_address
+
+
+def _word(data, position):
+    if position + 32 > len(data):
+        raise ValueError("Call result is shorter than its ABI type")
+    return int.from_bytes(data[position:position + 32], 'big')
+
+
+def _dynamic(data, base, head):
+    # Start and length of the dynamic array whose offset sits at head
+    position = base + _word(data, head)
+    count = _word(data, position)
+    if position + 32 + 32 * count > len(data):
+        raise ValueError("Call result is shorter than its ABI type")
+    return position + 32, count
+
+
+def uint_values(data, start, count):
+    """``count`` uint256 words from ``start`` as an array('Q').
+
+    Every 32-byte word is read as four big-endian 64-bit halves in one C pass. If any
+    value needs more than 64 bits, a list of Python ints is returned instead.
+    """
+    words = array('Q', bytes(data[start:start + 32 * count]))
+    if sys.byteorder == 'little':
+        words.byteswap()
+    values = words[3::4]
+    high = words[0::4] + words[1::4] + words[2::4]
+    if high.count(0) != len(high):
+        return [int.from_bytes(data[p:p + 32], 'big') for p in range(start, start + 32 * count, 32)]
+    return values
+
+
+def address_values(data, start, count):
+    # Interned, so a fleet's repeated assets share one object each
+    return [to_address(bytes(data[p + 12:p + 32])) for p in range(start, start + 32 * count, 32)]
+
+
+def decode_uint_array(data):
+    # uint256[] results: getActualDistribution, getStoredAssets
+    return uint_values(data, *_dynamic(data, 0, 0))
+
+
+def decode_address_array(data):
+    # address[] results: getAddresses, getRankingList
+    return address_values(data, *_dynamic(data, 0, 0))
+
+
+class TraderData:
+    """getTraderData as named fields.
+
+    Numeric arrays are array('Q') and addresses are interned. Fields left out when
+    decoding are None. Indexing, ``len`` and unpacking follow the web3 tuple, so
+    ``trader_data[3]`` still works.
+    """
+
+    FIELDS = ('portfolio', 'distribution', 'assets', 'performances', 'timestamps', 'min_liquidity', 'init_timestamp')
+    __slots__ = FIELDS
+
+    def __init__(self, portfolio=None, distribution=None, assets=None, performances=None, timestamps=None,
+                 min_liquidity=None, init_timestamp=None):
+        self.portfolio = portfolio
+        self.distribution = distribution
+        self.assets = assets
+        self.performances = performances
+        self.timestamps = timestamps
+        self.min_liquidity = min_liquidity
+        self.init_timestamp = init_timestamp
+
+    @property
+    def interactions(self):
+        return len(self.performances)
+
+    def __getitem__(self, i):
+        return getattr(self, self.FIELDS[i])
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __iter__(self):
+        return (getattr(self, field) for field in self.FIELDS)
+
+    def __repr__(self):
+        return f"TraderData({', '.join(f'{field}={getattr(self, field)!r}' for field in self.FIELDS)})"
+
+
+def decode_trader_data(data, fields=None):
+    """Decodes getTraderData, reading only ``fields`` (all by default).
+
+    The struct is returned behind one offset; its head holds six array offsets and
+    initTimestamp. Arrays that were not asked for are never touched.
+    """
+    data = bytes(data)
+    base = _word(data, 0)
+    values = {}
+    for i, field in enumerate(TraderData.FIELDS):
+        if fields is not None and field not in fields:
+            continue
+        head = base + 32 * i
+        if field == 'init_timestamp':
+            values[field] = _word(data, head)
+        elif field == 'assets':
+            values[field] = address_values(data, *_dynamic(data, base, head))
+        else:
+            values[field] = uint_values(data, *_dynamic(data, base, head))
+    return TraderData(**values)
+
+
+def trader_data_decoder(fields):
+    # For batch_read(..., decoders={'getTraderData': trader_data_decoder(fields)})
+    fields = frozenset(fields)
+    unknown = fields - set(TraderData.FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown getTraderData fields: {sorted(unknown)}")
+    return lambda data: decode_trader_data(data, fields)
+
+
+class PortfolioSnapshot:
+    """One chain's account, assets, distribution, threshold, supply and score at one block.
+
+    ``snapshot['assets']`` works as well as ``snapshot.assets``, and ``in``, ``keys()``
+    and ``get()`` behave as on the dict it replaces.
+    """
+
+    __slots__ = ('chain_id', 'block_number', 'account', 'score', 'required_interactions', 'assets', 'distribution',
+                 'threshold', 'supply')
+
+    def __init__(self, chain_id, block_number, account, score, required_interactions, assets=(), distribution=None,
+                 threshold=None, supply=0):
+        self.chain_id = chain_id
+        self.block_number = block_number
+        self.account = account
+        self.score = score
+        self.required_interactions = required_interactions
+        self.assets = list(assets)
+        self.distribution = array('Q') if distribution is None else distribution
+        self.threshold = threshold
+        self.supply = supply
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return f"PortfolioSnapshot(chain_id={self.chain_id}, block_number={self.block_number}, account={self.account!r})"
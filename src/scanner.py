@@ -0,0 +1,335 @@
+import json
+import os
+
+import numpy as np
+from eth_utils import event_abi_to_log_topic
+
+from addresses import to_address
+from leaderboard import uint_array
+from results import decode_address_array, decode_uint_array
+
+PRO = 0
+INDEX = 1
+
+# Portfolio addresses per eth_getLogs filter, well under what public nodes accept
+LOG_ADDRESS_LIMIT = 1000
+
+KINDS = {
+    PRO: {
+        'portfolio_abi': 'abiWEDXPro',
+        'deployer_abi': 'abiWEDXDeployerPro',
+        'deployer_getter': 'getDeployerProAddress',
+        'is_active': 'isProPortfolioActive',
+        'owner_of': 'proPortfolioUser',
+        'portfolio_of': 'userProPortfolio',
+        'events': ('ProPortfolioRebalanced', 'ProPortfolioDeposited', 'ProPortfolioWithdrawn'),
+    },
+    INDEX: {
+        'portfolio_abi': 'abiWEDXIndex',
+        'deployer_abi': 'abiWEDXDeployerIndex',
+        'deployer_getter': 'getDeployerIndexAddress',
+        'is_active': 'isIndexPortfolioActive',
+        'owner_of': 'indexPortfolioUser',
+        'portfolio_of': 'userIndexPortfolio',
+        'events': ('IndexPortfolioRebalanced', 'IndexPortfolioDeposited', 'IndexPortfolioWithdrawn'),
+    },
+}
+
+
+class PortfolioDataset:
+    """Columnar view of scanned portfolios.
+
+    Per-portfolio columns are aligned with ``addresses``. Holdings are stored CSR-style:
+    the assets of row i are ``asset_table[asset_ids[offsets[i]:offsets[i + 1]]]`` with the
+    matching ``weights`` slice.
+    """
+
+    def __init__(self, block_number, addresses, kinds, owners, supply, offsets, asset_ids, weights, asset_table):
+        self.block_number = block_number
+        self.addresses = addresses
+        self.kinds = kinds
+        self.owners = owners
+        self.supply = supply
+        self.offsets = offsets
+        self.asset_ids = asset_ids
+        self.weights = weights
+        self.asset_table = asset_table
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def holdings(self, i):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return [self.asset_table[j] for j in self.asset_ids[start:end]], self.weights[start:end]
+
+    def to_parquet(self, path):
+        # pyarrow is optional and only needed for this export
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        assets = pa.array([self.asset_table[j] for j in self.asset_ids], type=pa.string())
+        offsets = pa.array(self.offsets.astype(np.int32))
+        table = pa.table({
+            'address': pa.array(self.addresses.tolist(), type=pa.string()),
+            'kind': pa.array(self.kinds),
+            'owner': pa.array(self.owners.tolist(), type=pa.string()),
+            'supply': pa.array([str(value) for value in self.supply], type=pa.string()),
+            'assets': pa.ListArray.from_arrays(offsets, assets),
+            'weights': pa.ListArray.from_arrays(offsets, pa.array(self.weights)),
+        }, schema=parquet_schema())
+        pq.write_table(table, path)
+
+
+def parquet_schema():
+    import pyarrow as pa
+    return pa.schema([('address', pa.string()), ('kind', pa.uint8()), ('owner', pa.string()), ('supply', pa.string()),
+                      ('assets', pa.list_(pa.string())), ('weights', pa.list_(pa.uint32()))])
+
+
+def _parquet_table(rows):
+    # One iter_chunks batch as a table with the PortfolioDataset.to_parquet columns
+    import pyarrow as pa
+    return pa.table({
+        'address': [str(address) for address, _, _, _, _, _ in rows],
+        'kind': [kind for _, kind, _, _, _, _ in rows],
+        'owner': [str(owner) for _, _, owner, _, _, _ in rows],
+        'supply': [str(supply) for _, _, _, supply, _, _ in rows],
+        'assets': [[str(asset) for asset in assets] for _, _, _, _, assets, _ in rows],
+        'weights': [[int(weight) for weight in distribution] for _, _, _, _, _, distribution in rows],
+    }, schema=parquet_schema())
+
+
+class PortfolioScanner:
+    """Enumerates active Pro and Index portfolios and bulk-reads their state.
+
+    The deployers cannot be enumerated and emit no events of their own. Each portfolio
+    logs OwnershipTransferred(0x0, deployer) when its deployer creates it, so new
+    portfolios are found with a log filter on that topic and the deployer addresses,
+    and from the manager ranking list. A candidate is kept only if the deployer reports
+    it active. ``refresh`` re-reads only the new portfolios and the known ones that
+    emitted a portfolio event (rebalance, deposit, withdraw), filtered by their addresses.
+
+    With ``path``, the last scanned block and the portfolios seen so far are saved there,
+    and a later scanner resumes its log search from that block instead of the manager's
+    initial block.
+    """
+
+    def __init__(self, wedx, kinds=(PRO, INDEX), from_block=None, log_block_span=10_000, path=None):
+        self.wedx = wedx
+        self.kinds = kinds
+        self.from_block = from_block
+        self.log_block_span = log_block_span
+        self.path = path
+        self.last_block = None
+        # Every portfolio seen, active or not, as address → kind
+        self.known = {}
+        self._rows = None
+        self._contracts = None
+
+        network = wedx.network[wedx.get_chain_name()]
+        self._topics = {}
+        self._creation_topic = None
+        for kind in kinds:
+            for item in network[KINDS[kind]['portfolio_abi']]:
+                if item['type'] != 'event':
+                    continue
+                if item['name'] in KINDS[kind]['events']:
+                    self._topics['0x' + event_abi_to_log_topic(item).hex()] = kind
+                elif item['name'] == 'OwnershipTransferred':
+                    self._creation_topic = '0x' + event_abi_to_log_topic(item).hex()
+        if path is not None:
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get('chain_id') != self.wedx.chain_id:
+            raise ValueError(f"{self.path} holds a scan of chain {data.get('chain_id')}, not {self.wedx.chain_id}")
+        self.last_block = data['last_block']
+        self.known = {to_address(address): kind for address, kind in data['portfolios'].items() if kind in self.kinds}
+
+    def _save(self):
+        if self.path is None:
+            return
+        data = {
+            'chain_id': self.wedx.chain_id,
+            'last_block': self.last_block,
+            'portfolios': {address.lowercase: kind for address, kind in self.known.items()},
+        }
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp, self.path)
+
+    def _resolve_contracts(self):
+        # Manager and deployer addresses, keyed 'manager' and by kind
+        if self._contracts is not None:
+            return self._contracts
+        group_address = self.wedx.network[self.wedx.get_chain_name()]['contractWEDXGroup']
+        getters = ['getAssetManagerAddress'] + [KINDS[kind]['deployer_getter'] for kind in self.kinds]
+        addresses = self.wedx.batch_read([(group_address, 'abiWEDXGroup', getter, ()) for getter in getters])
+        self._contracts = {'manager': addresses[0]}
+        self._contracts.update(zip(self.kinds, addresses[1:]))
+        return self._contracts
+
+    def _get_logs(self, from_block, to_block, **log_filter):
+        for start in range(from_block, to_block + 1, self.log_block_span):
+            yield from self.wedx.w3.eth.get_logs(dict(log_filter, fromBlock=start,
+                                                      toBlock=min(start + self.log_block_span - 1, to_block)))
+
+    def _created_candidates(self, from_block, to_block):
+        # Portfolios whose creation log names one of the deployers
+        contracts = self._resolve_contracts()
+        deployers = {'0x' + '00' * 12 + to_address(contracts[kind]).lowercase[2:]: kind for kind in self.kinds}
+        logs = self._get_logs(from_block, to_block, topics=[self._creation_topic, '0x' + '00' * 32, list(deployers)])
+        candidates = {}
+        for log in logs:
+            topic = log['topics'][2]
+            topic = topic if isinstance(topic, str) else '0x' + bytes(topic).hex()
+            candidates[to_address(log['address'])] = deployers[topic]
+        return candidates
+
+    def _event_candidates(self, from_block, to_block):
+        # Known portfolios that emitted a portfolio event, filtered by their addresses
+        known = list(self.known)
+        candidates = {}
+        for start in range(0, len(known), LOG_ADDRESS_LIMIT):
+            logs = self._get_logs(from_block, to_block, address=known[start:start + LOG_ADDRESS_LIMIT],
+                                  topics=[list(self._topics)])
+            for log in logs:
+                address = to_address(log['address'])
+                candidates[address] = self.known[address]
+        return candidates
+
+    def _ranking_candidates(self, block_number):
+        contracts = self._resolve_contracts()
+        traders = self.wedx.batch_read([(contracts['manager'], 'abiWEDXManager', 'getRankingList', ())], block_number,
+                                       decoders={'getRankingList': decode_address_array})[0]
+        calls, kinds = [], []
+        for trader in traders:
+            for kind in self.kinds:
+                calls.append((contracts[kind], KINDS[kind]['deployer_abi'], KINDS[kind]['portfolio_of'], (trader,)))
+                kinds.append(kind)
+        portfolios = self.wedx.batch_read(calls, block_number)
+        return {address: kind for address, kind in zip(portfolios, kinds) if address != self.wedx.zero_address}
+
+    def _filter_active(self, candidates, block_number):
+        contracts = self._resolve_contracts()
+        items = list(candidates.items())
+        calls = []
+        for address, kind in items:
+            abi_key = KINDS[kind]['deployer_abi']
+            calls.append((contracts[kind], abi_key, KINDS[kind]['is_active'], (address,)))
+            calls.append((contracts[kind], abi_key, KINDS[kind]['owner_of'], (address,)))
+        results = self.wedx.batch_read(calls, block_number)
+        return [(address, kind, results[2 * i + 1]) for i, (address, kind) in enumerate(items) if results[2 * i]]
+
+    def iter_chunks(self, portfolios, block_number):
+        # Reads state for (address, kind, owner) triples one batch at a time
+        chunk_size = max(1, self.wedx.batch_size // 3)
+        decoders = {'getActualDistribution': decode_uint_array, 'getAddresses': decode_address_array}
+        for start in range(0, len(portfolios), chunk_size):
+            chunk = portfolios[start:start + chunk_size]
+            calls = []
+            for address, kind, _ in chunk:
+                abi_key = KINDS[kind]['portfolio_abi']
+                calls.append((address, abi_key, 'getActualDistribution', ()))
+                calls.append((address, abi_key, 'getAddresses', ()))
+                calls.append((address, abi_key, 'getSupply', ()))
+            results = self.wedx.batch_read(calls, block_number, decoders)
+            yield [(address, kind, owner, results[3 * i + 2], results[3 * i + 1], results[3 * i])
+                   for i, (address, kind, owner) in enumerate(chunk)]
+
+    def _read(self, candidates, block_number):
+        active = self._filter_active(candidates, block_number)
+        for address in set(candidates) - {address for address, _, _ in active}:
+            self._rows.pop(address, None)
+        for rows in self.iter_chunks(active, block_number):
+            for address, kind, owner, supply, assets, distribution in rows:
+                self._rows[address] = (kind, owner, supply, assets, distribution)
+
+    def _candidates(self, block_number):
+        # Known portfolios, those created since the last scanned block and the ranked ones
+        from_block = self.from_block
+        if self.last_block is not None:
+            from_block = self.last_block + 1
+        elif from_block is None:
+            from_block = self.wedx.batch_read([(self._resolve_contracts()['manager'], 'abiWEDXManager', 'initialBlock', ())],
+                                              block_number)[0]
+        candidates = dict(self.known)
+        candidates.update(self._created_candidates(from_block, block_number))
+        candidates.update(self._ranking_candidates(block_number))
+        return candidates
+
+    def _scanned(self, candidates, block_number):
+        self.known.update(candidates)
+        self.last_block = max(block_number, self.last_block or 0)
+        self._save()
+
+    def scan(self, block_number=None):
+        if block_number is None:
+            block_number = self.wedx.w3.eth.block_number
+        candidates = self._candidates(block_number)
+        self._rows = {}
+        self._read(candidates, block_number)
+        self._scanned(candidates, block_number)
+        return self.dataset()
+
+    def to_parquet(self, path, block_number=None):
+        """Scans like ``scan`` but writes each batch straight to a Parquet file.
+
+        Nothing is kept in memory, so a following ``refresh`` scans again. Returns the
+        number of portfolios written. Requires pyarrow.
+        """
+        import pyarrow.parquet as pq
+
+        if block_number is None:
+            block_number = self.wedx.w3.eth.block_number
+        candidates = self._candidates(block_number)
+        active = self._filter_active(candidates, block_number)
+        with pq.ParquetWriter(path, parquet_schema()) as writer:
+            for rows in self.iter_chunks(active, block_number):
+                writer.write_table(_parquet_table(rows))
+        self._rows = None
+        self._scanned(candidates, block_number)
+        return len(active)
+
+    def refresh(self, block_number=None):
+        if self._rows is None:
+            return self.scan(block_number)
+        if block_number is None:
+            block_number = self.wedx.w3.eth.block_number
+        if block_number > self.last_block:
+            candidates = self._created_candidates(self.last_block + 1, block_number)
+            candidates.update(self._event_candidates(self.last_block + 1, block_number))
+            if candidates:
+                self._read(candidates, block_number)
+            self._scanned(candidates, block_number)
+        return self.dataset()
+
+    def dataset(self):
+        rows = self._rows or {}
+        addresses = list(rows)
+        asset_index = {}
+        offsets = [0]
+        asset_ids = []
+        weights = []
+        for address in addresses:
+            _, _, _, assets, distribution = rows[address]
+            for asset in assets:
+                asset_ids.append(asset_index.setdefault(asset, len(asset_index)))
+            weights.extend(distribution)
+            offsets.append(len(asset_ids))
+        return PortfolioDataset(
+            self.last_block,
+            np.array(addresses, dtype='<U42'),
+            np.array([rows[address][0] for address in addresses], dtype=np.uint8),
+            np.array([rows[address][1] for address in addresses], dtype='<U42'),
+            uint_array([rows[address][2] for address in addresses]),
+            np.array(offsets, dtype=np.int64),
+            np.array(asset_ids, dtype=np.uint32),
+            np.array(weights, dtype=np.uint32),
+            list(asset_index),
+        )
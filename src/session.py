@@ -0,0 +1,89 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from signer import LocalSigner
+from wedx import WedX, load_network
+
+
+class ChainResult:
+    """What one chain returned from a session call: ``value`` when ``ok``, else ``error``."""
+
+    def __init__(self, chain_id, value=None, error=None):
+        self.chain_id = chain_id
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        if self.ok:
+            return f"ChainResult({self.chain_id}, ok, {self.value!r})"
+        return f"ChainResult({self.chain_id}, error={self.error!r})"
+
+
+class WedXSession:
+    """One process-wide entry point for several chains.
+
+    The network data and the signer are loaded once and shared; a WedX client (and its
+    provider) is only created the first time a chain is used.
+    """
+
+    def __init__(self, user_address, user_private_key, chain_rpcs, signer=None, network=None, max_workers=None):
+        self.network = network if network is not None else load_network()
+        self.signer = signer if signer is not None else LocalSigner(user_private_key)
+        self.user_address = user_address if user_address is not None else self.signer.address
+        self.chain_rpcs = chain_rpcs
+        self.max_workers = max_workers or max(1, len(chain_rpcs))
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    @property
+    def chain_ids(self):
+        return [chain_id for chain_id, rpc in self.chain_rpcs.items() if rpc]
+
+    def client(self, chain_id):
+        with self._lock:
+            wedx = self._clients.get(chain_id)
+        if wedx is not None:
+            return wedx
+
+        # Connect outside the lock so chains can come up in parallel
+        wedx = WedX(chain_id, self.user_address, None, self.chain_rpcs, signer=self.signer, network=self.network)
+        with self._lock:
+            return self._clients.setdefault(chain_id, wedx)
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def map(self, fn, chain_ids=None):
+        # Runs fn(wedx) on every chain at once; {chain_id: ChainResult}, so one failing chain does not fail the call
+        chain_ids = list(chain_ids) if chain_ids is not None else self.chain_ids
+        futures = {chain_id: self._executor().submit(lambda c: fn(self.client(c)), chain_id) for chain_id in chain_ids}
+        results = {}
+        for chain_id, future in futures.items():
+            try:
+                results[chain_id] = ChainResult(chain_id, future.result())
+            except Exception as error:
+                results[chain_id] = ChainResult(chain_id, error=error)
+        return results
+
+    def get_portfolios(self, chain_ids=None):
+        return self.map(lambda wedx: wedx.get_portfolio_snapshot(), chain_ids)
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
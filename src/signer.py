@@ -0,0 +1,191 @@
+import hmac
+import json
+import os
+import socket
+import socketserver
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from eth_account import Account
+from hexbytes import HexBytes
+
+_worker_account = None
+
+
+def _init_worker(private_key):
+    global _worker_account
+    _worker_account = Account.from_key(private_key)
+
+
+def _sign_in_worker(tx):
+    return bytes(_worker_account.sign_transaction(tx).raw_transaction)
+
+
+def _to_json(value):
+    if isinstance(value, (bytes, bytearray)):
+        return '0x' + bytes(value).hex()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class LocalSigner:
+    """Signs with a private key held in this process, deriving the account only once."""
+
+    def __init__(self, private_key, pool_threshold=64, max_workers=None):
+        self._account = Account.from_key(private_key)
+        self._private_key = private_key
+        self.address = self._account.address
+        self.pool_threshold = pool_threshold
+        self.max_workers = max_workers
+
+    def sign_transaction(self, tx):
+        return self._account.sign_transaction(tx).raw_transaction
+
+    def sign_many(self, txs):
+        txs = list(txs)
+        if len(txs) < self.pool_threshold:
+            return [self.sign_transaction(tx) for tx in txs]
+
+        workers = self.max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(txs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self._private_key,)) as pool:
+            return [HexBytes(raw) for raw in pool.map(_sign_in_worker, txs, chunksize=chunksize)]
+
+
+class SocketSigner:
+    """Delegates signing to an external process over a local socket.
+
+    The protocol is one JSON object per line, ``{"method": ..., "params": [...], "token": ...}``
+    answered by ``{"result": ...}`` or ``{"error": "..."}``. ``address`` is a Unix
+    socket path or a ``(host, port)`` tuple; ``token`` is the server's shared secret.
+    One connection is shared by all threads, one request at a time.
+    """
+
+    def __init__(self, address, token, timeout=10):
+        self.socket_address = address
+        self.timeout = timeout
+        self._token = token
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+        self.address = self._request('address')
+
+    def _connect(self):
+        if isinstance(self.socket_address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_address)
+        self._sock = sock
+        self._reader = sock.makefile('rb')
+
+    def _request(self, method, *params):
+        request = json.dumps({'method': method, 'params': params, 'token': self._token}, default=_to_json).encode() + b'\n'
+        # A response belongs to whoever sent the request before it
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                self._sock.sendall(request)
+                line = self._reader.readline()
+            except OSError:
+                self._close()
+                raise
+            if not line:
+                self._close()
+                raise ConnectionError("Signer closed the connection")
+        response = json.loads(line)
+        if 'error' in response:
+            raise ValueError(f"Signer error: {response['error']}")
+        return response['result']
+
+    def sign_transaction(self, tx):
+        return HexBytes(self._request('sign_transaction', tx))
+
+    def sign_many(self, txs):
+        return [HexBytes(raw) for raw in self._request('sign_many', list(txs))]
+
+    def _close(self):
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+        self._sock = None
+        self._reader = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+class SignerServer:
+    """Serves a signer (usually a LocalSigner) to SocketSigner clients.
+
+    Run it in the process that owns the keys so bots only see the socket. Every
+    request must carry ``token``, and only transactions to ``allowed_to`` are signed,
+    e.g. ``wedx.contract_addresses()``. The Unix socket is created with mode 0600; a
+    ``(host, port)`` address is refused unless ``allow_tcp`` is set, since anything
+    that reaches the port can then ask for signatures.
+    """
+
+    def __init__(self, signer, address, token, allowed_to, allow_tcp=False):
+        if not token:
+            raise ValueError("A shared token is required")
+        if not isinstance(address, str) and not allow_tcp:
+            raise ValueError("TCP signer addresses need allow_tcp=True; use a Unix socket path")
+        self.signer = signer
+        self.address = address
+        self._token = token
+        self.allowed_to = {str(to).lower() for to in allowed_to}
+        if not self.allowed_to:
+            raise ValueError("At least one allowed contract address is required")
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    self.wfile.write(json.dumps(server.dispatch(json.loads(line)), default=_to_json).encode() + b'\n')
+
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.unlink(address)
+            # Created without group/other access, so no window with a wider mode
+            umask = os.umask(0o177)
+            try:
+                self._server = socketserver.ThreadingUnixStreamServer(address, Handler)
+            finally:
+                os.umask(umask)
+            os.chmod(address, 0o600)
+        else:
+            self._server = socketserver.ThreadingTCPServer(address, Handler)
+        self._server.daemon_threads = True
+
+    def _check(self, tx):
+        to = tx.get('to') if isinstance(tx, dict) else None
+        if not to or str(to).lower() not in self.allowed_to:
+            raise ValueError(f"Signing for {to} is not allowed")
+        return tx
+
+    def dispatch(self, request):
+        if not isinstance(request, dict) or not hmac.compare_digest(str(request.get('token', '')), self._token):
+            return {'error': "Invalid token"}
+        method = request.get('method')
+        params = request.get('params', [])
+        try:
+            if method == 'address':
+                return {'result': self.signer.address}
+            if method == 'sign_transaction':
+                return {'result': self.signer.sign_transaction(self._check(params[0]))}
+            if method == 'sign_many':
+                return {'result': self.signer.sign_many([self._check(tx) for tx in params[0]])}
+            return {'error': f"Unknown method {method}"}
+        except Exception as error:
+            return {'error': str(error)}
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
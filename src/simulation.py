@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from eth_abi import decode
+from eth_utils import keccak
+from eth_utils.abi import abi_to_signature, get_abi_input_types, get_abi_output_types
+from hexbytes import HexBytes
+from web3.exceptions import ContractLogicError, Web3RPCError
+
+ERROR_SELECTOR = bytes.fromhex('08c379a0')  # Error(string)
+PANIC_SELECTOR = bytes.fromhex('4e487b71')  # Panic(uint256)
+PANIC_CODES = {
+    0x01: "assertion failed",
+    0x11: "arithmetic overflow or underflow",
+    0x12: "division by zero",
+    0x21: "invalid enum value",
+    0x31: "pop on empty array",
+    0x32: "array index out of bounds",
+    0x41: "out of memory",
+    0x51: "call to uninitialized function",
+}
+
+
+def rpc_error_message(error):
+    # The node's own message of a Web3RPCError, without web3's wrapping
+    response = getattr(error, 'rpc_response', None)
+    if isinstance(response, dict) and isinstance(response.get('error'), dict):
+        return response['error'].get('message') or str(error)
+    return str(error)
+
+
+class SimulationResult:
+    def __init__(self, tx, success, gas_estimate=None, return_value=None, revert_reason=None):
+        self.tx = tx
+        self.success = success
+        self.gas_estimate = gas_estimate
+        self.return_value = return_value
+        self.revert_reason = revert_reason
+
+    def __repr__(self):
+        if self.success:
+            return f"SimulationResult(success=True, gas_estimate={self.gas_estimate}, return_value={self.return_value})"
+        return f"SimulationResult(success=False, revert_reason={self.revert_reason!r})"
+
+
+class Simulator:
+    """Runs built WEDX transactions as eth_call against the pending block.
+
+    Revert data is decoded with the chain's contract ABIs, so custom errors such as
+    OwnableUnauthorizedAccount come back by name instead of as raw bytes.
+    """
+
+    def __init__(self, wedx, max_workers=8, block_identifier='pending'):
+        self.wedx = wedx
+        self.max_workers = max_workers
+        self.block_identifier = block_identifier
+        self.functions = {}
+        self.errors = {}
+        for key, abi in wedx.network[wedx.get_chain_name()].items():
+            if not key.startswith('abi'):
+                continue
+            for item in abi:
+                if item['type'] == 'function':
+                    self.functions.setdefault(keccak(text=abi_to_signature(item))[:4], item)
+                elif item['type'] == 'error':
+                    self.errors.setdefault(keccak(text=abi_to_signature(item))[:4], item)
+
+    def decode_revert(self, data):
+        data = HexBytes(data) if data else b''
+        if len(data) < 4:
+            return "execution reverted"
+        selector, payload = bytes(data[:4]), bytes(data[4:])
+        try:
+            if selector == ERROR_SELECTOR:
+                return decode(['string'], payload)[0]
+            if selector == PANIC_SELECTOR:
+                code = decode(['uint256'], payload)[0]
+                return f"Panic({hex(code)}): {PANIC_CODES.get(code, 'unknown panic code')}"
+            if selector in self.errors:
+                item = self.errors[selector]
+                args = decode(get_abi_input_types(item), payload)
+                return f"{item['name']}({', '.join(str(arg) for arg in args)})"
+        except Exception:
+            pass
+        return f"execution reverted with data 0x{bytes(data).hex()}"
+
+    def _decode_return(self, tx, output):
+        item = self.functions.get(bytes(HexBytes(tx['data'])[:4]))
+        if item is None or not item['outputs']:
+            return None
+        values = decode(get_abi_output_types(item), bytes(output))
+        return values[0] if len(values) == 1 else values
+
+    def simulate(self, tx):
+        w3 = self.wedx.w3
+        call = {key: tx[key] for key in ('from', 'to', 'data', 'value') if key in tx}
+        try:
+            output = w3.eth.call(call, self.block_identifier)
+            gas_estimate = w3.eth.estimate_gas(call, self.block_identifier)
+        except ContractLogicError as error:
+            reason = self.decode_revert(error.data) if isinstance(error.data, str) else None
+            return SimulationResult(tx, False, revert_reason=reason or error.message)
+        except Web3RPCError as error:
+            # Not a revert but the node refusing the call, e.g. insufficient funds for gas * price + value
+            return SimulationResult(tx, False, revert_reason=rpc_error_message(error))
+        except ValueError as error:
+            return SimulationResult(tx, False, revert_reason=str(error))
+        return SimulationResult(tx, True, gas_estimate=gas_estimate, return_value=self._decode_return(tx, output))
+
+    def simulate_many(self, txs):
+        txs = list(txs)
+        if len(txs) <= 1:
+            return [self.simulate(tx) for tx in txs]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(txs))) as pool:
+            return list(pool.map(self.simulate, txs))
+
+    @contextmanager
+    def collect(self):
+        """Records the transactions WedX write methods would send instead of sending them.
+
+        Every call is simulated against the same pending state, so steps that depend
+        on an earlier step in the batch may predict a revert that would not happen.
+        """
+        planned = []
+        previous = self.wedx._planned
+        self.wedx._planned = planned
+        try:
+            yield planned
+        finally:
+            self.wedx._planned = previous
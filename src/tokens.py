@@ -0,0 +1,147 @@
+import json
+import os
+
+import numpy as np
+from eth_abi import decode
+
+from addresses import to_address
+
+
+def _decode_symbol(data):
+    # Most tokens return a string; a few early ones (MKR, SAI) return bytes32
+    try:
+        return decode(['string'], data)[0]
+    except Exception:
+        if len(data) == 32:
+            return data.rstrip(b'\0').decode('utf-8', 'replace')
+        return None
+
+
+def _reverted(error):
+    # Execution reverts are a property of the token; anything else (rate limits, timeouts) is not
+    return error.get('code') == 3 or 'revert' in str(error.get('message', '')).lower()
+
+
+class TokenIndex:
+    """Decimals and symbols of one chain's ERC-20 tokens, kept in memory and on disk.
+
+    Tokens not in the index are read in one batch (decimals and symbol for each, with
+    the ERC-20 functions of abiWEDXPay) and saved, so lookups after the first make no
+    RPCs. A token whose call reverts is stored with None and not asked again unless
+    ``fill(..., force=True)``. Other errors (rate limits, timeouts) are not stored; the
+    rest of the batch is saved and ``fill`` raises ValueError.
+    """
+
+    def __init__(self, wedx, path=None):
+        self.wedx = wedx
+        self.path = path or f'wedx_tokens_{wedx.get_chain_name()}.json'
+        self.entries = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get('chain_id') != self.wedx.chain_id:
+            raise ValueError(f"{self.path} holds tokens of chain {data.get('chain_id')}, not {self.wedx.chain_id}")
+        for token, entry in data['tokens'].items():
+            self.entries[to_address(token)] = (entry['decimals'], entry['symbol'])
+
+    def _save(self):
+        data = {
+            'chain_id': self.wedx.chain_id,
+            'tokens': {token.lowercase: {'decimals': decimals, 'symbol': symbol}
+                       for token, (decimals, symbol) in self.entries.items()},
+        }
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp, self.path)
+
+    def fill(self, tokens, force=False):
+        """Reads the tokens missing from the index in batches; returns how many were added."""
+        tokens = list(dict.fromkeys(to_address(token) for token in tokens))
+        missing = tokens if force else [token for token in tokens if token not in self.entries]
+        if not missing:
+            return 0
+        codec = self.wedx.codec
+        decimals_data = codec.encode_call('abiWEDXPay', 'decimals')
+        symbol_data = codec.encode_call('abiWEDXPay', 'symbol')
+        # Two calls per token, so half a batch_size of tokens per request
+        step = max(1, self.wedx.batch_size // 2)
+        failed = {}
+        for start in range(0, len(missing), step):
+            chunk = missing[start:start + step]
+            requests = []
+            for token in chunk:
+                requests.append(('eth_call', [{'to': token, 'data': decimals_data}, 'latest']))
+                requests.append(('eth_call', [{'to': token, 'data': symbol_data}, 'latest']))
+            responses = self.wedx.w3.provider.make_batch_request(requests)
+            if not isinstance(responses, list):
+                raise ValueError(f"Batch request failed: {responses.get('error')}")
+            for i, token in enumerate(chunk):
+                decimals_response, symbol_response = responses[2 * i], responses[2 * i + 1]
+                error = next((response['error'] for response in (decimals_response, symbol_response)
+                              if 'error' in response and not _reverted(response['error'])), None)
+                if error is not None:
+                    # Not stored, so the next fill asks again
+                    failed[token] = error
+                    continue
+                decimals, symbol = None, None
+                if 'error' not in decimals_response and len(decimals_response.get('result') or '0x') > 2:
+                    decimals = codec.decode_result('abiWEDXPay', 'decimals', bytes.fromhex(decimals_response['result'][2:]))
+                if 'error' not in symbol_response and len(symbol_response.get('result') or '0x') > 2:
+                    symbol = _decode_symbol(bytes.fromhex(symbol_response['result'][2:]))
+                self.entries[token] = (decimals, symbol)
+        self._save()
+        if failed:
+            token, error = next(iter(failed.items()))
+            raise ValueError(f"Metadata of {len(failed)} token(s) could not be read, e.g. {token}: {error}")
+        return len(missing)
+
+    def decimals(self, token):
+        token = to_address(token)
+        if token not in self.entries:
+            self.fill([token])
+        return self.entries[token][0]
+
+    def symbol(self, token):
+        token = to_address(token)
+        if token not in self.entries:
+            self.fill([token])
+        return self.entries[token][1]
+
+    def decimals_array(self, tokens):
+        # One fill for everything missing; NaN where a token has no decimals
+        tokens = [to_address(token) for token in tokens]
+        self.fill(tokens)
+        return np.array([np.nan if self.entries[token][0] is None else self.entries[token][0] for token in tokens],
+                        dtype=np.float64)
+
+    def to_units(self, tokens, amounts):
+        # Raw uint amounts (e.g. getAmountLendToken) in whole tokens; NaN for unknown decimals
+        return np.array([float(amount) for amount in amounts], dtype=np.float64) * 10.0 ** -self.decimals_array(tokens)
+
+    def verify_catalog(self, assets_info):
+        """Compares the catalog's input tokens with the chain.
+
+        Returns (token, field, catalog value, on-chain value) for every disagreement.
+        """
+        listed = {}
+        for info in assets_info.values():
+            if isinstance(info, dict):
+                for token in info.get('inputTokens', []):
+                    try:
+                        listed.setdefault(to_address(token.get('id')), token)
+                    except (ValueError, TypeError):
+                        continue
+        self.fill(listed)
+        mismatches = []
+        for token, listing in listed.items():
+            decimals, symbol = self.entries[token]
+            if 'decimals' in listing and decimals is not None and int(listing['decimals']) != decimals:
+                mismatches.append((token, 'decimals', int(listing['decimals']), decimals))
+            if 'symbol' in listing and symbol is not None and listing['symbol'] != symbol:
+                mismatches.append((token, 'symbol', listing['symbol'], symbol))
+        return mismatches
@@ -0,0 +1,170 @@
+import numpy as np
+
+from addresses import to_address
+from leaderboard import uint_array
+
+
+class Valuation:
+    """NAV and exposures for a batch of portfolios.
+
+    Per-asset columns are flat and grouped by portfolio: the rows of portfolio i are
+    ``offsets[i]:offsets[i + 1]``. Values are in the catalog's price unit (USD by
+    default); unpriced assets count as zero and are listed in ``missing_prices``.
+    ``held`` and ``lent`` split each asset's amount into idle and lent out.
+    """
+
+    def __init__(self, block_number, portfolios, nav, lent_value, supply, fee, offsets, assets, held, lent, value,
+                 missing_prices):
+        self.block_number = block_number
+        self.portfolios = portfolios
+        self.nav = nav
+        self.lent_value = lent_value
+        self.supply = supply
+        self.fee = fee
+        self.offsets = offsets
+        self.assets = assets
+        self.held = held
+        self.lent = lent
+        self.value = value
+        self.missing_prices = missing_prices
+
+    def __len__(self):
+        return len(self.portfolios)
+
+    @property
+    def lending_share(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.nav > 0, self.lent_value / self.nav, 0.0)
+
+    @property
+    def weights(self):
+        # Share of NAV per asset row
+        nav = np.repeat(self.nav, np.diff(self.offsets))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(nav > 0, self.value / nav, 0.0)
+
+    def exposure(self, i):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return dict(zip(self.assets[start:end], self.value[start:end]))
+
+
+class ValuationEngine:
+    """Values WEDX Pro portfolios against the asset catalog's prices.
+
+    Holdings are getAssetsExtended, the contract's per-asset total with lent balances
+    included, so nothing is added up on this side. getAmountLendToken is read for every
+    asset only to split that total into held and lent; the two batched rounds are needed
+    because the lend reads take the asset list. The price vector is built once from
+    get_assets_info and reused until refresh_prices is called.
+    """
+
+    def __init__(self, wedx, price_field='tokenPriceUSD', prices=None, default_decimals=18, tokens=None):
+        self.wedx = wedx
+        # Optional TokenIndex; its on-chain decimals take precedence over the catalog's
+        self.tokens = tokens
+        self.price_field = price_field
+        self.extra_prices = prices or {}
+        self.default_decimals = default_decimals
+        self._index = {}
+        self._prices = np.zeros(0)
+        self._scales = np.zeros(0)
+
+    def refresh_prices(self, assets_info=None):
+        if assets_info is None:
+            assets_info = self.wedx.get_assets_info() or {}
+        prices = {}
+        decimals = {}
+        for key, info in assets_info.items():
+            if not isinstance(info, dict) or self.price_field not in info:
+                continue
+            address = to_address(key)
+            prices[address] = float(info[self.price_field])
+            for token in info.get('inputTokens', []):
+                if token.get('id', '').lower() == address.lowercase and 'decimals' in token:
+                    decimals[address] = int(token['decimals'])
+        for address, price in self.extra_prices.items():
+            prices[to_address(address)] = float(price)
+
+        self._index = {address: i for i, address in enumerate(prices)}
+        self._prices = np.array(list(prices.values()), dtype=np.float64)
+        self._scales = np.array([10.0 ** -decimals.get(address, self.default_decimals) for address in prices], dtype=np.float64)
+
+    def _asset_indices(self, assets):
+        # Unknown assets get index -1 and price zero
+        return np.array([self._index.get(to_address(asset), -1) for asset in assets], dtype=np.int64)
+
+    @staticmethod
+    def _sum_rows(values, offsets):
+        totals = np.zeros(len(offsets) - 1, dtype=np.float64)
+        # reduceat only over non-empty groups: each one then ends where the next non-empty one starts
+        nonempty = np.diff(offsets) > 0
+        if nonempty.any():
+            totals[nonempty] = np.add.reduceat(values, offsets[:-1][nonempty])
+        return totals
+
+    def read_holdings(self, portfolios, block_number):
+        calls = []
+        for portfolio in portfolios:
+            calls.append((portfolio, 'abiWEDXPro', 'getAddresses', ()))
+            calls.append((portfolio, 'abiWEDXPro', 'getAssetsExtended', ()))
+            calls.append((portfolio, 'abiWEDXPro', 'getSupply', ()))
+            calls.append((portfolio, 'abiWEDXPro', 'getDepositWithdrawFee', ()))
+        results = self.wedx.batch_read(calls, block_number)
+        addresses = results[0::4]
+        totals = results[1::4]
+
+        lend_calls = []
+        for portfolio, assets in zip(portfolios, addresses):
+            lend_calls.extend((portfolio, 'abiWEDXPro', 'getAmountLendToken', (asset,)) for asset in assets)
+        lent = self.wedx.batch_read(lend_calls, block_number)
+        return addresses, totals, lent, results[2::4], results[3::4]
+
+    def value(self, portfolios=None, block_number=None):
+        if portfolios is None:
+            portfolios = [self.wedx.get_trading_account_address()]
+        if block_number is None:
+            block_number = self.wedx.w3.eth.block_number
+        if not self._index:
+            self.refresh_prices()
+
+        addresses, totals, lent, supply, fee = self.read_holdings(portfolios, block_number)
+        counts = [len(assets) for assets in addresses]
+        offsets = np.zeros(len(portfolios) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        flat_assets = [asset for assets in addresses for asset in assets]
+        total = np.zeros(len(flat_assets), dtype=np.float64)
+        for start, amounts in zip(offsets, totals):
+            # getAssetsExtended lines up with getAddresses
+            total[start:start + len(amounts)] = [float(amount) for amount in amounts]
+        lent = np.array([float(amount) for amount in lent], dtype=np.float64)
+        held = np.maximum(total - lent, 0.0)
+
+        index = self._asset_indices(flat_assets)
+        known = index >= 0
+        unit_price = np.zeros(len(index), dtype=np.float64)
+        unit_price[known] = self._prices[index[known]] * self._scales[index[known]]
+        if self.tokens is not None:
+            decimals = self.tokens.decimals_array(flat_assets)
+            onchain = known & ~np.isnan(decimals)
+            unit_price[onchain] = self._prices[index[onchain]] * 10.0 ** -decimals[onchain]
+
+        value = total * unit_price
+        lent_value = lent * unit_price
+        nav = self._sum_rows(value, offsets)
+        lent_nav = self._sum_rows(lent_value, offsets)
+
+        return Valuation(
+            block_number,
+            list(portfolios),
+            nav,
+            lent_nav,
+            uint_array(supply),
+            np.array(fee, dtype=np.uint64),
+            offsets,
+            flat_assets,
+            held,
+            lent,
+            value,
+            sorted({asset for asset, ok in zip(flat_assets, known) if not ok}),
+        )
@@ -1,27 +1,85 @@
+import copy
 import json
+import os
 from web3 import Web3
-from eth_account import Account
 import time
 import requests
 import math
+from contextlib import contextmanager
+from signer import LocalSigner
+from simulation import Simulator
+from abi_codec import AbiCodec
+from addresses import to_address
+from results import PortfolioSnapshot, decode_address_array, decode_trader_data, decode_uint_array, trader_data_decoder
+from web3.exceptions import TransactionNotFound, Web3RPCError
+from ws_provider import WebSocketRPCProvider
+from journal import TxJournal, event_names, format_summary, summarize_receipt
+
+NETWORK_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'network_data', 'network_data_v1.json')
+
+
+def load_network(path=NETWORK_DATA):
+    # The default path is absolute, so the working directory does not matter
+    with open(path) as f:
+        return json.load(f)
+
 
 class WedX:
-    def __init__(self, chain_id, user_address, user_private_key, chain_rpcs):
+    def __init__(self, chain_id, user_address, user_private_key, chain_rpcs, signer=None, network=None, journal=None):
         self.chain_id = chain_id
-        self.user_address = user_address
-        self.user_private_key = user_private_key
-        self.zero_address = "0x0000000000000000000000000000000000000000"
+        # The key is only used to build a LocalSigner; pass signer= to keep it out of the instance
+        self.signer = signer if signer is not None else LocalSigner(user_private_key)
+        self.user_address = to_address(user_address if user_address is not None else self.signer.address)
+        self.zero_address = to_address("0x0000000000000000000000000000000000000000")
         self.DISTRO_NORM = 10 ** 6
         self.chain_rpc = chain_rpcs
-
-        # Load network data
-        with open('../network_data/network_data_v1.json') as f:
-            self.network = json.load(f)
-
-        self.w3 = Web3(Web3.HTTPProvider(self.get_chain_rpc()))
+        self.data_url = 'https://app.wedefin.com'
+        # Kept open between catalog fetches
+        self.http = requests.Session()
+        self.http_timeout = 30
+        self.batch_size = 100
+
+        # Load network data, unless it is shared by a WedXSession
+        if network is None:
+            network = load_network()
+        self.network = network
+        self.codec = AbiCodec(self.network[self.get_chain_name()])
+
+        # ws:// and wss:// endpoints get push-based confirmations and event subscriptions
+        rpc = self.get_chain_rpc()
+        if isinstance(rpc, str) and rpc.startswith(('ws://', 'wss://')):
+            self.w3 = Web3(WebSocketRPCProvider(rpc))
+        else:
+            self.w3 = Web3(Web3.HTTPProvider(rpc))
         if not self.w3.is_connected():
             raise ConnectionError("Failed to connect to the network")
 
+        # With preflight on, every write is eth_call'ed first and a predicted revert raises ValueError
+        self.preflight = False
+        self.simulator = Simulator(self)
+        self._planned = None
+        self._fees = None
+        self._event_names = None
+
+        # Transactions left in flight by an earlier run are settled before anything new is sent
+        self.journal = None
+        if journal is not None:
+            self.journal = journal if isinstance(journal, TxJournal) else TxJournal(journal)
+            outcome = self.journal.reconcile(self.w3, self.chain_id, self.event_names())
+            if any(outcome.values()):
+                print("Journal: " + ", ".join(f"{len(ids)} {state}" for state, ids in outcome.items()))
+
+    def for_account(self, user_address, signer):
+        """A WedX for another account and signer, sharing this one's provider, codec and journal."""
+        wedx = copy.copy(self)
+        wedx.signer = signer
+        wedx.user_address = to_address(user_address)
+        wedx.simulator = copy.copy(self.simulator)
+        wedx.simulator.wedx = wedx
+        wedx._planned = None
+        wedx._fees = None
+        return wedx
+
     def get_chain_rpc(self):
         return self.chain_rpc.get(self.chain_id, None)
 
@@ -34,7 +92,7 @@ class WedX:
         return chain_names.get(self.chain_id, None)
 
     def normalize_distribution(self, distro):
-        distro = distro.copy() 
+        distro = list(distro)
         distro_size = len(distro)
         total = sum(distro)
         
@@ -73,12 +131,15 @@ class WedX:
         if len(distro1) != len(distro2) or len(addresses1) != len(addresses2):
             return True
 
-        addresses1 = addresses1.copy()
-        addresses2 = addresses2.copy()
-
-        for i in range(len(addresses1)):
-            addresses1[i] = addresses1[i].lower()
-            addresses2[i] = addresses2[i].lower()
+        # Interned addresses: any spelling of an address maps to the same object, and the
+        # Address values the getters return are used as they are
+        try:
+            addresses1 = [to_address(address) for address in addresses1]
+            addresses2 = [to_address(address) for address in addresses2]
+        except ValueError:
+            # A mis-checksummed spelling compares lowercased, as before interning
+            addresses1 = [to_address(address.lower()) for address in addresses1]
+            addresses2 = [to_address(address.lower()) for address in addresses2]
 
         dict1 = dict(zip(addresses1, distro1))
         dict2 = dict(zip(addresses2, distro2))
@@ -99,19 +160,179 @@ class WedX:
     def get_wedx_deployer_address(self):
         group_contract_address = self.network[self.get_chain_name()]['contractWEDXGroup']
         group_contract = self.w3.eth.contract(address=group_contract_address, abi=self.network[self.get_chain_name()]['abiWEDXGroup'])
-        return group_contract.functions.getDeployerProAddress().call()
+        return to_address(group_contract.functions.getDeployerProAddress().call())
 
     def get_trading_account_address(self):
         group_contract_address = self.network[self.get_chain_name()]['contractWEDXGroup']
         group_contract = self.w3.eth.contract(address=group_contract_address, abi=self.network[self.get_chain_name()]['abiWEDXGroup'])
         deployer_contract_address = group_contract.functions.getDeployerProAddress().call()
         deployer_contract = self.w3.eth.contract(address=deployer_contract_address, abi=self.network[self.get_chain_name()]['abiWEDXDeployerPro'])
-        return deployer_contract.functions.getUserProPortfolioAddress(user=self.user_address).call()
+        return to_address(deployer_contract.functions.getUserProPortfolioAddress(user=self.user_address).call())
 
     def get_manager_account_address(self):
         group_contract_address = self.network[self.get_chain_name()]['contractWEDXGroup']
         group_contract = self.w3.eth.contract(address=group_contract_address, abi=self.network[self.get_chain_name()]['abiWEDXGroup'])
-        return group_contract.functions.getAssetManagerAddress().call()
+        return to_address(group_contract.functions.getAssetManagerAddress().call())
+
+    def contract_addresses(self):
+        # Every WedX contract this user's writes go to, e.g. for SignerServer(allowed_to=...)
+        group_contract_address = to_address(self.network[self.get_chain_name()]['contractWEDXGroup'])
+        manager, deployer_pro, deployer_index = self.batch_read([
+            (group_contract_address, 'abiWEDXGroup', getter, ())
+            for getter in ('getAssetManagerAddress', 'getDeployerProAddress', 'getDeployerIndexAddress')])
+        addresses = {group_contract_address, to_address(manager), to_address(deployer_pro), to_address(deployer_index)}
+        portfolio = self.get_trading_account_address()
+        if portfolio != self.zero_address:
+            addresses.add(portfolio)
+        return addresses
+
+    def batch_read(self, calls, block_identifier='latest', decoders=None):
+        # One JSON-RPC batch per batch_size (address, abi_key, function_name, args) calls, all pinned
+        # to the same block, encoded with the cached codec and sent straight to the provider.
+        # decoders maps a function name to a decoder of its raw result (see results.py)
+        decoders = decoders or {}
+        if isinstance(block_identifier, int):
+            block_identifier = hex(block_identifier)
+        results = []
+        for start in range(0, len(calls), self.batch_size):
+            chunk = calls[start:start + self.batch_size]
+            requests = [('eth_call', [{'to': address, 'data': self.codec.encode_call(abi_key, name, args)}, block_identifier])
+                        for address, abi_key, name, args in chunk]
+            responses = self.w3.provider.make_batch_request(requests)
+            if not isinstance(responses, list):
+                raise ValueError(f"Batch request failed: {responses.get('error')}")
+            for (address, abi_key, name, _), response in zip(chunk, responses):
+                if 'error' in response:
+                    raise ValueError(f"{name} on {address} failed: {response['error']}")
+                data = bytes.fromhex(response['result'][2:])
+                decoder = decoders.get(name)
+                results.append(decoder(data) if decoder is not None else self.codec.decode_result(abi_key, name, data))
+        return results
+
+    def event_names(self):
+        if self._event_names is None:
+            self._event_names = event_names(self.network[self.get_chain_name()])
+        return self._event_names
+
+    def _write(self, address, abi_key, name, args=(), value=0):
+        # Fast path: calldata from the precompiled codec, no web3 contract objects
+        return self._send_call(address, self.codec.encode_call(abi_key, name, args), value, name)
+
+    @contextmanager
+    def fee_limits(self, max_fee_per_gas, max_priority_fee_per_gas):
+        """Signs the writes made inside the block as EIP-1559 transactions with these fees."""
+        previous = self._fees
+        self._fees = {'maxFeePerGas': int(max_fee_per_gas), 'maxPriorityFeePerGas': int(max_priority_fee_per_gas)}
+        try:
+            yield self._fees
+        finally:
+            self._fees = previous
+
+    def fee_fields(self):
+        # The fees set by fee_limits, else the node's legacy gas price
+        if self._fees is not None:
+            return dict(self._fees)
+        return {'gasPrice': self.w3.eth.gas_price}
+
+    def _send_call(self, to, data, value=0, operation=None):
+        call = {'from': self.signer.address, 'to': to, 'data': data, 'value': value}
+        if self._planned is not None:
+            self._planned.append(call)
+            return call
+
+        entry_id = None
+        if self.journal is not None:
+            entry = self.journal.pending(self.chain_id, call)
+            if entry is not None and self._resume(entry):
+                # Already sent by an earlier run: wait for it instead of sending it twice
+                print(f"Resuming transaction {entry['tx_hash']}")
+                return self._confirm(entry['id'], self.wait_for_receipt(entry['tx_hash']))
+            entry_id = self.journal.plan(self.chain_id, call, operation)
+
+        raw_tx = None
+        try:
+            if self.preflight:
+                simulation = self.simulator.simulate(call)
+                if not simulation.success:
+                    raise ValueError(f"Transaction would revert: {simulation.revert_reason}")
+                gas_estimate = simulation.gas_estimate
+            else:
+                # Estimate gas
+                gas_estimate = self.w3.eth.estimate_gas(call)
+
+            tx = {
+                'chainId': self.chain_id,
+                'gas': int(gas_estimate * 1.2),  # Add 20% buffer to gas estimate
+                **self.fee_fields(),
+                'nonce': self.w3.eth.get_transaction_count(self.signer.address),
+                'value': value,
+                'to': to,
+                'data': data,
+            }
+
+            raw_tx = self.signer.sign_transaction(tx)
+            if entry_id is not None:
+                self.journal.signed(entry_id, tx, raw_tx)
+            tx_hash = self.w3.eth.send_raw_transaction(raw_tx)
+        except Exception as error:
+            # Once signed, only a rejection by the node is final; e.g. a dropped connection leaves
+            # the entry for the next reconciliation to re-broadcast or settle
+            if entry_id is not None and (raw_tx is None or isinstance(error, (Web3RPCError, ValueError))):
+                self.journal.failed(entry_id, error)
+            raise
+        if entry_id is not None:
+            self.journal.sent(entry_id)
+        return self._confirm(entry_id, self.wait_for_receipt(tx_hash))
+
+    def _resume(self, entry):
+        # A 'signed' entry may never have reached the node (the send failed on a dropped
+        # connection), so its raw bytes are broadcast again before waiting for it. False
+        # when the node rejects them and they were not mined: the write is sent anew
+        if entry['state'] != 'signed':
+            return True
+        try:
+            self.w3.eth.send_raw_transaction(entry['raw'])
+        except (Web3RPCError, ValueError) as error:
+            if 'known' not in str(error).lower():
+                try:
+                    self.w3.eth.get_transaction_receipt(entry['tx_hash'])
+                except TransactionNotFound:
+                    self.journal.failed(entry['id'], error)
+                    return False
+        self.journal.sent(entry['id'])
+        return True
+
+    def _confirm(self, entry_id, tx_receipt):
+        summary = summarize_receipt(tx_receipt, self.event_names())
+        if entry_id is not None:
+            self.journal.confirmed(entry_id, summary)
+        print(format_summary(summary))
+        return tx_receipt
+
+    def wait_for_receipt(self, tx_hash, timeout=120, poll_latency=0.1):
+        follower = getattr(self.w3.provider, 'follower', None)
+        if follower is None:
+            return self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout, poll_latency=poll_latency)
+
+        # Over WebSocket the receipt is read once, when a pushed block contains the transaction
+        with follower.watch(tx_hash) as pending:
+            try:
+                return self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                pass
+            pending.wait(timeout)
+        return self.w3.eth.get_transaction_receipt(tx_hash)
+
+    def subscribe_events(self, handler, addresses=None):
+        follower = getattr(self.w3.provider, 'follower', None)
+        if follower is None:
+            raise ValueError("Event subscriptions need a ws:// or wss:// RPC")
+        if addresses is None:
+            addresses = [self.network[self.get_chain_name()]['contractWEDXGroup']]
+            trading_account = self.get_trading_account_address()
+            if trading_account != self.zero_address:
+                addresses.append(trading_account)
+        follower.subscribe_logs(handler, address=addresses)
 
     def create_trading_account_address(self):
         pro_account_address = self.get_trading_account_address()
@@ -121,24 +342,7 @@ class WedX:
         group_contract_address = self.network[self.get_chain_name()]['contractWEDXGroup']
         group_contract = self.w3.eth.contract(address=group_contract_address, abi=self.network[self.get_chain_name()]['abiWEDXGroup'])
         deployer_contract_address = group_contract.functions.getDeployerProAddress().call()
-        deployer_contract = self.w3.eth.contract(address=deployer_contract_address, abi=self.network[self.get_chain_name()]['abiWEDXDeployerPro'])
-
-        account = Account.from_key(self.user_private_key)
-        
-        # Estimate gas
-        gas_estimate = deployer_contract.functions.createProPortfolio().estimate_gas({'from': account.address})
-
-        tx = deployer_contract.functions.createProPortfolio().build_transaction({
-            'chainId': self.chain_id,
-            'gas': int(gas_estimate * 1.2),  # Add 20% buffer to gas estimate
-            'gasPrice': self.w3.eth.gas_price,
-            'nonce': self.w3.eth.get_transaction_count(account.address),
-        })
-
-        signed_tx = account.sign_transaction(tx)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-        print(f"Transaction hash: {tx_receipt}")
+        self._write(deployer_contract_address, 'abiWEDXDeployerPro', 'createProPortfolio')
         time.sleep(1)
         return self.get_trading_account_address()
 
@@ -147,93 +351,55 @@ class WedX:
         if pro_account_address == self.zero_address:
             raise ValueError("User does not have an account")
 
-        pro_contract = self.w3.eth.contract(address=pro_account_address, abi=self.network[self.get_chain_name()]['abiWEDXPro'])
-        account = Account.from_key(self.user_private_key)
         value_in_wei = self.w3.to_wei(eth_amount, 'ether')
 
-        # Estimate gas
-        gas_estimate = pro_contract.functions.deposit().estimate_gas({'from': account.address, 'value': value_in_wei})
-
-        tx = pro_contract.functions.deposit().build_transaction({
-            'chainId': self.chain_id,
-            'gas': int(gas_estimate * 1.2),  # Add 20% buffer to gas estimate
-            'gasPrice': self.w3.eth.gas_price,
-            'nonce': self.w3.eth.get_transaction_count(account.address),
-            'value': value_in_wei
-        })
-
-        signed_tx = account.sign_transaction(tx)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-        print(f"Transaction hash: {tx_receipt}")
-        return tx_receipt
+        return self._write(pro_account_address, 'abiWEDXPro', 'deposit', value=value_in_wei)
 
     def withdraw_eth(self, perc_amount):
         pro_account_address = self.get_trading_account_address()
         if pro_account_address == self.zero_address:
             raise ValueError("User does not have an account")
 
-        pro_contract = self.w3.eth.contract(address=pro_account_address, abi=self.network[self.get_chain_name()]['abiWEDXPro'])
-        account = Account.from_key(self.user_private_key)
-
-        # Estimate gas
-        gas_estimate = pro_contract.functions.withdraw(perc_amount).estimate_gas({'from': account.address})
-
-        tx = pro_contract.functions.withdraw(perc_amount).build_transaction({
-            'chainId': self.chain_id,
-            'gas': int(gas_estimate * 1.2),  # Add 20% buffer to gas estimate
-            'gasPrice': self.w3.eth.gas_price,
-            'nonce': self.w3.eth.get_transaction_count(account.address)
-        })
-
-        signed_tx = account.sign_transaction(tx)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-        print(f"Transaction hash: {tx_receipt}")
-        return tx_receipt
+        return self._write(pro_account_address, 'abiWEDXPro', 'withdraw', (perc_amount,))
 
     def get_assets_info(self):
         chain_name = self.get_chain_name()
-        url = f'https://app.wedefin.com/exchange_data_{chain_name}.json'
+        url = f'{self.data_url}/exchange_data_{chain_name}.json'
         try:
-            response = requests.get(url)
+            response = self.http.get(url, timeout=self.http_timeout)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
             print(f"An error occurred while fetching the JSON: {e}")
             return None
 
+    def stream_assets_info(self, where=None, limit=None):
+        # Like get_assets_info, but parsed while downloading and stopped once limit records pass where(record)
+        from catalog import read_catalog
+        chain_name = self.get_chain_name()
+        url = f'{self.data_url}/exchange_data_{chain_name}.json'
+        try:
+            with self.http.get(url, stream=True, timeout=self.http_timeout) as response:
+                response.raise_for_status()
+                return read_catalog(response.iter_content(chunk_size=65536), where, limit)
+        except requests.RequestException as e:
+            print(f"An error occurred while fetching the JSON: {e}")
+            return None
+
     def set_portfolio(self, assets, portfolio):
         pro_account_address = self.get_trading_account_address()
         if pro_account_address == self.zero_address:
             raise ValueError("User does not have an account")
 
-        pro_contract = self.w3.eth.contract(address=pro_account_address, abi=self.network[self.get_chain_name()]['abiWEDXPro'])
-        account = Account.from_key(self.user_private_key)
-
-        # Estimate gas
-        gas_estimate = pro_contract.functions.setPortfolio(assets, portfolio).estimate_gas({'from': account.address})
-
-        tx = pro_contract.functions.setPortfolio(assets, portfolio).build_transaction({
-            'chainId': self.chain_id,
-            'gas': int(gas_estimate * 1.2),  # Add 20% buffer to gas estimate
-            'gasPrice': self.w3.eth.gas_price,
-            'nonce': self.w3.eth.get_transaction_count(account.address)
-        })
-
-        signed_tx = account.sign_transaction(tx)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-        print(f"Transaction hash: {tx_receipt}")
-        return tx_receipt
+        return self._write(pro_account_address, 'abiWEDXPro', 'setPortfolio', (assets, portfolio))
 
     def get_distribution(self):
         pro_account_address = self.get_trading_account_address()
         if pro_account_address == self.zero_address:
             raise ValueError("User does not have an account")
 
-        pro_contract = self.w3.eth.contract(address=pro_account_address, abi=self.network[self.get_chain_name()]['abiWEDXPro'])
-        return pro_contract.functions.getActualDistribution().call()
+        return list(self.batch_read([(pro_account_address, 'abiWEDXPro', 'getActualDistribution', ())],
+                                    decoders={'getActualDistribution': decode_uint_array})[0])
 
     def get_distribution_threshold(self):
         pro_account_address = self.get_trading_account_address()
@@ -248,8 +414,36 @@ class WedX:
         if pro_account_address == self.zero_address:
             raise ValueError("User does not have an account")
 
-        pro_contract = self.w3.eth.contract(address=pro_account_address, abi=self.network[self.get_chain_name()]['abiWEDXPro'])
-        return pro_contract.functions.getAddresses().call()
+        return self.batch_read([(pro_account_address, 'abiWEDXPro', 'getAddresses', ())],
+                               decoders={'getAddresses': decode_address_array})[0]
+
+    def get_portfolio_snapshot(self, block_identifier=None):
+        # Account, distribution and score in three batched round trips, all read at the same block
+        if block_identifier is None:
+            block_identifier = self.w3.eth.block_number
+        group_address = self.network[self.get_chain_name()]['contractWEDXGroup']
+        deployer_contract_address, manager_account_address = self.batch_read([
+            (group_address, 'abiWEDXGroup', 'getDeployerProAddress', ()),
+            (group_address, 'abiWEDXGroup', 'getAssetManagerAddress', ()),
+        ], block_identifier)
+
+        pro_account_address, score, required_interactions = self.batch_read([
+            (deployer_contract_address, 'abiWEDXDeployerPro', 'getUserProPortfolioAddress', (self.user_address,)),
+            (manager_account_address, 'abiWEDXManager', 'getTraderScore', (self.user_address,)),
+            (manager_account_address, 'abiWEDXManager', 'getNPoints', ()),
+        ], block_identifier)
+
+        snapshot = PortfolioSnapshot(self.chain_id, block_identifier, pro_account_address, score, required_interactions)
+        if pro_account_address == self.zero_address:
+            return snapshot
+
+        snapshot.distribution, snapshot.assets, snapshot.threshold, snapshot.supply = self.batch_read([
+            (pro_account_address, 'abiWEDXPro', 'getActualDistribution', ()),
+            (pro_account_address, 'abiWEDXPro', 'getAddresses', ()),
+            (pro_account_address, 'abiWEDXPro', 'getMinPercAllowance', ()),
+            (pro_account_address, 'abiWEDXPro', 'getSupply', ()),
+        ], block_identifier, decoders={'getActualDistribution': decode_uint_array, 'getAddresses': decode_address_array})
+        return snapshot
 
     def get_user_score(self):
         manager_account_address = self.get_manager_account_address()
@@ -259,13 +453,15 @@ class WedX:
         manager_contract = self.w3.eth.contract(address=manager_account_address, abi=self.network[self.get_chain_name()]['abiWEDXManager'])
         return manager_contract.functions.getTraderScore(self.user_address).call()
 
-    def get_trader_data(self):
+    def get_trader_data(self, fields=None):
+        # TraderData; pass fields (e.g. ('performances',)) to decode only those
         manager_account_address = self.get_manager_account_address()
         if manager_account_address == self.zero_address:
             raise ValueError("Error retrieving manager contract address")
 
-        manager_contract = self.w3.eth.contract(address=manager_account_address, abi=self.network[self.get_chain_name()]['abiWEDXManager'])
-        return manager_contract.functions.getTraderData(self.user_address).call()
+        decoder = decode_trader_data if fields is None else trader_data_decoder(fields)
+        return self.batch_read([(manager_account_address, 'abiWEDXManager', 'getTraderData', (self.user_address,))],
+                               decoders={'getTraderData': decoder})[0]
 
     def get_required_interactions(self):
         manager_account_address = self.get_manager_account_address()
@@ -275,79 +471,31 @@ class WedX:
         manager_contract = self.w3.eth.contract(address=manager_account_address, abi=self.network[self.get_chain_name()]['abiWEDXManager'])
         return manager_contract.functions.getNPoints().call()
 
-    def earn_with_lending(self, assets):
+    def earn_with_lending(self, assets, lender_ids=None):
         pro_account_address = self.get_trading_account_address()
         if pro_account_address == self.zero_address:
             raise ValueError("User does not have an account")
 
-        pro_contract = self.w3.eth.contract(address=pro_account_address, abi=self.network[self.get_chain_name()]['abiWEDXPro'])
-        account = Account.from_key(self.user_private_key)
+        if lender_ids is None:
+            lender_ids = [0 for _ in range(len(assets))]
+        if len(lender_ids) != len(assets):
+            raise ValueError("Each asset needs a lender id")
 
-        protocol_id = [0 for _ in range(len(assets))]
-        
-        # Estimate gas
-        gas_estimate = pro_contract.functions.supplyLendTokens(assets, protocol_id).estimate_gas({'from': account.address})
-
-        tx = pro_contract.functions.supplyLendTokens(assets, protocol_id).build_transaction({
-            'chainId': self.chain_id,
-            'gas': int(gas_estimate * 1.2),  # Add 20% buffer to gas estimate
-            'gasPrice': self.w3.eth.gas_price,
-            'nonce': self.w3.eth.get_transaction_count(account.address)
-        })
-
-        signed_tx = account.sign_transaction(tx)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-        print(f"Transaction hash: {tx_receipt}")
-        return tx_receipt
+        return self._write(pro_account_address, 'abiWEDXPro', 'supplyLendTokens', (assets, lender_ids))
 
     def withdraw_from_lending(self, assets):
         pro_account_address = self.get_trading_account_address()
         if pro_account_address == self.zero_address:
             raise ValueError("User does not have an account")
 
-        pro_contract = self.w3.eth.contract(address=pro_account_address, abi=self.network[self.get_chain_name()]['abiWEDXPro'])
-        account = Account.from_key(self.user_private_key)
-
-        # Estimate gas
-        gas_estimate = pro_contract.functions.withdrawLendTokens(assets).estimate_gas({'from': account.address})
-
-        tx = pro_contract.functions.withdrawLendTokens(assets).build_transaction({
-            'chainId': self.chain_id,
-            'gas': int(gas_estimate * 1.2),  # Add 20% buffer to gas estimate
-            'gasPrice': self.w3.eth.gas_price,
-            'nonce': self.w3.eth.get_transaction_count(account.address)
-        })
-
-        signed_tx = account.sign_transaction(tx)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-        print(f"Transaction hash: {tx_receipt}")
-        return tx_receipt
+        return self._write(pro_account_address, 'abiWEDXPro', 'withdrawLendTokens', (assets,))
 
     def rank_me(self):
         pro_account_address = self.get_trading_account_address()
         if pro_account_address == self.zero_address:
             raise ValueError("User does not have an account")
 
-        pro_contract = self.w3.eth.contract(address=pro_account_address, abi=self.network[self.get_chain_name()]['abiWEDXPro'])
-        account = Account.from_key(self.user_private_key)
-
-        # Estimate gas
-        gas_estimate = pro_contract.functions.rankMe().estimate_gas({'from': account.address})
-
-        tx = pro_contract.functions.rankMe().build_transaction({
-            'chainId': self.chain_id,
-            'gas': int(gas_estimate * 1.2),  # Add 20% buffer to gas estimate
-            'gasPrice': self.w3.eth.gas_price,
-            'nonce': self.w3.eth.get_transaction_count(account.address)
-        })
-
-        signed_tx = account.sign_transaction(tx)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-        print(f"Transaction hash: {tx_receipt}")
-        return tx_receipt
+        return self._write(pro_account_address, 'abiWEDXPro', 'rankMe')
     
     def get_current_slippage(self):
         pro_account_address = self.get_trading_account_address()
@@ -362,21 +510,19 @@ class WedX:
         if pro_account_address == self.zero_address:
             raise ValueError("User does not have an account")
 
+        return self._write(pro_account_address, 'abiWEDXPro', 'changeMaxSlippage', (new_value,))
+
+    def get_delegated_address(self):
+        pro_account_address = self.get_trading_account_address()
+        if pro_account_address == self.zero_address:
+            raise ValueError("User does not have an account")
+
         pro_contract = self.w3.eth.contract(address=pro_account_address, abi=self.network[self.get_chain_name()]['abiWEDXPro'])
-        account = Account.from_key(self.user_private_key)
-
-        # Estimate gas
-        gas_estimate = pro_contract.functions.changeMaxSlippage(new_value).estimate_gas({'from': account.address})
-
-        tx = pro_contract.functions.changeMaxSlippage(new_value).build_transaction({
-            'chainId': self.chain_id,
-            'gas': int(gas_estimate * 1.2),  # Add 20% buffer to gas estimate
-            'gasPrice': self.w3.eth.gas_price,
-            'nonce': self.w3.eth.get_transaction_count(account.address)
-        })
-
-        signed_tx = account.sign_transaction(tx)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        tx_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-        print(f"Transaction hash: {tx_receipt}")
-        return tx_receipt
\ No newline at end of file
+        return to_address(pro_contract.functions.getDelegatedAddress().call())
+
+    def change_delegated_address(self, new_address):
+        pro_account_address = self.get_trading_account_address()
+        if pro_account_address == self.zero_address:
+            raise ValueError("User does not have an account")
+
+        return self._write(pro_account_address, 'abiWEDXPro', 'changeDelegatedAddress', (new_address,))
@@ -0,0 +1,305 @@
+import argparse
+import collections
+import contextlib
+import cProfile
+import importlib
+import json
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SRC_DIR)
+
+from session import WedXSession  # noqa: E402
+from wedx import NETWORK_DATA, load_network  # noqa: E402
+
+RPC_ENV = {1: 'RPC_ETHEREUM', 8453: 'RPC_BASE', 42161: 'RPC_ARBITRUM'}
+PHASES = ('connect', 'catalog', 'rpc', 'sign', 'confirm', 'strategy')
+
+
+class PhaseTimer:
+    """Wall time per phase; a phase is counted without the phases nested inside it."""
+
+    def __init__(self):
+        self.totals = collections.defaultdict(float)
+        self.counts = collections.Counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.totals.clear()
+            self.counts.clear()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                self.totals[name] += elapsed - nested
+                self.counts[name] += 1
+
+    def wrap(self, name, fn):
+        def timed(*args, **kwargs):
+            with self.phase(name):
+                return fn(*args, **kwargs)
+        return timed
+
+
+class StackSampler:
+    """Samples one thread's Python stack every ``interval`` seconds while active.
+
+    Unlike cProfile it adds no per-call overhead, and time spent waiting on the network
+    shows up under the call that waited. Stacks are written in the collapsed format read
+    by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.active = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self.active.wait()
+            if self._closed:
+                break
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def top(self, n=15):
+        leaves = collections.Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return leaves.most_common(n)
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def close(self):
+        self._closed = True
+        self.active.set()
+
+
+def load_strategy(spec, base_dir):
+    # 'module:function', the module looked up next to the config file first
+    module_name, _, function_name = spec.partition(':')
+    if base_dir not in sys.path:
+        sys.path.insert(0, base_dir)
+    function = getattr(importlib.import_module(module_name), function_name or 'run', None)
+    if not callable(function):
+        raise ValueError(f"Strategy {spec} is not a function")
+    return function
+
+
+def load_config(path):
+    with open(path) as f:
+        config = json.load(f)
+    if not config.get('strategies'):
+        raise ValueError(f"No strategies in {path}")
+    base_dir = os.path.dirname(os.path.abspath(path))
+    strategies = []
+    for item in config['strategies']:
+        strategies.append({
+            'name': item.get('name', item['run']),
+            'chain_id': int(item['chain_id']),
+            'run': load_strategy(item['run'], base_dir),
+            'params': item.get('params', {}),
+        })
+    config['strategies'] = strategies
+    return config
+
+
+class Worker:
+    """Runs the configured strategies every ``interval`` seconds in one long-lived process.
+
+    Imports, network data, the signer, each chain's client and its RPC connection are set
+    up once; the asset catalog is fetched at most once per chain and cycle. Each strategy
+    is a function taking the chain's WedX client (and the config's params).
+    """
+
+    def __init__(self, config, timer=None):
+        self.config = config
+        self.interval = config.get('interval', 14400)
+        self.strategies = config['strategies']
+        self.timer = timer if timer is not None else PhaseTimer()
+        self.stop = threading.Event()
+        self.cycles = 0
+
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except ImportError:
+            pass
+        rpcs = {int(chain_id): url for chain_id, url in config.get('rpcs', {}).items()}
+        for chain_id, name in RPC_ENV.items():
+            rpcs.setdefault(chain_id, os.getenv(name))
+        network = load_network(config.get('network_data', NETWORK_DATA))
+        if not os.getenv('USER_PRIVATE_KEY'):
+            raise ValueError("USER_PRIVATE_KEY is not set")
+        self.session = WedXSession(os.getenv('USER_ADDRESS'), os.getenv('USER_PRIVATE_KEY'), rpcs, network=network)
+        self.session.signer.sign_transaction = self.timer.wrap('sign', self.session.signer.sign_transaction)
+        self._instrumented = set()
+        self._catalogs = {}
+
+    def _instrument(self, wedx):
+        if 'data_url' in self.config:
+            wedx.data_url = self.config['data_url']
+        provider = wedx.w3.provider
+        provider.make_request = self.timer.wrap('rpc', provider.make_request)
+        provider.make_batch_request = self.timer.wrap('rpc', provider.make_batch_request)
+        wedx.wait_for_receipt = self.timer.wrap('confirm', wedx.wait_for_receipt)
+        fetch = wedx.get_assets_info
+
+        def get_assets_info():
+            # Shared by every strategy of the chain during one cycle
+            if wedx.chain_id not in self._catalogs:
+                info = fetch()
+                if info is None:
+                    return None
+                self._catalogs[wedx.chain_id] = info
+            return self._catalogs[wedx.chain_id]
+        wedx.get_assets_info = self.timer.wrap('catalog', get_assets_info)
+
+    def client(self, chain_id):
+        with self.timer.phase('connect'):
+            wedx = self.session.client(chain_id)
+        if chain_id not in self._instrumented:
+            self._instrument(wedx)
+            self._instrumented.add(chain_id)
+        return wedx
+
+    def cycle(self):
+        self.cycles += 1
+        self.timer.reset()
+        self._catalogs.clear()
+        results = []
+        start = time.perf_counter()
+        for strategy in self.strategies:
+            if self.stop.is_set():
+                break
+            strategy_start = time.perf_counter()
+            try:
+                with self.timer.phase('strategy'):
+                    strategy['run'](self.client(strategy['chain_id']), **strategy['params'])
+                status = 'ok'
+            except Exception as error:
+                status = f"failed: {error}"
+            results.append((strategy['name'], status, time.perf_counter() - strategy_start))
+        return {
+            'cycle': self.cycles,
+            'wall_s': time.perf_counter() - start,
+            'strategies': results,
+            'phases': {name: (self.timer.totals[name], self.timer.counts[name]) for name in PHASES if self.timer.counts[name]},
+        }
+
+    def run(self, once=False, on_cycle=None):
+        while not self.stop.is_set():
+            started = time.monotonic()
+            report = self.cycle()
+            if on_cycle is not None:
+                on_cycle(report)
+            if once:
+                break
+            self.stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def close(self):
+        self.session.close()
+
+
+def format_cycle(report):
+    lines = [f"Cycle {report['cycle']} finished in {report['wall_s']:.2f} s"]
+    for name, status, elapsed in report['strategies']:
+        lines.append(f"  {name:30s} {elapsed:8.2f} s  {status}")
+    phases = ', '.join(f"{name} {total:.3f} s ({count})" for name, (total, count) in report['phases'].items())
+    lines.append(f"  phases: {phases}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='wedx', description='WEDX strategy worker')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='run the strategies of a config file on a schedule')
+    run.add_argument('config', help='JSON file with the interval and the strategies')
+    run.add_argument('--once', action='store_true', help='run a single cycle and exit')
+    run.add_argument('--interval', type=float, help='seconds between cycle starts, overrides the config')
+    run.add_argument('--profile', nargs='?', const='wedx.prof', help='cProfile the cycles, stats written to this file')
+    run.add_argument('--trace', nargs='?', const='wedx_trace.txt', help='sample the stack, collapsed stacks written to this file')
+    run.add_argument('--trace-interval', type=float, default=5.0, help='sampling interval in ms')
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if args.interval is not None:
+        config['interval'] = args.interval
+    worker = Worker(config)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop.set())
+
+    profiler = cProfile.Profile() if args.profile else None
+    sampler = StackSampler(threading.get_ident(), args.trace_interval / 1000) if args.trace else None
+
+    def on_cycle(report):
+        print(format_cycle(report), flush=True)
+        if profiler is not None:
+            profiler.dump_stats(args.profile)
+        if sampler is not None:
+            sampler.write(args.trace)
+
+    cycle = worker.cycle
+
+    def profiled_cycle():
+        if sampler is not None:
+            sampler.active.set()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            return cycle()
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            if sampler is not None:
+                sampler.active.clear()
+    worker.cycle = profiled_cycle
+
+    try:
+        worker.run(once=args.once, on_cycle=on_cycle)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.close()
+    if profiler is not None:
+        print(f"Profile written to {args.profile}")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+    if sampler is not None:
+        sampler.close()
+        print(f"Stack samples written to {args.trace}")
+        for leaf, count in sampler.top():
+            print(f"  {count:6d}  {leaf}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,414 @@
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+from eth_utils import keccak
+
+from web3.exceptions import ProviderConnectionError, TimeExhausted
+from web3.providers.base import JSONBaseProvider
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect
+
+_RESUBSCRIBE = object()
+# Sending these twice would act twice, so a dropped connection fails them instead
+_NOT_REPLAYED = frozenset({'eth_sendTransaction'})
+
+
+class WebSocketConnection:
+    """JSON-RPC over one WebSocket that reconnects on its own.
+
+    A reader thread matches responses to requests and queues subscription
+    notifications for a single worker thread, so handlers run in arrival order and may
+    issue requests themselves. After every (re)connect the worker re-creates all
+    subscriptions and then runs the ``on_connect`` callbacks, which is where gaps are
+    filled. Requests cut off by a dropped connection are sent again once it is back,
+    except for ones that are not idempotent (_NOT_REPLAYED). A raw transaction is sent
+    again too; if the node already has it, its hash is returned as the result.
+    """
+
+    def __init__(self, url, timeout=30, min_backoff=0.25, max_backoff=30):
+        self.url = url
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.on_connect = []
+        self.reconnects = 0
+        self.generation = 0
+
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._subscriptions = []
+        self._handlers = {}
+        self._early = {}
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._connected = threading.Event()
+        self._closed = False
+        self._ws = None
+        self._notifications = queue.Queue()
+
+        self._reader = threading.Thread(target=self._read_forever, daemon=True)
+        self._worker = threading.Thread(target=self._work_forever, daemon=True)
+        self._reader.start()
+        self._worker.start()
+
+    # --- connection
+
+    def _read_forever(self):
+        backoff = self.min_backoff
+        while not self._closed:
+            try:
+                ws = connect(self.url, open_timeout=self.timeout, max_size=None)
+            except (OSError, TimeoutError, ConnectionClosed) as error:
+                if self._closed:
+                    break
+                print(f"WebSocket connect failed ({error}), retrying in {backoff:.2f}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            self._ws = ws
+            with self._lock:
+                self._handlers = {}
+                self.generation += 1
+            self._connected.set()
+            self._notifications.put(_RESUBSCRIBE)
+            try:
+                for message in ws:
+                    backoff = self.min_backoff
+                    self._dispatch(json.loads(message))
+            except (ConnectionClosed, OSError):
+                pass
+            finally:
+                self._connected.clear()
+                self._ws = None
+                self._fail_pending()
+            if not self._closed:
+                self.reconnects += 1
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def _fail_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for slot in pending.values():
+            slot[1] = None
+            slot[0].set()
+
+    def _dispatch(self, message):
+        if isinstance(message, list):
+            for item in message:
+                self._dispatch(item)
+        elif message.get('method') == 'eth_subscription':
+            self._notifications.put(message['params'])
+        else:
+            with self._lock:
+                slot = self._pending.pop(message.get('id'), None)
+            if slot is not None:
+                slot[1] = message
+                slot[0].set()
+
+    # --- requests
+
+    def _send(self, payload, ids, deadline):
+        # One attempt; None means the connection dropped before every response arrived
+        slots = {request_id: [threading.Event(), None] for request_id in ids}
+        if not self._connected.wait(max(0.0, deadline - time.monotonic())):
+            raise TimeExhausted(f"No WebSocket connection to {self.url}")
+        with self._lock:
+            self._pending.update(slots)
+        try:
+            with self._send_lock:
+                self._ws.send(json.dumps(payload))
+        except (ConnectionClosed, OSError, AttributeError):
+            return None
+        responses = {}
+        for request_id, slot in slots.items():
+            if not slot[0].wait(max(0.0, deadline - time.monotonic())):
+                with self._lock:
+                    for key in slots:
+                        self._pending.pop(key, None)
+                raise TimeExhausted(f"WebSocket request timed out after {self.timeout}s")
+            if slot[1] is None:
+                return None
+            responses[request_id] = slot[1]
+        return responses
+
+    def _request(self, build, timeout=None, replay=True):
+        deadline = time.monotonic() + (timeout or self.timeout)
+        while True:
+            if self._closed:
+                raise ProviderConnectionError("WebSocket connection is closed")
+            payload, ids = build()
+            responses = self._send(payload, ids, deadline)
+            if responses is not None:
+                return [responses[request_id] for request_id in ids]
+            if not replay:
+                raise ProviderConnectionError("WebSocket connection dropped; the request may or may not have been executed")
+
+    def request(self, method, params, timeout=None):
+        if method == 'eth_sendRawTransaction':
+            return self._send_raw_transaction(params, timeout)
+
+        def build():
+            request_id = next(self._ids)
+            return {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}, [request_id]
+        return self._request(build, timeout, replay=method not in _NOT_REPLAYED)[0]
+
+    def _send_raw_transaction(self, params, timeout=None):
+        # The hash is fixed by the signed bytes, so a resend can only ever submit the same transaction
+        tx_hash = '0x' + keccak(hexstr=params[0]).hex()
+        attempts = []
+
+        def build():
+            attempts.append(next(self._ids))
+            return {'jsonrpc': '2.0', 'id': attempts[-1], 'method': 'eth_sendRawTransaction', 'params': params}, attempts[-1:]
+        response = self._request(build, timeout)[0]
+        if 'error' not in response:
+            return response
+        message = str(response['error'].get('message', '')).lower()
+        known = 'already known' in message or 'known transaction' in message
+        if not known and len(attempts) > 1:
+            # A resend after the first copy was mined reports e.g. "nonce too low"
+            known = self.request('eth_getTransactionByHash', [tx_hash], timeout).get('result') is not None
+        if known:
+            return {'jsonrpc': '2.0', 'id': response.get('id'), 'result': tx_hash}
+        return response
+
+    def batch(self, requests, timeout=None):
+        # Responses come back in request order
+        if not requests:
+            return []
+
+        def build():
+            ids = [next(self._ids) for _ in requests]
+            payload = [{'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+                       for request_id, (method, params) in zip(ids, requests)]
+            return payload, ids
+        return self._request(build, timeout, replay=not any(method in _NOT_REPLAYED for method, _ in requests))
+
+    def result(self, method, params):
+        response = self.request(method, params)
+        if 'error' in response:
+            raise ValueError(f"{method} failed: {response['error']}")
+        return response['result']
+
+    # --- subscriptions
+
+    def subscribe(self, params, handler):
+        """Calls handler(result) for every notification of ``eth_subscribe(params)``.
+
+        The subscription is kept for the lifetime of the connection, across reconnects.
+        """
+        subscription = {'params': list(params), 'handler': handler, 'generation': 0}
+        with self._lock:
+            self._subscriptions.append(subscription)
+        if self._connected.is_set():
+            self._activate(subscription)
+        return subscription
+
+    def _activate(self, subscription):
+        with self._lock:
+            if subscription['generation'] == self.generation:
+                return
+            subscription['generation'] = self.generation
+        server_id = self.result('eth_subscribe', subscription['params'])
+        with self._lock:
+            self._handlers[server_id] = subscription['handler']
+            early = self._early.pop(server_id, [])
+        for result in early:
+            self._notifications.put({'subscription': server_id, 'result': result})
+
+    def _work_forever(self):
+        while True:
+            item = self._notifications.get()
+            if item is None:
+                return
+            try:
+                if item is _RESUBSCRIBE:
+                    with self._lock:
+                        subscriptions = list(self._subscriptions)
+                    for subscription in subscriptions:
+                        self._activate(subscription)
+                    for callback in self.on_connect:
+                        callback()
+                    continue
+                with self._lock:
+                    handler = self._handlers.get(item['subscription'])
+                    if handler is None:
+                        # Notification raced ahead of the eth_subscribe response
+                        self._early.setdefault(item['subscription'], []).append(item['result'])
+                        continue
+                handler(item['result'])
+            except Exception as error:
+                if not self._closed:
+                    print(f"WebSocket subscription handler failed: {error}")
+
+    def close(self):
+        self._closed = True
+        self._notifications.put(None)
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+        self._fail_pending()
+
+
+class PendingTransaction:
+    """Resolved with the block number once a pushed block contains the transaction."""
+
+    def __init__(self, follower, tx_hash):
+        self.follower = follower
+        self.tx_hash = tx_hash
+        self.block_number = None
+        self._done = threading.Event()
+
+    def resolve(self, block_number):
+        self.block_number = block_number
+        self._done.set()
+
+    def wait(self, timeout=120):
+        if not self._done.wait(timeout):
+            raise TimeExhausted(f"Transaction {self.tx_hash} is not in the chain after {timeout} seconds")
+        return self.block_number
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.follower.unwatch(self)
+
+
+class ChainFollower:
+    """Follows the head over ``newHeads`` and delivers block and log events without gaps.
+
+    Blocks are only fetched (hashes only) while transactions are being watched. When the
+    head jumps, or after a reconnect, every skipped block is visited and the logs of the
+    skipped range are read with eth_getLogs; logs seen twice are delivered once.
+    """
+
+    def __init__(self, connection, seen_logs=10_000):
+        self.connection = connection
+        self.last_block = None
+        self._watched = {}
+        self._block_handlers = []
+        self._log_filters = []
+        self._seen = set()
+        self._seen_order = deque(maxlen=seen_logs)
+        self._lock = threading.Lock()
+        connection.subscribe(['newHeads'], self._on_head)
+        connection.on_connect.append(self._sync)
+
+    def on_block(self, handler):
+        # handler(block_number) for every block, in order
+        self._block_handlers.append(handler)
+
+    def subscribe_logs(self, handler, address=None, topics=None):
+        log_filter = {}
+        if address is not None:
+            log_filter['address'] = address
+        if topics is not None:
+            log_filter['topics'] = topics
+        index = len(self._log_filters)
+        self._log_filters.append((log_filter, handler))
+        self.connection.subscribe(['logs', log_filter], lambda log: self._deliver(index, log))
+
+    def watch(self, tx_hash):
+        if not isinstance(tx_hash, str):
+            tx_hash = '0x' + bytes(tx_hash).hex()
+        pending = PendingTransaction(self, tx_hash.lower())
+        with self._lock:
+            self._watched.setdefault(pending.tx_hash, []).append(pending)
+        return pending
+
+    def unwatch(self, pending):
+        with self._lock:
+            handles = self._watched.get(pending.tx_hash, [])
+            if pending in handles:
+                handles.remove(pending)
+            if not handles:
+                self._watched.pop(pending.tx_hash, None)
+
+    def _deliver(self, index, log):
+        key = (index, log['blockHash'], log['logIndex'], log.get('removed', False))
+        if key in self._seen:
+            return
+        if len(self._seen_order) == self._seen_order.maxlen:
+            self._seen.discard(self._seen_order[0])
+        self._seen_order.append(key)
+        self._seen.add(key)
+        self._log_filters[index][1](log)
+
+    def _fetch_logs(self, from_block, to_block):
+        for index, (log_filter, _) in enumerate(self._log_filters):
+            params = dict(log_filter, fromBlock=hex(from_block), toBlock=hex(to_block))
+            for log in self.connection.result('eth_getLogs', [params]):
+                self._deliver(index, log)
+
+    def _check_block(self, number):
+        block = self.connection.result('eth_getBlockByNumber', [hex(number), False])
+        if block is None:
+            return
+        with self._lock:
+            resolved = [self._watched.pop(tx_hash.lower(), []) for tx_hash in block['transactions']
+                        if tx_hash.lower() in self._watched]
+        for handles in resolved:
+            for pending in handles:
+                pending.resolve(number)
+
+    def _advance(self, number, fill_logs):
+        if self.last_block is None:
+            self.last_block = number - 1
+        if number <= self.last_block:
+            return
+        if fill_logs and number - self.last_block > 1:
+            self._fetch_logs(self.last_block + 1, number - 1)
+        for block_number in range(self.last_block + 1, number + 1):
+            if self._watched:
+                self._check_block(block_number)
+            self.last_block = block_number
+            for handler in self._block_handlers:
+                handler(block_number)
+
+    def _on_head(self, head):
+        self._advance(int(head['number'], 16), fill_logs=True)
+
+    def _sync(self):
+        head = int(self.connection.result('eth_blockNumber', []), 16)
+        if self.last_block is None:
+            self.last_block = head
+            return
+        # From last_block itself: its logs may have been cut off together with the connection
+        if self._log_filters and head >= self.last_block:
+            self._fetch_logs(self.last_block, head)
+        self._advance(head, fill_logs=False)
+
+
+class WebSocketRPCProvider(JSONBaseProvider):
+    """Synchronous web3 provider on a WebSocketConnection, with a ChainFollower attached."""
+
+    def __init__(self, endpoint_uri, request_timeout=30, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint_uri = endpoint_uri
+        self.connection = WebSocketConnection(endpoint_uri, timeout=request_timeout)
+        self.follower = ChainFollower(self.connection)
+
+    def make_request(self, method, params):
+        return self.connection.request(method, params)
+
+    def make_batch_request(self, requests):
+        return self.connection.batch(requests)
+
+    def is_connected(self, show_traceback=False):
+        try:
+            response = self.make_request('web3_clientVersion', [])
+        except (TimeExhausted, ProviderConnectionError) as error:
+            if show_traceback:
+                raise ProviderConnectionError(f"Problem connecting to provider with error: {error}")
+            return False
+        return 'error' not in response
+
+    def disconnect(self):
+        self.connection.close()